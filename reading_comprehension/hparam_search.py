@@ -1,9 +1,12 @@
 import argparse
+import os.path
 
 import numpy as np
 import tensorflow as tf
 
 from util.param_util import *
+from util.debug_logger import *
+from util.search_scheduler import *
 
 def add_arguments(parser):
     parser.add_argument("--base-config", help="path to base config", required=True)
@@ -11,12 +14,51 @@ def add_arguments(parser):
     parser.add_argument("--num-group", help="num of hyperparam group", type=int, required=True)
     parser.add_argument("--random-seed", help="random seed", type=int, required=True)
     parser.add_argument("--output-dir", help="path to output dir", required=True)
+    parser.add_argument("--run", help="run searched hyperparam groups as local trials", action="store_true")
+    parser.add_argument("--metric", help="eval metric to rank trials", default="f1")
+    parser.add_argument("--max-concurrent", help="max num of concurrent trials, 0 to size by cores & memory", type=int, default=0)
+    parser.add_argument("--trial-num-core", help="num of cores used by each trial", type=int, default=1)
+    parser.add_argument("--trial-memory-gb", help="memory in GB used by each trial, 0 to ignore memory", type=float, default=0.0)
+    parser.add_argument("--min-step", help="global step of the first successive halving rung", type=int, default=1000)
+    parser.add_argument("--reduction-factor", help="reduction factor of successive halving", type=int, default=3)
+    parser.add_argument("--poll-interval", help="interval in seconds to poll trials", type=float, default=30.0)
 
 def main(args):
     hyperparams = load_hyperparams(args.base_config)
     hyperparams_group = search_hyperparams(hyperparams,
         args.search_config, args.num_group, args.random_seed)
-    create_hyperparams_file(hyperparams_group, args.output_dir)
+    
+    if args.run == False:
+        create_hyperparams_file(hyperparams_group, args.output_dir)
+        return
+    
+    """isolate outputs of each trial"""
+    output_dir = os.path.abspath(args.output_dir)
+    for i, hyperparams_sample in enumerate(hyperparams_group):
+        trial_dir = os.path.join(output_dir, "trial_{0}".format(i))
+        hyperparams_sample.set_hparam("data_log_output_dir", os.path.join(trial_dir, "log"))
+        hyperparams_sample.set_hparam("train_ckpt_output_dir", os.path.join(trial_dir, "checkpoint"))
+        hyperparams_sample.set_hparam("train_summary_output_dir", os.path.join(trial_dir, "summary"))
+        hyperparams_sample.set_hparam("train_profile_output_dir", os.path.join(trial_dir, "profile"))
+    
+    create_hyperparams_file(hyperparams_group, output_dir)
+    
+    max_concurrent = args.max_concurrent
+    if max_concurrent <= 0:
+        max_concurrent = get_max_concurrent_trial(args.trial_num_core, args.trial_memory_gb)
+    
+    logger = DebugLogger(output_dir)
+    run_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reading_comprehension_run.py")
+    search_scheduler = SearchScheduler(logger, run_file, output_dir, args.metric, max_concurrent,
+        args.min_step, args.reduction_factor, args.poll_interval)
+    for i, hyperparams_sample in enumerate(hyperparams_group):
+        search_scheduler.add_trial(os.path.join(output_dir, "config_hyperparams_{0}.json".format(i)),
+            hyperparams_sample.data_log_output_dir)
+    
+    leaderboard = search_scheduler.run()
+    for entry in leaderboard:
+        logger.log_print("trial {0}: status={1}, {2}={3}, global step={4}".format(entry["trial_id"],
+            entry["status"], entry["metric"], entry["best_score"], entry["best_global_step"]))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -223,7 +223,7 @@ def _generate_scaled_dot_attention_score(input_src_data,
     """generate scaled dot-product attention score"""
     src_unit_dim = tf.shape(input_src_data)[2]
     input_attention = tf.matmul(input_src_data, input_trg_data, transpose_b=True)
-    input_attention = input_attention / tf.sqrt(tf.cast(src_unit_dim, dtype=tf.float32))
+    input_attention = input_attention / tf.sqrt(tf.cast(src_unit_dim, dtype=input_attention.dtype))
     
     return input_attention
 
@@ -242,14 +242,12 @@ def _generate_linear_attention_score(input_src_data,
     linear_trg_weight = attention_matrix[1]
     input_src_data = tf.reshape(input_src_data, shape=[-1, src_unit_dim])
     input_src_data = tf.matmul(input_src_data, linear_src_weight, transpose_b=True)
-    input_src_data = tf.reshape(input_src_data, shape=[batch_size, src_max_length, 1, -1])
+    input_src_data = tf.reshape(input_src_data, shape=[batch_size, src_max_length, 1])
     input_trg_data = tf.reshape(input_trg_data, shape=[-1, trg_unit_dim])
     input_trg_data = tf.matmul(input_trg_data, linear_trg_weight, transpose_b=True)
-    input_trg_data = tf.reshape(input_trg_data, shape=[batch_size, 1, trg_max_length, -1])
-    input_src_data = tf.tile(input_src_data, multiples=[1, 1, trg_max_length, 1])
-    input_trg_data = tf.tile(input_trg_data, multiples=[1, src_max_length, 1, 1])
+    input_trg_data = tf.reshape(input_trg_data, shape=[batch_size, 1, trg_max_length])
+    """broadcast [batch_size, src_len, 1] & [batch_size, 1, trg_len] instead of tiling both into full score shape"""
     input_attention = input_src_data + input_trg_data
-    input_attention = tf.reshape(input_attention, shape=[batch_size, src_max_length, trg_max_length])
     
     return input_attention
 
@@ -290,8 +288,7 @@ def _generate_nonlinear_attention_score(input_src_data,
     input_trg_data = tf.reshape(input_trg_data, shape=[-1, trg_unit_dim])
     input_trg_data = tf.matmul(input_trg_data, pre_nonlinear_trg_weight, transpose_b=True)
     input_trg_data = tf.reshape(input_trg_data, shape=[batch_size, 1, trg_max_length, -1])
-    input_src_data = tf.tile(input_src_data, multiples=[1, 1, trg_max_length, 1])
-    input_trg_data = tf.tile(input_trg_data, multiples=[1, src_max_length, 1, 1])
+    """projected inputs are broadcast, only tanh input & output take full [batch_size, src_len, trg_len, attention_dim]"""
     input_attention = input_src_data + input_trg_data
     input_attention = tf.nn.tanh(input_attention + pre_nonlinear_bias)
     attention_dim = tf.shape(input_attention)[-1]
@@ -316,19 +313,16 @@ def _generate_linear_plus_attention_score(input_src_data,
     linear_plus_src_weight = attention_matrix[0]
     linear_plus_trg_weight = attention_matrix[1]
     linear_plus_mul_weight = attention_matrix[2]
-    input_src_data = tf.expand_dims(input_src_data, axis=2)
-    input_trg_data = tf.expand_dims(input_trg_data, axis=1)
-    input_src_data = tf.tile(input_src_data, multiples=[1, 1, trg_max_length, 1])
-    input_trg_data = tf.tile(input_trg_data, multiples=[1, src_max_length, 1, 1])
-    input_mul_data = input_src_data * input_trg_data
-    input_src_data = tf.reshape(input_src_data, shape=[-1, src_unit_dim])
-    input_src_data = tf.matmul(input_src_data, linear_plus_src_weight, transpose_b=True)
-    input_trg_data = tf.reshape(input_trg_data, shape=[-1, trg_unit_dim])
-    input_trg_data = tf.matmul(input_trg_data, linear_plus_trg_weight, transpose_b=True)
-    input_mul_data = tf.reshape(input_mul_data, shape=[-1, mul_unit_dim])
-    input_mul_data = tf.matmul(input_mul_data, linear_plus_mul_weight, transpose_b=True)
-    input_attention = input_src_data + input_trg_data + input_mul_data
-    input_attention = tf.reshape(input_attention, shape=[batch_size, src_max_length, trg_max_length])
+    """src & trg terms are broadcast, and mul term w * (src * trg) is folded into batched matmul of (src * w) & trg"""
+    input_src_score = tf.reshape(input_src_data, shape=[-1, src_unit_dim])
+    input_src_score = tf.matmul(input_src_score, linear_plus_src_weight, transpose_b=True)
+    input_src_score = tf.reshape(input_src_score, shape=[batch_size, src_max_length, 1])
+    input_trg_score = tf.reshape(input_trg_data, shape=[-1, trg_unit_dim])
+    input_trg_score = tf.matmul(input_trg_score, linear_plus_trg_weight, transpose_b=True)
+    input_trg_score = tf.reshape(input_trg_score, shape=[batch_size, 1, trg_max_length])
+    input_mul_data = input_src_data * tf.reshape(linear_plus_mul_weight, shape=[1, 1, -1])
+    input_mul_score = tf.matmul(input_mul_data, input_trg_data, transpose_b=True)
+    input_attention = input_src_score + input_trg_score + input_mul_score
     
     return input_attention
 
@@ -349,19 +343,21 @@ def _generate_nonlinear_plus_attention_score(input_src_data,
     pre_nonlinear_plus_mul_weight = attention_matrix[2]
     pre_nonlinear_plus_bias = tf.reshape(attention_matrix[3], shape=[1, 1, 1, -1])
     post_nonlinear_plus_weight = attention_matrix[4]
-    input_src_data = tf.reshape(input_src_data, shape=[batch_size, src_max_length, 1, -1])
-    input_trg_data = tf.reshape(input_trg_data, shape=[batch_size, 1, trg_max_length, -1])
-    input_src_data = tf.tile(input_src_data, multiples=[1, 1, trg_max_length, 1])
-    input_trg_data = tf.tile(input_trg_data, multiples=[1, src_max_length, 1, 1])
-    input_mul_data = input_src_data * input_trg_data
-    input_src_data = tf.reshape(input_src_data, shape=[-1, src_unit_dim])
-    input_src_data = tf.matmul(input_src_data, pre_nonlinear_plus_src_weight, transpose_b=True)
-    input_trg_data = tf.reshape(input_trg_data, shape=[-1, trg_unit_dim])
-    input_trg_data = tf.matmul(input_trg_data, pre_nonlinear_plus_trg_weight, transpose_b=True)
+    """src & trg are projected before broadcast, only mul term needs full [batch_size, src_len, trg_len, mul_dim]"""
+    input_src_score = tf.reshape(input_src_data, shape=[-1, src_unit_dim])
+    input_src_score = tf.matmul(input_src_score, pre_nonlinear_plus_src_weight, transpose_b=True)
+    input_src_score = tf.reshape(input_src_score, shape=[batch_size, src_max_length, 1, -1])
+    input_trg_score = tf.reshape(input_trg_data, shape=[-1, trg_unit_dim])
+    input_trg_score = tf.matmul(input_trg_score, pre_nonlinear_plus_trg_weight, transpose_b=True)
+    input_trg_score = tf.reshape(input_trg_score, shape=[batch_size, 1, trg_max_length, -1])
+    input_mul_data = tf.expand_dims(input_src_data, axis=2) * tf.expand_dims(input_trg_data, axis=1)
     input_mul_data = tf.reshape(input_mul_data, shape=[-1, mul_unit_dim])
-    input_mul_data = tf.matmul(input_mul_data, pre_nonlinear_plus_mul_weight, transpose_b=True)
-    input_attention = input_src_data + input_trg_data + input_mul_data
+    input_mul_score = tf.matmul(input_mul_data, pre_nonlinear_plus_mul_weight, transpose_b=True)
+    attention_dim = tf.shape(input_mul_score)[-1]
+    input_mul_score = tf.reshape(input_mul_score, shape=[batch_size, src_max_length, trg_max_length, attention_dim])
+    input_attention = input_src_score + input_trg_score + input_mul_score
     input_attention = tf.nn.tanh(input_attention + pre_nonlinear_plus_bias)
+    input_attention = tf.reshape(input_attention, shape=[-1, attention_dim])
     input_attention = tf.matmul(input_attention, post_nonlinear_plus_weight, transpose_b=True)
     input_attention = tf.reshape(input_attention, shape=[batch_size, src_max_length, trg_max_length])
     
@@ -387,16 +383,13 @@ def _generate_trilinear_attention_score(input_src_data,
     input_trg_part = tf.reshape(input_trg_data, shape=[-1, trg_unit_dim]) # [-1, d]
     input_src_part = tf.matmul(input_src_part, trilinear_src_weight) # [-1, 1]
     input_trg_part = tf.matmul(input_trg_part, trilinear_trg_weight) # [-1, 1]
-    input_src_part = tf.reshape(input_src_part, shape=[batch_size, src_max_length, 1]) # [batch_size, src_len, 1]
-    input_trg_part = tf.reshape(input_trg_part, shape=[batch_size, 1, trg_max_length]) # [batch_size, 1, trg_len]
-    input_src_score = tf.tile(input_src_part, multiples=[1, 1, trg_max_length]) # [batch_size, src_len, trg_len]
-    input_trg_score = tf.tile(input_trg_part, multiples=[1, src_max_length, 1]) # [batch_size, src_len, trg_len]
+    input_src_score = tf.reshape(input_src_part, shape=[batch_size, src_max_length, 1]) # [batch_size, src_len, 1]
+    input_trg_score = tf.reshape(input_trg_part, shape=[batch_size, 1, trg_max_length]) # [batch_size, 1, trg_len]
     
     input_src_part = input_src_data * trilinear_mul_weight # [batch_size, src_len, d]
-    input_trg_part = tf.transpose(input_trg_data, perm=[0, 2, 1]) # [batch_size, d, trg_len]
-    input_mul_score = tf.matmul(input_src_part, input_trg_part) # [batch_size, src_len, trg_len]
+    input_mul_score = tf.matmul(input_src_part, input_trg_data, transpose_b=True) # [batch_size, src_len, trg_len]
     
-    input_attention = input_src_score + input_trg_score + input_mul_score # [batch_size, src_len, trg_len]
+    input_attention = input_src_score + input_trg_score + input_mul_score # broadcast into [batch_size, src_len, trg_len]
     
     return input_attention
 
@@ -413,6 +406,246 @@ def _generate_attention_mask(input_src_mask,
     
     return input_mask
 
+def _generate_length_attention_mask(input_trg_length,
+                                    src_max_length,
+                                    trg_max_length,
+                                    remove_diag,
+                                    data_type):
+    """generate list of attention masks broadcastable to [batch_size, src_len, trg_len] from lengths, padded source is masked on output"""
+    key_mask = tf.sequence_mask(input_trg_length, maxlen=trg_max_length, dtype=data_type)
+    mask_list = [tf.expand_dims(key_mask, axis=1)] # [batch_size, 1, trg_len]
+    
+    if remove_diag == True:
+        diag_mask = tf.not_equal(tf.expand_dims(tf.range(src_max_length), axis=-1), tf.expand_dims(tf.range(trg_max_length), axis=0))
+        mask_list.append(tf.expand_dims(tf.cast(diag_mask, dtype=data_type), axis=0)) # [1, src_len, trg_len]
+    
+    return mask_list
+
+def _split_attention_chunk(input_data,
+                           chunk_size):
+    """pad time axis to multiple of chunk size & split into [num_chunk, batch_size, chunk_size, unit_dim]"""
+    input_shape = tf.shape(input_data)
+    batch_size = input_shape[0]
+    max_length = input_shape[1]
+    unit_dim = input_shape[2]
+    num_chunk = (max_length + chunk_size - 1) // chunk_size
+    input_chunk = tf.pad(input_data, paddings=[[0, 0], [0, num_chunk * chunk_size - max_length], [0, 0]])
+    input_chunk = tf.reshape(input_chunk, shape=[batch_size, num_chunk, chunk_size, unit_dim])
+    input_chunk = tf.transpose(input_chunk, perm=[1, 0, 2, 3])
+    
+    return input_chunk, num_chunk
+
+def _merge_attention_chunk(input_chunk,
+                           max_length):
+    """merge [num_chunk, batch_size, chunk_size, unit_dim] back into [batch_size, max_length, unit_dim]"""
+    input_chunk_shape = tf.shape(input_chunk)
+    input_data = tf.transpose(input_chunk, perm=[1, 0, 2, 3])
+    input_data = tf.reshape(input_data, shape=[input_chunk_shape[1], -1, input_chunk_shape[3]])
+    input_data = input_data[:, :max_length, :]
+    
+    return input_data
+
+def _generate_chunk_attention_mask(input_src_length,
+                                   input_trg_length,
+                                   src_max_length,
+                                   chunk_index,
+                                   chunk_size,
+                                   remove_diag,
+                                   data_type):
+    """generate [batch_size, src_len, chunk_size] attention mask of one trg chunk from lengths"""
+    src_position = tf.range(src_max_length)
+    trg_position = chunk_index * chunk_size + tf.range(chunk_size)
+    src_valid = tf.less(tf.expand_dims(src_position, axis=0), tf.expand_dims(input_src_length, axis=-1))
+    trg_valid = tf.less(tf.expand_dims(trg_position, axis=0), tf.expand_dims(input_trg_length, axis=-1))
+    input_mask = tf.logical_and(tf.expand_dims(src_valid, axis=-1), tf.expand_dims(trg_valid, axis=1))
+    
+    if remove_diag == True:
+        diag_mask = tf.not_equal(tf.expand_dims(src_position, axis=-1), tf.expand_dims(trg_position, axis=0))
+        input_mask = tf.logical_and(input_mask, tf.expand_dims(diag_mask, axis=0))
+    
+    return tf.cast(input_mask, dtype=data_type)
+
+def _generate_chunked_attention(input_query_data,
+                                input_key_data,
+                                input_value_data,
+                                input_query_length,
+                                input_key_length,
+                                chunk_size,
+                                score_type,
+                                remove_diag):
+    """generate dot-product attention over trg chunks with online softmax, full [src_len, trg_len] matrix is never built"""
+    query_max_length = tf.shape(input_query_data)[1]
+    key_max_length = tf.shape(input_key_data)[1]
+    data_type = input_query_data.dtype
+    min_float = get_min_float(data_type)
+    if score_type == "scaled_dot":
+        score_scale = tf.rsqrt(tf.cast(tf.shape(input_query_data)[2], dtype=data_type))
+    else:
+        score_scale = tf.constant(1.0, dtype=data_type)
+    
+    def generate_chunk_score(query_data,
+                             key_chunk,
+                             chunk_index):
+        """generate masked score of one trg chunk"""
+        chunk_score = tf.matmul(query_data, key_chunk, transpose_b=True) * score_scale
+        chunk_mask = _generate_chunk_attention_mask(input_query_length, input_key_length,
+            query_max_length, chunk_index, chunk_size, remove_diag, data_type)
+        chunk_score = chunk_score * chunk_mask + min_float * (1 - chunk_mask)
+        
+        return chunk_score, chunk_mask
+    
+    @tf.custom_gradient
+    def chunked_attention(query_data,
+                          key_data,
+                          value_data):
+        """online softmax keeps running max & sum per src position, gradient recomputes chunk weight"""
+        key_chunk_data, num_chunk = _split_attention_chunk(key_data, chunk_size)
+        value_chunk_data, _ = _split_attention_chunk(value_data, chunk_size)
+        batch_size = tf.shape(query_data)[0]
+        value_dim = tf.shape(value_data)[2]
+        
+        def forward_step(chunk_index,
+                         row_max,
+                         row_sum,
+                         output_data):
+            chunk_score, chunk_mask = generate_chunk_score(query_data,
+                tf.gather(key_chunk_data, chunk_index), chunk_index)
+            chunk_max = tf.maximum(row_max, tf.reduce_max(chunk_score, axis=-1, keepdims=True))
+            chunk_weight = tf.exp(chunk_score - chunk_max) * chunk_mask
+            rescale = tf.exp(row_max - chunk_max)
+            row_sum = row_sum * rescale + tf.reduce_sum(chunk_weight, axis=-1, keepdims=True)
+            output_data = output_data * rescale + tf.matmul(chunk_weight, tf.gather(value_chunk_data, chunk_index))
+            
+            return chunk_index + 1, chunk_max, row_sum, output_data
+        
+        _, row_max, row_sum, output_data = tf.while_loop(lambda chunk_index, *_: chunk_index < num_chunk, forward_step,
+            [tf.constant(0), tf.fill([batch_size, query_max_length, 1], tf.cast(min_float, dtype=data_type)),
+            tf.zeros([batch_size, query_max_length, 1], dtype=data_type),
+            tf.zeros([batch_size, query_max_length, value_dim], dtype=data_type)])
+        
+        """src positions without any valid trg keep zero output, same as masked softmax in dense path"""
+        row_sum = row_sum + tf.cast(tf.equal(row_sum, 0), dtype=data_type)
+        output_data = output_data / row_sum
+        
+        def gradient(output_grad):
+            output_dot = tf.reduce_sum(output_grad * output_data, axis=-1, keepdims=True)
+            
+            def backward_step(chunk_index,
+                              query_grad,
+                              key_grad_array,
+                              value_grad_array):
+                key_chunk = tf.gather(key_chunk_data, chunk_index)
+                value_chunk = tf.gather(value_chunk_data, chunk_index)
+                chunk_score, chunk_mask = generate_chunk_score(query_data, key_chunk, chunk_index)
+                chunk_weight = tf.exp(chunk_score - row_max) * chunk_mask / row_sum
+                value_grad_array = value_grad_array.write(chunk_index, tf.matmul(chunk_weight, output_grad, transpose_a=True))
+                chunk_weight_grad = tf.matmul(output_grad, value_chunk, transpose_b=True)
+                chunk_score_grad = chunk_weight * (chunk_weight_grad - output_dot) * score_scale
+                query_grad = query_grad + tf.matmul(chunk_score_grad, key_chunk)
+                key_grad_array = key_grad_array.write(chunk_index, tf.matmul(chunk_score_grad, query_data, transpose_a=True))
+                
+                return chunk_index + 1, query_grad, key_grad_array, value_grad_array
+            
+            _, query_grad, key_grad_array, value_grad_array = tf.while_loop(lambda chunk_index, *_: chunk_index < num_chunk,
+                backward_step, [tf.constant(0), tf.zeros_like(query_data),
+                tf.TensorArray(dtype=data_type, size=num_chunk), tf.TensorArray(dtype=data_type, size=num_chunk)])
+            
+            key_grad = _merge_attention_chunk(key_grad_array.stack(), key_max_length)
+            value_grad = _merge_attention_chunk(value_grad_array.stack(), key_max_length)
+            
+            return query_grad, key_grad, value_grad
+        
+        return output_data, gradient
+    
+    return chunked_attention(input_query_data, input_key_data, input_value_data)
+
+def _generate_local_attention(input_query_data,
+                              input_key_data,
+                              input_value_data,
+                              input_query_length,
+                              input_key_length,
+                              window_size,
+                              num_global,
+                              score_type,
+                              remove_diag,
+                              att_dropout_layer):
+    """generate sliding-window attention where each position attends to positions within window size & global positions"""
+    input_shape = tf.shape(input_query_data)
+    batch_size = input_shape[0]
+    max_length = input_shape[1]
+    data_type = input_query_data.dtype
+    """clamp global positions for sequences shorter than num global"""
+    global_size = tf.minimum(num_global, tf.shape(input_key_data)[1])
+    if score_type == "scaled_dot":
+        score_scale = tf.rsqrt(tf.cast(input_shape[2], dtype=data_type))
+    else:
+        score_scale = tf.constant(1.0, dtype=data_type)
+    
+    """split into blocks of window size, each query block attends to key of previous, current & next block"""
+    query_block, num_block = _split_attention_chunk(input_query_data, window_size) # [num_block, batch_size, window, d]
+    key_block, _ = _split_attention_chunk(input_key_data, window_size)
+    value_block, _ = _split_attention_chunk(input_value_data, window_size)
+    key_block = tf.pad(key_block, paddings=[[1, 1], [0, 0], [0, 0], [0, 0]])
+    value_block = tf.pad(value_block, paddings=[[1, 1], [0, 0], [0, 0], [0, 0]])
+    key_block = tf.concat([key_block[:-2], key_block[1:-1], key_block[2:]], axis=2) # [num_block, batch_size, 3 * window, d]
+    value_block = tf.concat([value_block[:-2], value_block[1:-1], value_block[2:]], axis=2)
+    
+    query_position = tf.reshape(tf.range(num_block * window_size), shape=[num_block, 1, window_size, 1])
+    key_position = tf.reshape(tf.range(-window_size, (num_block + 1) * window_size), shape=[num_block + 2, window_size])
+    key_position = tf.concat([key_position[:-2], key_position[1:-1], key_position[2:]], axis=1)
+    key_position = tf.reshape(key_position, shape=[num_block, 1, 1, 3 * window_size])
+    query_length = tf.reshape(input_query_length, shape=[1, batch_size, 1, 1])
+    key_length = tf.reshape(input_key_length, shape=[1, batch_size, 1, 1])
+    local_mask = tf.logical_and(tf.less(query_position, query_length),
+        tf.logical_and(tf.greater_equal(key_position, global_size), tf.less(key_position, key_length)))
+    local_mask = tf.logical_and(local_mask, tf.less_equal(tf.abs(query_position - key_position), window_size))
+    if remove_diag == True:
+        local_mask = tf.logical_and(local_mask, tf.not_equal(query_position, key_position))
+    
+    local_mask = tf.cast(local_mask, dtype=data_type) # [num_block, batch_size, window, 3 * window]
+    local_score = tf.matmul(query_block, key_block, transpose_b=True) * score_scale
+    
+    if num_global > 0:
+        """global key is attended by every query, so it is excluded from local window to avoid double counting"""
+        global_key = tf.tile(tf.expand_dims(input_key_data[:, :global_size, :], axis=0), multiples=[num_block, 1, 1, 1])
+        global_value = tf.tile(tf.expand_dims(input_value_data[:, :global_size, :], axis=0), multiples=[num_block, 1, 1, 1])
+        global_position = tf.reshape(tf.range(global_size), shape=[1, 1, 1, -1])
+        global_mask = tf.logical_and(tf.less(query_position, query_length), tf.less(global_position, key_length))
+        if remove_diag == True:
+            global_mask = tf.logical_and(global_mask, tf.not_equal(query_position, global_position))
+        
+        global_mask = tf.cast(global_mask, dtype=data_type) # [num_block, batch_size, window, num_global]
+        global_score = tf.matmul(query_block, global_key, transpose_b=True) * score_scale
+        input_score = tf.concat([local_score, global_score], axis=-1)
+        input_mask = tf.concat([local_mask, global_mask], axis=-1)
+    else:
+        input_score = local_score
+        input_mask = local_mask
+    
+    input_weight = softmax_with_mask(input_score * input_mask, input_mask, axis=-1) * input_mask
+    input_weight, _ = att_dropout_layer(input_weight, input_mask)
+    output_block = tf.matmul(input_weight[:, :, :, :3 * window_size], value_block)
+    if num_global > 0:
+        output_block = output_block + tf.matmul(input_weight[:, :, :, 3 * window_size:], global_value)
+    
+    output_data = _merge_attention_chunk(output_block, max_length)
+    
+    if num_global > 0:
+        """global query attends to every position, which costs num_global * max_length"""
+        global_query = input_query_data[:, :global_size, :]
+        global_query_mask = tf.cast(tf.less(tf.range(global_size), tf.expand_dims(input_query_length, axis=-1)), dtype=data_type)
+        global_key_mask = tf.cast(tf.less(tf.range(max_length), tf.expand_dims(input_key_length, axis=-1)), dtype=data_type)
+        global_attention_mask = _generate_attention_mask(tf.expand_dims(global_query_mask, axis=-1),
+            tf.expand_dims(global_key_mask, axis=-1), remove_diag)
+        global_attention_score = tf.matmul(global_query, input_key_data, transpose_b=True) * score_scale
+        global_attention_weight = softmax_with_mask(global_attention_score * global_attention_mask,
+            global_attention_mask, axis=-1) * global_attention_mask
+        global_attention_weight, _ = att_dropout_layer(global_attention_weight, global_attention_mask)
+        global_output = tf.matmul(global_attention_weight, input_value_data)
+        output_data = tf.concat([global_output, output_data[:, global_size:, :]], axis=1)
+    
+    return output_data
+
 def _create_projection_layer(unit_dim,
                              hidden_activation,
                              use_bias,
@@ -522,9 +755,8 @@ class Attention(object):
             input_attention, _ = self.dropout_layer(input_attention, input_src_mask)
             
             if self.residual_connect == True and self.is_self == True:
-                output_attention, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_src_data, input_src_mask),
-                    lambda: (input_attention + input_src_data, input_src_mask))
+                output_attention, output_mask = apply_stochastic_depth(lambda: (input_attention, input_src_mask),
+                    input_src_data, input_src_mask, self.layer_dropout)
                 output_attention = output_attention * output_mask
             else:
                 output_attention = input_attention * input_src_mask
@@ -630,9 +862,8 @@ class MaxAttention(object):
             input_attention = tf.tile(input_attention, multiples=[1, src_max_length, 1])
             
             if self.residual_connect == True and self.is_self == True:
-                output_attention, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_src_data, input_src_mask),
-                    lambda: (input_attention + input_src_data, input_src_mask))
+                output_attention, output_mask = apply_stochastic_depth(lambda: (input_attention, input_src_mask),
+                    input_src_data, input_src_mask, self.layer_dropout)
                 output_attention = output_attention * output_mask
             else:
                 output_attention = input_attention * input_src_mask
@@ -745,9 +976,8 @@ class CoAttention(object):
             input_attention, _ = self.dropout_layer(input_attention, input_src_mask)
             
             if self.residual_connect == True and self.is_self == True:
-                output_attention, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_src_data, input_src_mask),
-                    lambda: (input_attention + input_src_data, input_src_mask))
+                output_attention, output_mask = apply_stochastic_depth(lambda: (input_attention, input_src_mask),
+                    input_src_data, input_src_mask, self.layer_dropout)
                 output_attention = output_attention * output_mask
             else:
                 output_attention = input_attention * input_src_mask
@@ -857,9 +1087,8 @@ class GatedAttention(object):
             input_attention, _ = self.dropout_layer(input_attention, input_src_mask)
                         
             if self.residual_connect == True and self.is_self == True:
-                output_attention, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_src_data, input_src_mask),
-                    lambda: (self.gate_layer(input_attention) * input_attention + input_src_data, input_src_mask))
+                output_attention, output_mask = apply_stochastic_depth(lambda: (self.gate_layer(input_attention) * input_attention,
+                    input_src_mask), input_src_data, input_src_mask, self.layer_dropout)
                 output_attention = output_attention * output_mask
             else:
                 input_attention = tf.concat([input_src_data, input_attention], axis=-1) 
@@ -892,6 +1121,10 @@ class MultiHeadAttention(object):
                  regularizer=None,
                  random_seed=0,
                  trainable=True,
+                 chunk_size=0,
+                 window_size=0,
+                 num_global=0,
+                 length_mask=False,
                  scope="multi_head_att"):
         """initialize multi-head attention layer"""
         self.src_dim = src_dim
@@ -908,10 +1141,30 @@ class MultiHeadAttention(object):
         self.regularizer = regularizer
         self.random_seed = random_seed
         self.trainable = trainable
+        self.chunk_size = chunk_size
+        self.window_size = window_size
+        self.num_global = num_global
+        self.length_mask = length_mask
         self.scope = scope
         self.device_spec = get_device_spec(default_gpu_id, num_gpus)
         
+        if self.chunk_size > 0 and self.score_type not in ["dot", "scaled_dot"]:
+            raise ValueError("unsupported score type {0} for chunked multi-head attention".format(self.score_type))
+        
+        if self.chunk_size > 0 and self.att_dropout > 0.0:
+            raise ValueError("attention dropout is not supported for chunked multi-head attention")
+        
+        if self.window_size > 0 and self.score_type not in ["dot", "scaled_dot"]:
+            raise ValueError("unsupported score type {0} for local multi-head attention".format(self.score_type))
+        
+        if self.window_size > 0 and self.chunk_size > 0:
+            raise ValueError("local multi-head attention can not be chunked")
+        
+        if self.window_size > 0 and self.is_self == False:
+            raise ValueError("local multi-head attention only supports self attention")
+        
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
+            self.precision_dtype = tf.get_variable_scope().dtype
             if external_matrix == None:
                 query_dim = self.att_dim
                 key_dim = self.att_dim
@@ -958,35 +1211,90 @@ class MultiHeadAttention(object):
                  input_trg_mask):
         """call multi-head attention layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
-            input_src_shape = tf.shape(input_src_data)
-            input_trg_shape = tf.shape(input_trg_data)
-            input_src_attention = input_src_data
-            input_trg_attention = input_trg_data
-            input_src_attention_mask = input_src_mask
-            input_trg_attention_mask = input_trg_mask
+            """keep activations in layer precision, casting back is left to the caller at model boundary"""
+            input_src_data = tf.cast(input_src_data, dtype=self.precision_dtype)
+            input_trg_data = tf.cast(input_trg_data, dtype=self.precision_dtype)
+            if self.residual_connect == True and self.is_self == True:
+                output_attention, output_mask = apply_stochastic_depth(lambda: self._call_sublayer(input_src_data,
+                    input_trg_data, input_src_mask, input_trg_mask), input_src_data, input_src_mask,
+                    self.layer_dropout, gate_output=(self.chunk_size > 0))
+                output_attention = output_attention * tf.cast(output_mask, dtype=self.precision_dtype)
+            else:
+                input_attention, _ = self._call_sublayer(input_src_data, input_trg_data, input_src_mask, input_trg_mask)
+                output_attention = input_attention * tf.cast(input_src_mask, dtype=self.precision_dtype)
+                output_mask = input_src_mask
+        
+        return output_attention, output_mask
+    
+    def _call_sublayer(self,
+                       input_src_data,
+                       input_trg_data,
+                       input_src_mask,
+                       input_trg_mask):
+        """call multi-head attention sublayer without residual connection"""
+        input_src_shape = tf.shape(input_src_data)
+        input_trg_shape = tf.shape(input_trg_data)
+        input_src_attention = input_src_data
+        input_trg_attention = input_trg_data
+        input_src_attention_mask = input_src_mask
+        input_trg_attention_mask = input_trg_mask
+        
+        if self.layer_norm == True:
+            input_src_attention, input_src_attention_mask = self.src_norm_layer(input_src_attention, input_src_attention_mask)
+            input_trg_attention, input_trg_attention_mask = self.trg_norm_layer(input_trg_attention, input_trg_attention_mask)
+        
+        input_src_attention_mask = tf.cast(input_src_attention_mask, dtype=self.precision_dtype)
+        input_trg_attention_mask = tf.cast(input_trg_attention_mask, dtype=self.precision_dtype)
+        attention_matrix = [tf.cast(matrix, dtype=self.precision_dtype) for matrix in self.attention_matrix]
+        
+        input_query_attention = self.projection_layer["query"](input_src_attention)
+        input_key_attention = self.projection_layer["key"](input_trg_attention)
+        input_value_attention = self.projection_layer["value"](input_trg_attention)
+        
+        input_query_attention = self.__split_multi_head(input_query_attention,
+            input_src_shape[0], input_src_shape[1], self.num_head)
+        input_key_attention = self.__split_multi_head(input_key_attention,
+            input_trg_shape[0], input_trg_shape[1], self.num_head)
+        input_value_attention = self.__split_multi_head(input_value_attention,
+            input_trg_shape[0], input_trg_shape[1], self.num_head)
+        
+        if self.window_size > 0:
+            input_attention_length = self.__split_multi_head_length(input_src_mask, self.num_head)
+            input_attention = _generate_local_attention(input_query_attention, input_key_attention,
+                input_value_attention, input_attention_length, input_attention_length, self.window_size,
+                self.num_global, self.score_type, self.is_self, self.att_dropout_layer)
+        elif self.chunk_size > 0:
+            input_query_attention_length = self.__split_multi_head_length(input_src_mask, self.num_head)
+            input_key_attention_length = self.__split_multi_head_length(input_trg_mask, self.num_head)
+            input_attention = _generate_chunked_attention(input_query_attention, input_key_attention,
+                input_value_attention, input_query_attention_length, input_key_attention_length,
+                self.chunk_size, self.score_type, self.is_self)
+        elif self.length_mask == True:
+            """mask key & diagonal with broadcast masks from per-head lengths, no [batch_size * num_head, src_len, trg_len] mask is built"""
+            input_key_attention_length = self.__split_multi_head_length(input_trg_mask, self.num_head)
+            input_attention_mask_list = _generate_length_attention_mask(input_key_attention_length,
+                input_src_shape[1], input_trg_shape[1], self.is_self, self.precision_dtype)
             
-            if self.layer_norm == True:
-                input_src_attention, input_src_attention_mask = self.src_norm_layer(input_src_attention, input_src_attention_mask)
-                input_trg_attention, input_trg_attention_mask = self.trg_norm_layer(input_trg_attention, input_trg_attention_mask)
+            input_attention_score = _generate_attention_score(input_query_attention,
+                input_key_attention, attention_matrix, self.score_type)
+            for input_attention_mask in input_attention_mask_list:
+                input_attention_score = generate_masked_data(input_attention_score, input_attention_mask)
             
-            input_query_attention = self.projection_layer["query"](input_src_attention)
-            input_key_attention = self.projection_layer["key"](input_trg_attention)
-            input_value_attention = self.projection_layer["value"](input_trg_attention)
+            input_attention_weight = tf.nn.softmax(input_attention_score, axis=-1)
+            for input_attention_mask in input_attention_mask_list:
+                input_attention_weight = input_attention_weight * input_attention_mask
             
-            input_query_attention = self.__split_multi_head(input_query_attention,
-                input_src_shape[0], input_src_shape[1], self.num_head)
-            input_key_attention = self.__split_multi_head(input_key_attention,
-                input_trg_shape[0], input_trg_shape[1], self.num_head)
-            input_value_attention = self.__split_multi_head(input_value_attention,
-                input_trg_shape[0], input_trg_shape[1], self.num_head)
+            input_attention_weight, _ = self.att_dropout_layer(input_attention_weight, input_attention_mask_list[0])
             
+            input_attention = tf.matmul(input_attention_weight, input_value_attention)
+        else:
             input_query_attention_mask = self.__split_multi_head_mask(input_src_attention_mask,
                 input_src_shape[0], input_src_shape[1], self.num_head)
             input_key_attention_mask = self.__split_multi_head_mask(input_trg_attention_mask,
                 input_trg_shape[0], input_trg_shape[1], self.num_head)
             
             input_attention_score = _generate_attention_score(input_query_attention,
-                input_key_attention, self.attention_matrix, self.score_type)
+                input_key_attention, attention_matrix, self.score_type)
             input_attention_mask = _generate_attention_mask(input_query_attention_mask,
                 input_key_attention_mask, self.is_self)
             input_attention_score = input_attention_score * input_attention_mask
@@ -996,20 +1304,12 @@ class MultiHeadAttention(object):
             input_attention_weight, _ = self.att_dropout_layer(input_attention_weight, input_attention_mask)
             
             input_attention = tf.matmul(input_attention_weight, input_value_attention)
-            input_attention = self.__merge_multi_head(input_attention,
-                input_src_shape[0], input_src_shape[1], self.num_head)
-            input_attention, _ = self.dropout_layer(input_attention, input_src_mask)
-            
-            if self.residual_connect == True and self.is_self == True:
-                output_attention, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_src_data, input_src_mask),
-                    lambda: (input_attention + input_src_data, input_src_mask))
-                output_attention = output_attention * output_mask
-            else:
-                output_attention = input_attention * input_src_mask
-                output_mask = input_src_mask
         
-        return output_attention, output_mask
+        input_attention = self.__merge_multi_head(input_attention,
+            input_src_shape[0], input_src_shape[1], self.num_head)
+        input_attention, _ = self.dropout_layer(input_attention, input_src_mask)
+        
+        return input_attention, input_src_mask
     
     def __split_multi_head(self,
                            input_data,
@@ -1039,6 +1339,17 @@ class MultiHeadAttention(object):
 
         return input_split_mask
     
+    def __split_multi_head_length(self,
+                                  input_mask,
+                                  num_head):
+        """split multi-head length, padding is assumed to be at the end of sequence"""
+        input_length = generate_mask_length(input_mask) # [batch_size]
+        input_split_length = tf.tile(tf.expand_dims(input_length, axis=-1),
+            multiples=[1, num_head]) # [batch_size, num_head]
+        input_split_length = tf.reshape(input_split_length, shape=[-1]) # [batch_size * num_head]
+        
+        return input_split_length
+    
     def __merge_multi_head(self,
                            input_data,
                            batch_size,
@@ -65,9 +65,12 @@ class LayerNorm(object):
                  input_mask):
         """call layer norm layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
-            input_mean, input_variance = tf.nn.moments(input_data, axes=[-1], keep_dims=True)
-            output_norm = (input_data - input_mean) / tf.sqrt(input_variance + EPSILON)
-            output_norm = output_norm * self.gamma + self.beta 
+            """compute moments in full precision and return activations in input precision"""
+            input_norm = tf.cast(input_data, dtype=tf.float32)
+            input_mean, input_variance = tf.nn.moments(input_norm, axes=[-1], keep_dims=True)
+            output_norm = (input_norm - input_mean) / tf.sqrt(input_variance + EPSILON)
+            output_norm = output_norm * self.gamma + self.beta
+            output_norm = tf.cast(output_norm, dtype=input_data.dtype)
             output_mask = input_mask
         
         return output_norm, output_mask
@@ -52,10 +52,11 @@ class Conv1D(object):
                 if self.activation == "relu" else create_variable_initializer("glorot_uniform", self.random_seed))
             bias_initializer = create_variable_initializer("zero")
             conv_activation = create_activation_function(self.activation)
+            self.precision_dtype = tf.get_variable_scope().dtype
             self.conv_layer = tf.layers.Conv1D(filters=self.num_filter, kernel_size=window_size,
                 strides=stride_size, padding=self.padding_type, activation=conv_activation, use_bias=self.use_bias,
-                kernel_initializer=weight_initializer, bias_initializer=bias_initializer,
-                kernel_regularizer=self.regularizer, bias_regularizer=self.regularizer, trainable=trainable)
+                kernel_initializer=weight_initializer, bias_initializer=bias_initializer, kernel_regularizer=self.regularizer,
+                bias_regularizer=self.regularizer, trainable=trainable, dtype=self.precision_dtype)
             
             self.dropout_layer = Dropout(rate=self.dropout, num_gpus=num_gpus,
                 default_gpu_id=default_gpu_id, random_seed=self.random_seed)
@@ -69,6 +70,8 @@ class Conv1D(object):
                  input_mask):
         """call 1d convolution layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
+            """keep activations in layer precision, casting back is left to the caller at model boundary"""
+            input_data = tf.cast(input_data, dtype=self.precision_dtype)
             input_data_shape = tf.shape(input_data)
             input_mask_shape = tf.shape(input_mask)
             shape_size = len(input_data.get_shape().as_list())
@@ -79,19 +82,11 @@ class Conv1D(object):
                 input_conv = input_data
                 input_conv_mask = input_mask
             
-            if self.layer_norm == True:
-                input_conv, input_conv_mask = self.norm_layer(input_conv, input_conv_mask)
-            
-            input_conv = self.conv_layer(input_conv)
-            
-            input_conv, input_conv_mask = self.dropout_layer(input_conv, input_conv_mask)
-            
             if self.residual_connect == True:
-                output_conv, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_data, input_mask),
-                    lambda: (input_conv + input_data, input_mask))
+                output_conv, output_mask = apply_stochastic_depth(lambda: self._call_sublayer(input_conv,
+                    input_conv_mask), input_data, input_mask, self.layer_dropout)
             else:
-                output_conv = input_conv
+                output_conv, _ = self._call_sublayer(input_conv, input_conv_mask)
                 output_mask = input_mask
             
             if shape_size > 3:
@@ -103,6 +98,19 @@ class Conv1D(object):
                     shape=tf.concat([input_mask_shape[:-2], output_mask_shape[-2:]], axis=0))
         
         return output_conv, output_mask
+    
+    def _call_sublayer(self,
+                       input_conv,
+                       input_conv_mask):
+        """call 1d convolution sublayer without residual connection"""
+        if self.layer_norm == True:
+            input_conv, input_conv_mask = self.norm_layer(input_conv, input_conv_mask)
+        
+        input_conv = self.conv_layer(input_conv)
+        
+        input_conv, input_conv_mask = self.dropout_layer(input_conv, input_conv_mask)
+        
+        return input_conv, input_conv_mask
 
 class MultiConv1D(object):
     """multi-window 1d convolution layer"""
@@ -217,15 +225,16 @@ class SeparableConv1D(object):
             weight_initializer = (create_variable_initializer("variance_scaling", self.random_seed)
                 if self.activation == "relu" else create_variable_initializer("glorot_uniform", self.random_seed))
             bias_initializer = create_variable_initializer("zero")
+            self.precision_dtype = tf.get_variable_scope().dtype
             self.depthwise_filter = tf.get_variable("depthwise_filter",
                 shape=[1, self.window_size, self.num_channel, self.num_multiplier], initializer=weight_initializer,
-                regularizer=self.regularizer, trainable=self.trainable, dtype=tf.float32)
+                regularizer=self.regularizer, trainable=self.trainable, dtype=self.precision_dtype)
             self.pointwise_filter = tf.get_variable("pointwise_filter",
                 shape=[1, 1, self.num_channel * self.num_multiplier, self.num_filter], initializer=weight_initializer,
-                regularizer=self.regularizer, trainable=self.trainable, dtype=tf.float32)
+                regularizer=self.regularizer, trainable=self.trainable, dtype=self.precision_dtype)
             if self.use_bias == True:
                 self.separable_bias = tf.get_variable("separable_bias", shape=[self.num_filter], initializer=bias_initializer,
-                    regularizer=self.regularizer, trainable=trainable, dtype=tf.float32)
+                    regularizer=self.regularizer, trainable=trainable, dtype=self.precision_dtype)
             
             self.strides = [1, 1, self.stride_size, 1]
             self.conv_activation = create_activation_function(self.activation)
@@ -242,6 +251,8 @@ class SeparableConv1D(object):
                  input_mask):
         """call depthwise-separable 1d convolution layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
+            """keep activations in layer precision, casting back is left to the caller at model boundary"""
+            input_data = tf.cast(input_data, dtype=self.precision_dtype)
             input_data_shape = tf.shape(input_data)
             input_mask_shape = tf.shape(input_mask)
             shape_size = len(input_data.get_shape().as_list())
@@ -252,27 +263,11 @@ class SeparableConv1D(object):
                 input_conv = input_data
                 input_conv_mask = input_mask
             
-            if self.layer_norm == True:
-                input_conv, input_conv_mask = self.norm_layer(input_conv, input_conv_mask)
-            
-            input_conv = tf.expand_dims(input_conv, axis=1)
-            input_conv = tf.nn.separable_conv2d(input_conv, self.depthwise_filter,
-                self.pointwise_filter, self.strides, self.padding_type)
-            input_conv = tf.squeeze(input_conv, axis=1)
-            
-            if self.use_bias == True:
-                input_conv = input_conv + self.separable_bias 
-            if self.conv_activation != None:
-                input_conv = self.conv_activation(input_conv)
-            
-            input_conv, input_conv_mask = self.dropout_layer(input_conv, input_conv_mask)
-            
             if self.residual_connect == True:
-                output_conv, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_data, input_mask),
-                    lambda: (input_conv + input_data, input_mask))
+                output_conv, output_mask = apply_stochastic_depth(lambda: self._call_sublayer(input_conv,
+                    input_conv_mask), input_data, input_mask, self.layer_dropout)
             else:
-                output_conv = input_conv
+                output_conv, _ = self._call_sublayer(input_conv, input_conv_mask)
                 output_mask = input_mask
             
             if shape_size > 3:
@@ -284,6 +279,27 @@ class SeparableConv1D(object):
                     shape=tf.concat([input_mask_shape[:-2], output_mask_shape[-2:]], axis=0))
         
         return output_conv, output_mask
+    
+    def _call_sublayer(self,
+                       input_conv,
+                       input_conv_mask):
+        """call depthwise-separable 1d convolution sublayer without residual connection"""
+        if self.layer_norm == True:
+            input_conv, input_conv_mask = self.norm_layer(input_conv, input_conv_mask)
+        
+        input_conv = tf.expand_dims(input_conv, axis=1)
+        input_conv = tf.nn.separable_conv2d(input_conv, self.depthwise_filter,
+            self.pointwise_filter, self.strides, self.padding_type)
+        input_conv = tf.squeeze(input_conv, axis=1)
+        
+        if self.use_bias == True:
+            input_conv = input_conv + self.separable_bias 
+        if self.conv_activation != None:
+            input_conv = self.conv_activation(input_conv)
+        
+        input_conv, input_conv_mask = self.dropout_layer(input_conv, input_conv_mask)
+        
+        return input_conv, input_conv_mask
 
 class MultiSeparableConv1D(object):
     """multi-window depthwise-separable 1d convolution layer"""
@@ -425,7 +441,8 @@ class StackedConv(object):
             for conv_layer in self.conv_layer_list:
                 input_conv, input_conv_mask = conv_layer(input_conv, input_conv_mask)
             
-            output_conv = input_conv
+            """activations stay in layer precision across stacked layers, only cast back on exit"""
+            output_conv = tf.cast(input_conv, dtype=input_data.dtype)
             output_mask = input_conv_mask
         
         return output_conv, output_mask
@@ -499,7 +516,8 @@ class StackedMultiConv(object):
             for conv_layer in self.conv_layer_list:
                 input_conv, input_conv_mask = conv_layer(input_conv, input_conv_mask)
             
-            output_conv = input_conv
+            """activations stay in layer precision across stacked layers, only cast back on exit"""
+            output_conv = tf.cast(input_conv, dtype=input_data.dtype)
             output_mask = input_conv_mask
         
         return output_conv, output_mask
@@ -575,7 +593,8 @@ class StackedSeparableConv(object):
             for conv_layer in self.conv_layer_list:
                 input_conv, input_conv_mask = conv_layer(input_conv, input_conv_mask)
             
-            output_conv = input_conv
+            """activations stay in layer precision across stacked layers, only cast back on exit"""
+            output_conv = tf.cast(input_conv, dtype=input_data.dtype)
             output_mask = input_conv_mask
         
         return output_conv, output_mask
@@ -651,7 +670,8 @@ class StackedMultiSeparableConv(object):
             for conv_layer in self.conv_layer_list:
                 input_conv, input_conv_mask = conv_layer(input_conv, input_conv_mask)
             
-            output_conv = input_conv
+            """activations stay in layer precision across stacked layers, only cast back on exit"""
+            output_conv = tf.cast(input_conv, dtype=input_data.dtype)
             output_mask = input_conv_mask
         
         return output_conv, output_mask
@@ -39,11 +39,12 @@ class Dense(object):
         self.device_spec = get_device_spec(default_gpu_id, num_gpus)
         
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
+            self.precision_dtype = tf.get_variable_scope().dtype
             weight_initializer = create_variable_initializer("glorot_uniform", self.random_seed)
             bias_initializer = create_variable_initializer("zero")
             self.dense_layer = tf.layers.Dense(units=self.unit_dim, activation=None, use_bias=self.use_bias,
-                kernel_initializer=weight_initializer, bias_initializer=bias_initializer,
-                kernel_regularizer=self.regularizer, bias_regularizer=self.regularizer, trainable=self.trainable)
+                kernel_initializer=weight_initializer, bias_initializer=bias_initializer, kernel_regularizer=self.regularizer,
+                bias_regularizer=self.regularizer, trainable=self.trainable, dtype=self.precision_dtype)
             
             self.dense_activation = create_activation_function(self.activation)
             
@@ -59,28 +60,34 @@ class Dense(object):
                  input_mask):
         """call dense layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
-            input_dense = input_data
-            input_dense_mask = input_mask
-            
-            if self.layer_norm == True:
-                input_dense, input_dense_mask = self.norm_layer(input_dense, input_dense_mask)
-            
-            input_dense = self.dense_layer(input_dense)
-            
-            if self.dense_activation != None:
-                input_dense = self.dense_activation(input_dense)
-            
-            input_dense, input_dense_mask = self.dropout_layer(input_dense, input_dense_mask)
-            
+            """keep activations in layer precision, casting back is left to the caller at model boundary"""
+            input_data = tf.cast(input_data, dtype=self.precision_dtype)
             if self.residual_connect == True:
-                output_dense, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_data, input_mask),
-                    lambda: (input_dense + input_data, input_mask))
+                output_dense, output_mask = apply_stochastic_depth(lambda: self._call_sublayer(input_data,
+                    input_mask), input_data, input_mask, self.layer_dropout)
             else:
-                output_dense = input_dense
-                output_mask = input_dense_mask
+                output_dense, output_mask = self._call_sublayer(input_data, input_mask)
         
         return output_dense, output_mask
+    
+    def _call_sublayer(self,
+                       input_data,
+                       input_mask):
+        """call dense sublayer without residual connection"""
+        input_dense = input_data
+        input_dense_mask = input_mask
+        
+        if self.layer_norm == True:
+            input_dense, input_dense_mask = self.norm_layer(input_dense, input_dense_mask)
+        
+        input_dense = self.dense_layer(input_dense)
+        
+        if self.dense_activation != None:
+            input_dense = self.dense_activation(input_dense)
+        
+        input_dense, input_dense_mask = self.dropout_layer(input_dense, input_dense_mask)
+        
+        return input_dense, input_dense_mask
 
 class DoubleDense(object):
     """double-dense layer"""
@@ -115,14 +122,15 @@ class DoubleDense(object):
         self.device_spec = get_device_spec(default_gpu_id, num_gpus)
         
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
+            self.precision_dtype = tf.get_variable_scope().dtype
             weight_initializer = create_variable_initializer("glorot_uniform", self.random_seed)
             bias_initializer = create_variable_initializer("zero")
             self.inner_dense_layer = tf.layers.Dense(units=self.unit_dim * self.inner_scale, activation=None, use_bias=self.use_bias,
-                kernel_initializer=weight_initializer, bias_initializer=bias_initializer,
-                kernel_regularizer=self.regularizer, bias_regularizer=self.regularizer, trainable=self.trainable)
+                kernel_initializer=weight_initializer, bias_initializer=bias_initializer, kernel_regularizer=self.regularizer,
+                bias_regularizer=self.regularizer, trainable=self.trainable, dtype=self.precision_dtype)
             self.outer_dense_layer = tf.layers.Dense(units=self.unit_dim, activation=None, use_bias=self.use_bias,
-                kernel_initializer=weight_initializer, bias_initializer=bias_initializer,
-                kernel_regularizer=self.regularizer, bias_regularizer=self.regularizer, trainable=self.trainable)
+                kernel_initializer=weight_initializer, bias_initializer=bias_initializer, kernel_regularizer=self.regularizer,
+                bias_regularizer=self.regularizer, trainable=self.trainable, dtype=self.precision_dtype)
             
             self.dense_activation = create_activation_function(self.activation)
             
@@ -138,30 +146,36 @@ class DoubleDense(object):
                  input_mask):
         """call double-dense layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
-            input_dense = input_data
-            input_dense_mask = input_mask
-            
-            if self.layer_norm == True:
-                input_dense, input_dense_mask = self.norm_layer(input_dense, input_dense_mask)
-            
-            input_dense = self.inner_dense_layer(input_dense)
-            
-            if self.dense_activation != None:
-                input_dense = self.dense_activation(input_dense)
-            
-            input_dense = self.outer_dense_layer(input_dense)
-            
-            input_dense, input_dense_mask = self.dropout_layer(input_dense, input_dense_mask)
-            
+            """keep activations in layer precision, casting back is left to the caller at model boundary"""
+            input_data = tf.cast(input_data, dtype=self.precision_dtype)
             if self.residual_connect == True:
-                output_dense, output_mask = tf.cond(tf.random_uniform([]) < self.layer_dropout,
-                    lambda: (input_data, input_mask),
-                    lambda: (input_dense + input_data, input_mask))
+                output_dense, output_mask = apply_stochastic_depth(lambda: self._call_sublayer(input_data,
+                    input_mask), input_data, input_mask, self.layer_dropout)
             else:
-                output_dense = input_dense
-                output_mask = input_dense_mask
+                output_dense, output_mask = self._call_sublayer(input_data, input_mask)
         
         return output_dense, output_mask
+    
+    def _call_sublayer(self,
+                       input_data,
+                       input_mask):
+        """call double-dense sublayer without residual connection"""
+        input_dense = input_data
+        input_dense_mask = input_mask
+        
+        if self.layer_norm == True:
+            input_dense, input_dense_mask = self.norm_layer(input_dense, input_dense_mask)
+        
+        input_dense = self.inner_dense_layer(input_dense)
+        
+        if self.dense_activation != None:
+            input_dense = self.dense_activation(input_dense)
+        
+        input_dense = self.outer_dense_layer(input_dense)
+        
+        input_dense, input_dense_mask = self.dropout_layer(input_dense, input_dense_mask)
+        
+        return input_dense, input_dense_mask
 
 class StackedDense(object):
     """stacked dense layer"""
@@ -223,7 +237,8 @@ class StackedDense(object):
             for dense_layer in self.dense_layer_list:
                 input_dense, input_dense_mask = dense_layer(input_dense, input_dense_mask)
             
-            output_dense = input_dense
+            """activations stay in layer precision across stacked layers, only cast back on exit"""
+            output_dense = tf.cast(input_dense, dtype=input_data.dtype)
             output_mask = input_dense_mask
         
         return output_dense, output_mask
@@ -290,7 +305,8 @@ class StackedDoubleDense(object):
             for dense_layer in self.dense_layer_list:
                 input_dense, input_dense_mask = dense_layer(input_dense, input_dense_mask)
             
-            output_dense = input_dense
+            """activations stay in layer precision across stacked layers, only cast back on exit"""
+            output_dense = tf.cast(input_dense, dtype=input_data.dtype)
             output_mask = input_dense_mask
         
         return output_dense, output_mask
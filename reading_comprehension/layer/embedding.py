@@ -49,6 +49,7 @@ class PretrainedEmbedding(object):
                  default_gpu_id=0,
                  regularizer=None,
                  trainable=True,
+                 trainable_size=0,
                  scope="pretrained_embedding"):
         """initialize pretrained embedding layer"""
         self.vocab_size = vocab_size
@@ -56,18 +57,38 @@ class PretrainedEmbedding(object):
         self.embed_data = embed_data
         self.regularizer = regularizer if trainable == True else None
         self.trainable = trainable
+        self.trainable_size = trainable_size if trainable == True and 0 < trainable_size < vocab_size else 0
         self.scope = scope
         self.device_spec = get_device_spec(default_gpu_id, num_gpus)
         
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
-            initializer = tf.constant_initializer(self.embed_data)
-            self.embedding = tf.get_variable("pretrained_embedding", shape=[self.vocab_size, self.embed_dim],
-                initializer=initializer, regularizer=self.regularizer, trainable=self.trainable, dtype=tf.float32)
+            if self.trainable_size > 0:
+                """only top-n frequent words are fine-tuned, rest words live in frozen table outside optimizer"""
+                trainable_data = self.embed_data[:self.trainable_size] if np.ndim(self.embed_data) > 0 else self.embed_data
+                frozen_data = self.embed_data[self.trainable_size:] if np.ndim(self.embed_data) > 0 else self.embed_data
+                self.embedding = tf.get_variable("pretrained_embedding", shape=[self.trainable_size, self.embed_dim],
+                    initializer=tf.constant_initializer(trainable_data), regularizer=self.regularizer, trainable=True, dtype=tf.float32)
+                self.frozen_embedding = tf.get_variable("frozen_embedding", shape=[self.vocab_size - self.trainable_size, self.embed_dim],
+                    initializer=tf.constant_initializer(frozen_data), trainable=False, dtype=tf.float32)
+            else:
+                initializer = tf.constant_initializer(self.embed_data)
+                self.embedding = tf.get_variable("pretrained_embedding", shape=[self.vocab_size, self.embed_dim],
+                    initializer=initializer, regularizer=self.regularizer, trainable=self.trainable, dtype=tf.float32)
     
     def __call__(self,
                  input_data):
         """call pretrained embedding layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE), tf.device(self.device_spec):
-            output_embedding = tf.nn.embedding_lookup(self.embedding, input_data)
+            if self.trainable_size > 0:
+                """vocab is sorted by frequency, so id below trainable size indexes trainable table & gets sparse gradient"""
+                input_trainable = tf.less(input_data, self.trainable_size)
+                input_trainable_data = tf.where(input_trainable, input_data, tf.zeros_like(input_data))
+                input_frozen_data = tf.where(input_trainable, tf.zeros_like(input_data), input_data - self.trainable_size)
+                trainable_embedding = tf.nn.embedding_lookup(self.embedding, input_trainable_data)
+                frozen_embedding = tf.nn.embedding_lookup(self.frozen_embedding, input_frozen_data)
+                input_trainable_mask = tf.expand_dims(tf.cast(input_trainable, dtype=tf.float32), axis=-1)
+                output_embedding = trainable_embedding * input_trainable_mask + frozen_embedding * (1.0 - input_trainable_mask)
+            else:
+                output_embedding = tf.nn.embedding_lookup(self.embedding, input_data)
         
         return output_embedding
@@ -37,7 +37,7 @@ class SinusoidPosition(object):
             signal = tf.pad(signal, paddings=[[0, 0], [0, tf.mod(channel, 2)]])
             signal = tf.reshape(signal, shape=[1, length, channel])
             
-            output_signal = input_data + signal
+            output_signal = input_data + tf.cast(signal, dtype=input_data.dtype)
             output_mask = input_mask
         
         return output_signal, output_mask
@@ -75,7 +75,7 @@ class AbsolutePosition(object):
             input_shape = tf.shape(input_data)
             max_length = input_shape[-2]
             position_embedding = self.position_embedding[:,:max_length,:]
-            output_signal = input_data + position_embedding
+            output_signal = input_data + tf.cast(position_embedding, dtype=input_data.dtype)
             output_mask = input_mask
         
         return output_signal, output_mask
@@ -1,8 +1,6 @@
 import numpy as np
 import tensorflow as tf
 
-from tensorflow.contrib.rnn import RNNCell
-
 from util.default_util import *
 from util.reading_comprehension_util import *
 
@@ -83,7 +81,7 @@ def _create_recurrent_cell(num_layer,
 
         cell_list.append(single_cell)
 
-    cell = tf.contrib.rnn.MultiRNNCell(cell_list)
+    cell = tf.nn.rnn_cell.MultiRNNCell(cell_list)
     
     return cell
 
@@ -135,7 +133,7 @@ class RNN(object):
                 input_data = tf.reshape(input_data, shape=tf.concat([[-1], input_data_shape[-2:]], axis=0))
                 input_mask = tf.reshape(input_mask, shape=tf.concat([[-1], input_mask_shape[-2:]], axis=0))
             
-            input_length = tf.cast(tf.reduce_sum(tf.squeeze(input_mask, axis=-1), axis=-1), dtype=tf.int32)
+            input_length = generate_mask_length(input_mask)
             output_recurrent, final_state_recurrent = tf.nn.dynamic_rnn(cell=self.cell,
                 inputs=input_data, sequence_length=input_length, dtype=input_data.dtype)
             output_mask = input_mask
@@ -211,7 +209,7 @@ class BiRNN(object):
                 input_data = tf.reshape(input_data, shape=tf.concat([[-1], input_data_shape[-2:]], axis=0))
                 input_mask = tf.reshape(input_mask, shape=tf.concat([[-1], input_mask_shape[-2:]], axis=0))
             
-            input_length = tf.cast(tf.reduce_sum(tf.squeeze(input_mask, axis=-1), axis=-1), dtype=tf.int32)
+            input_length = generate_mask_length(input_mask)
             output_recurrent, final_state_recurrent = tf.nn.bidirectional_dynamic_rnn(cell_fw=self.fwd_cell,
                 cell_bw=self.bwd_cell, inputs=input_data, sequence_length=input_length, dtype=input_data.dtype)
             
@@ -245,7 +243,7 @@ class BiRNN(object):
         
         return output_recurrent, output_mask, final_state_recurrent, final_state_mask
 
-class AttentionCellWrapper(RNNCell):
+class AttentionCellWrapper(tf.nn.rnn_cell.RNNCell):
     def __init__(self,
                  cell,
                  attention_mechanism):
@@ -1,5 +1,6 @@
 import collections
 import os.path
+import time
 
 import numpy as np
 import tensorflow as tf
@@ -11,7 +12,7 @@ from util.layer_util import *
 __all__ = ["TrainResult", "InferResult", "BaseModel"]
 
 class TrainResult(collections.namedtuple("TrainResult",
-    ("loss", "learning_rate", "global_step", "batch_size", "summary"))):
+    ("loss", "learning_rate", "global_step", "batch_size", "token_size", "input_time", "compute_time", "summary"))):
     pass
 
 class InferResult(collections.namedtuple("InferResult",
@@ -35,24 +36,45 @@ class BaseModel(object):
         self.scope = scope
         
         self.update_op = None
+        self.accumulate_op = None
+        self.accumulate_count = 0
+        self.gradient_optimizer = None
+        self.loss_scale_manager = None
         self.train_loss = None
         self.learning_rate = None
         self.global_step = None
+        self.train_position = None
         self.train_summary = None
         self.infer_answer_start = None
         self.infer_answer_start_mask = None
         self.infer_answer_end = None
         self.infer_answer_end_mask = None
         self.infer_summary = None
+        self.subword_feat_layer = None
+        self.char_feat_layer = None
         
         self.word_embedding = external_data["word_embedding"] if external_data is not None and "word_embedding" in external_data else None
+        self.subword_feat_table = external_data["subword_feat_table"] if external_data is not None and "subword_feat_table" in external_data else None
+        self.char_feat_table = external_data["char_feat_table"] if external_data is not None and "char_feat_table" in external_data else None
         self.batch_size = tf.size(tf.reduce_max(self.data_pipeline.input_answer_mask, axis=-2))
+        self.token_size = self._get_token_size()
         
         self.num_gpus = self.hyperparams.device_num_gpus
         self.default_gpu_id = self.hyperparams.device_default_gpu_id
         self.logger.log_print("# {0} gpus are used with default gpu id set as {1}"
             .format(self.num_gpus, self.default_gpu_id))
         
+        self.precision_dtype = get_precision_dtype(self.hyperparams.device_precision_type)
+        self.logger.log_print("# {0} precision is used for layer computation with float32 master weights"
+            .format(self.hyperparams.device_precision_type))
+        
+        if self.hyperparams.device_distributed_enable == True:
+            self.num_replicas = len(self.hyperparams.device_worker_hosts)
+            self.logger.log_print("# {0} worker replicas are used for synchronous distributed training"
+                .format(self.num_replicas))
+        else:
+            self.num_replicas = 1
+        
         if self.hyperparams.train_regularization_enable == True:
             self.regularizer = create_weight_regularizer(self.hyperparams.train_regularization_type,
                 self.hyperparams.train_regularization_scale)
@@ -61,6 +83,24 @@ class BaseModel(object):
         
         self.random_seed = self.hyperparams.train_random_seed if self.hyperparams.train_enable_debugging else None
     
+    def _get_token_size(self):
+        """get number of question & context tokens in batch"""
+        mask_list = [(self.data_pipeline.input_question_word_mask, self.data_pipeline.input_context_word_mask),
+            (self.data_pipeline.input_question_subword_mask, self.data_pipeline.input_context_subword_mask),
+            (self.data_pipeline.input_question_char_mask, self.data_pipeline.input_context_char_mask)]
+        for question_mask, context_mask in mask_list:
+            if question_mask is not None and context_mask is not None:
+                """a token is counted once if any of its chars/subwords is present"""
+                question_token_mask = tf.reduce_max(question_mask,
+                    axis=list(range(2, question_mask.get_shape().ndims)))
+                context_token_mask = tf.reduce_max(context_mask,
+                    axis=list(range(2, context_mask.get_shape().ndims)))
+                question_token_size = tf.reduce_sum(question_token_mask)
+                context_token_size = tf.reduce_sum(context_token_mask)
+                return tf.cast(question_token_size + context_token_size, dtype=tf.int64)
+        
+        return tf.constant(0, shape=[], dtype=tf.int64)
+    
     def _create_fusion_layer(self,
                              input_unit_dim,
                              output_unit_dim,
@@ -206,6 +246,27 @@ class BaseModel(object):
         else:
             raise ValueError("unsupported optimizer type {0}".format(optimizer_type))
         
+        gradient_optimizer = None
+        """bfloat16 shares float32 exponent range, so small gradients never underflow and only float16 needs loss scaling"""
+        if self.precision_dtype == tf.float16:
+            self.loss_scale_manager = tf.contrib.mixed_precision.ExponentialUpdateLossScaleManager(
+                init_loss_scale=self.hyperparams.train_optimizer_loss_scale_init,
+                incr_every_n_steps=self.hyperparams.train_optimizer_loss_scale_incr_step)
+            loss_scale_optimizer = tf.contrib.mixed_precision.LossScaleOptimizer(optimizer, self.loss_scale_manager)
+            if self.hyperparams.train_optimizer_accumulate_enable == True:
+                """only scale loss for gradient computation, finiteness is checked per micro-batch on accumulation"""
+                gradient_optimizer = loss_scale_optimizer
+            else:
+                optimizer = loss_scale_optimizer
+        
+        if self.hyperparams.device_distributed_enable == True:
+            variable_averages = self.ema if self.hyperparams.train_ema_enable == True else None
+            optimizer = tf.train.SyncReplicasOptimizer(optimizer, replicas_to_aggregate=self.num_replicas,
+                total_num_replicas=self.num_replicas, variable_averages=variable_averages,
+                variables_to_average=tf.trainable_variables())
+        
+        self.gradient_optimizer = gradient_optimizer if gradient_optimizer is not None else optimizer
+        
         return optimizer
     
     def _minimize_loss(self,
@@ -213,9 +274,9 @@ class BaseModel(object):
         """minimize optimization loss"""
         """compute gradients"""
         if self.num_gpus > 1:
-            grads_and_vars = self.optimizer.compute_gradients(loss, colocate_gradients_with_ops=True)
+            grads_and_vars = self.gradient_optimizer.compute_gradients(loss, colocate_gradients_with_ops=True)
         else:
-            grads_and_vars = self.optimizer.compute_gradients(loss, colocate_gradients_with_ops=False)
+            grads_and_vars = self.gradient_optimizer.compute_gradients(loss, colocate_gradients_with_ops=False)
         
         """clip gradients"""
         gradients = [x[0] for x in grads_and_vars]
@@ -223,60 +284,192 @@ class BaseModel(object):
         clipped_gradients, gradient_norm = tf.clip_by_global_norm(gradients, self.hyperparams.train_clip_norm)
         grads_and_vars = zip(clipped_gradients, variables)
         
+        if self.hyperparams.train_optimizer_accumulate_enable == True:
+            return self._minimize_loss_with_accumulation(grads_and_vars, clipped_gradients, gradient_norm)
+        
         """update model based on gradients"""
         update_model = self.optimizer.apply_gradients(grads_and_vars, global_step=self.global_step)
         
         return update_model, clipped_gradients, gradient_norm
     
+    def _minimize_loss_with_accumulation(self,
+                                         grads_and_vars,
+                                         clipped_gradients,
+                                         gradient_norm):
+        """minimize optimization loss with gradients accumulated over multiple micro-batches"""
+        accumulate_step = self.hyperparams.train_optimizer_accumulate_step
+        if accumulate_step < 1:
+            raise ValueError("accumulate step {0} must be positive".format(accumulate_step))
+        
+        """skip micro-batches with non-finite gradients so they never reach accumulated gradients"""
+        gradient_finite = tf.is_finite(gradient_norm)
+        
+        """accumulate averaged gradients in non-trainable variables"""
+        accumulate_ops = []
+        if self.loss_scale_manager is not None:
+            accumulate_ops.append(self.loss_scale_manager.update_loss_scale(gradient_finite))
+        
+        accumulated_gradients = []
+        accumulated_grads_and_vars = []
+        with tf.variable_scope("gradient_accumulation", reuse=tf.AUTO_REUSE):
+            for i, (gradient, variable) in enumerate(grads_and_vars):
+                if gradient is None:
+                    continue
+                
+                if isinstance(gradient, tf.IndexedSlices):
+                    """accumulate indices & values of sparse gradients, so embedding updates stay sparse without full-size buffers"""
+                    with tf.colocate_with(variable):
+                        accumulated_indice = tf.get_variable("accumulated_indice_{0}".format(i),
+                            initializer=tf.zeros(shape=[0], dtype=gradient.indices.dtype),
+                            validate_shape=False, trainable=False)
+                        accumulated_value = tf.get_variable("accumulated_value_{0}".format(i),
+                            initializer=tf.zeros(shape=[0] + variable.shape.as_list()[1:], dtype=variable.dtype.base_dtype),
+                            validate_shape=False, trainable=False)
+                    
+                    gradient_indice = tf.cond(gradient_finite,
+                        lambda: gradient.indices, lambda: gradient.indices[:0])
+                    gradient_value = tf.cond(gradient_finite,
+                        lambda: gradient.values / accumulate_step, lambda: gradient.values[:0])
+                    accumulate_ops.append(tf.assign(accumulated_indice,
+                        tf.concat([accumulated_indice, gradient_indice], axis=0), validate_shape=False))
+                    accumulate_ops.append(tf.assign(accumulated_value,
+                        tf.concat([accumulated_value, gradient_value], axis=0), validate_shape=False))
+                    
+                    accumulated_gradients.append((accumulated_indice, accumulated_value))
+                    accumulated_grads_and_vars.append(((accumulated_indice, accumulated_value), variable))
+                else:
+                    with tf.colocate_with(variable):
+                        accumulated_gradient = tf.get_variable("accumulated_gradient_{0}".format(i),
+                            shape=variable.shape, dtype=variable.dtype.base_dtype,
+                            initializer=tf.zeros_initializer(), trainable=False)
+                    
+                    averaged_gradient = tf.cond(gradient_finite,
+                        lambda: gradient / accumulate_step, lambda: tf.zeros_like(gradient))
+                    accumulate_ops.append(tf.assign_add(accumulated_gradient, averaged_gradient))
+                    
+                    accumulated_gradients.append(accumulated_gradient)
+                    accumulated_grads_and_vars.append((accumulated_gradient, variable))
+        
+        self.accumulate_op = tf.group(*accumulate_ops)
+        
+        """update model based on accumulated gradients, then reset accumulated gradients"""
+        with tf.control_dependencies([self.accumulate_op]):
+            apply_grads_and_vars = []
+            for accumulated_gradient, variable in accumulated_grads_and_vars:
+                if isinstance(accumulated_gradient, tuple):
+                    accumulated_indice, accumulated_value = accumulated_gradient
+                    apply_gradient = tf.IndexedSlices(values=tf.identity(accumulated_value),
+                        indices=tf.identity(accumulated_indice), dense_shape=tf.shape(variable, out_type=accumulated_indice.dtype))
+                else:
+                    apply_gradient = tf.identity(accumulated_gradient)
+                
+                apply_grads_and_vars.append((apply_gradient, variable))
+        
+        apply_model = self.optimizer.apply_gradients(apply_grads_and_vars, global_step=self.global_step)
+        
+        with tf.control_dependencies([apply_model]):
+            reset_ops = []
+            for accumulated_gradient in accumulated_gradients:
+                if isinstance(accumulated_gradient, tuple):
+                    reset_ops.extend([tf.assign(accumulated_variable, accumulated_variable[:0], validate_shape=False)
+                        for accumulated_variable in accumulated_gradient])
+                else:
+                    reset_ops.append(tf.assign(accumulated_gradient, tf.zeros_like(accumulated_gradient)))
+            
+            update_model = tf.group(*reset_ops)
+        
+        return update_model, clipped_gradients, gradient_norm
+    
     def train(self,
-              sess):
+              sess,
+              run_metadata=None):
         """train model"""
-        _, loss, learning_rate, global_step, batch_size, summary = sess.run([self.update_op,
-            self.train_loss, self.decayed_learning_rate, self.global_step, self.batch_size, self.train_summary])
+        update_op = self.update_op
+        if self.accumulate_op is not None:
+            """only apply accumulated gradients on every k-th micro-batch"""
+            self.accumulate_count += 1
+            if self.accumulate_count % self.hyperparams.train_optimizer_accumulate_step != 0:
+                update_op = self.accumulate_op
+        
+        """trace full run when run metadata is requested for profiling"""
+        run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE) if run_metadata is not None else None
+        
+        """trace step stats to measure input wait on iterator apart from compute"""
+        if self.hyperparams.train_step_breakdown_enable == True and run_metadata is None:
+            run_options = tf.RunOptions(trace_level=tf.RunOptions.SOFTWARE_TRACE)
+            run_metadata = tf.RunMetadata()
+        
+        start_time = time.time()
+        (_, loss, learning_rate, global_step, batch_size, token_size,
+            summary) = sess.run([update_op, self.train_loss, self.decayed_learning_rate, self.global_step,
+                self.batch_size, self.token_size, self.train_summary], options=run_options, run_metadata=run_metadata)
+        end_time = time.time()
+        
+        input_time = 0.0
+        if self.hyperparams.train_step_breakdown_enable == True:
+            input_time = min(self._get_input_time(run_metadata), end_time - start_time)
         
-        return TrainResult(loss=loss, learning_rate=learning_rate,
-            global_step=global_step, batch_size=batch_size, summary=summary)
+        return TrainResult(loss=loss, learning_rate=learning_rate, global_step=global_step,
+            batch_size=batch_size, token_size=token_size, input_time=input_time,
+            compute_time=end_time-start_time-input_time, summary=summary)
+    
+    def _get_input_time(self,
+                        run_metadata):
+        """get time spent waiting on iterator from step stats"""
+        input_op_name = self.data_pipeline.batch_data[0].op.name
+        input_time = 0.0
+        for device_stat in run_metadata.step_stats.dev_stats:
+            for node_stat in device_stat.node_stats:
+                if node_stat.node_name == input_op_name:
+                    input_time = max(input_time, node_stat.all_end_rel_micros / 1e6)
+        
+        return input_time
+    
+    def is_update_step(self):
+        """check whether next train step applies model update rather than only accumulating gradients"""
+        if self.accumulate_op is None:
+            return True
+        
+        return (self.accumulate_count + 1) % self.hyperparams.train_optimizer_accumulate_step == 0
     
     def infer(self,
-              sess):
+              sess,
+              run_metadata=None):
         """infer model"""
+        run_options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE) if run_metadata is not None else None
         (answer_start, answer_end, answer_start_mask, answer_end_mask,
             batch_size, summary) = sess.run([self.infer_answer_start, self.infer_answer_end,
-                self.infer_answer_start_mask, self.infer_answer_end_mask, self.batch_size, self.infer_summary])
-        
-        max_context_length = self.hyperparams.data_max_context_length
-        max_answer_length = self.hyperparams.data_max_answer_length
-        
-        predict_start = np.expand_dims(answer_start[:max_context_length], axis=-1)
-        predict_start_mask = np.expand_dims(answer_start_mask[:max_context_length], axis=-1)
-        predict_start_start = predict_start * predict_start_mask
-        predict_end = np.expand_dims(answer_end[:max_context_length], axis=-1)
-        predict_end_mask = np.expand_dims(answer_end_mask[:max_context_length], axis=-1)
-        predict_end = predict_end * predict_end_mask
-        
-        predict_span = np.matmul(predict_start, predict_end.transpose((0,2,1)))
-        predict_span_mask = np.matmul(predict_start_mask, predict_end_mask.transpose((0,2,1)))
-        predict_span = predict_span * predict_span_mask
-        
-        predict = np.full((batch_size, 2), -1)
-        for k in range(batch_size):
-            max_prob = float('-inf')
-            max_prob_start = -1
-            max_prob_end = -1
-            for i in range(max_context_length):
-                for j in range(i, min(max_context_length, i+max_answer_length)):
-                    if predict_span[k, i, j] > max_prob:
-                        max_prob = predict_span[k, i, j]
-                        max_prob_start = i
-                        max_prob_end = j
-            
-            predict[k, 0] = max_prob_start
-            predict[k, 1] = max_prob_end
+                self.infer_answer_start_mask, self.infer_answer_end_mask, self.batch_size, self.infer_summary],
+                options=run_options, run_metadata=run_metadata)
         
-        predict_detail = np.concatenate((predict_start, predict_end), axis=-1)
+        predict, predict_detail = decode_answer_span(answer_start, answer_end, answer_start_mask, answer_end_mask,
+            batch_size, self.hyperparams.data_max_context_length, self.hyperparams.data_max_answer_length)
         
         return InferResult(predict=predict, predict_detail=predict_detail, batch_size=batch_size, summary=summary)
     
+    def _create_train_position(self):
+        """create train position variable, stored in checkpoint as epoch, step in epoch & micro-batch count"""
+        self.train_position = tf.get_variable("train_position", shape=[3], dtype=tf.int64,
+            initializer=tf.zeros_initializer, trainable=False)
+        self.train_position_placeholder = tf.placeholder(shape=[3], dtype=tf.int64)
+        self.train_position_assign_op = tf.assign(self.train_position, self.train_position_placeholder)
+    
+    def set_train_position(self,
+                           sess,
+                           epoch,
+                           step_in_epoch):
+        """set train position before saving checkpoint"""
+        sess.run(self.train_position_assign_op, feed_dict={
+            self.train_position_placeholder: [epoch, step_in_epoch, self.accumulate_count]})
+    
+    def get_train_position(self,
+                           sess):
+        """get train position after restoring checkpoint"""
+        epoch, step_in_epoch, accumulate_count = sess.run(self.train_position)
+        self.accumulate_count = int(accumulate_count)
+        
+        return int(epoch), int(step_in_epoch)
+    
     def _get_train_summary(self):
         """get train summary"""
         return tf.summary.merge([tf.summary.scalar("learning_rate", self.learning_rate),
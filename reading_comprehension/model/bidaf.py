@@ -7,6 +7,7 @@ import tensorflow as tf
 from util.default_util import *
 from util.reading_comprehension_util import *
 from util.layer_util import *
+from util.ckpt_writer import *
 
 from model.base_model import *
 
@@ -25,9 +26,12 @@ class BiDAF(BaseModel):
         super(BiDAF, self).__init__(logger=logger, hyperparams=hyperparams,
             data_pipeline=data_pipeline, external_data=external_data, mode=mode, scope=scope)
         
-        with tf.variable_scope(scope, reuse=tf.AUTO_REUSE):
+        with tf.variable_scope(scope, reuse=tf.AUTO_REUSE, dtype=self.precision_dtype,
+                custom_getter=create_master_weight_getter()):
             self.global_step = tf.get_variable("global_step", shape=[], dtype=tf.int32,
                 initializer=tf.zeros_initializer, trainable=False)
+            if self.mode == "train":
+                self._create_train_position()
                         
             """get batch input from data pipeline"""
             question_word = self.data_pipeline.input_question_word
@@ -93,7 +97,8 @@ class BiDAF(BaseModel):
                 self.train_loss = tf.reduce_mean(start_loss + end_loss)
                 
                 if self.hyperparams.train_regularization_enable == True:
-                    regularization_variables = tf.get_collection(tf.GraphKeys.REGULARIZATION_LOSSES)
+                    regularization_variables = [tf.cast(regularization_variable, dtype=tf.float32)
+                        for regularization_variable in tf.get_collection(tf.GraphKeys.REGULARIZATION_LOSSES)]
                     regularization_loss = tf.contrib.layers.apply_regularization(self.regularizer, regularization_variables)
                     self.train_loss = self.train_loss + regularization_loss
                 
@@ -122,7 +127,7 @@ class BiDAF(BaseModel):
                 self.logger.log_print("# setup loss minimization mechanism")
                 self.opt_op, self.clipped_gradients, self.gradient_norm = self._minimize_loss(self.train_loss)
                 
-                if self.hyperparams.train_ema_enable == True:
+                if self.hyperparams.train_ema_enable == True and self.hyperparams.device_distributed_enable == False:
                     with tf.control_dependencies([self.opt_op]):
                         self.update_op = self.ema.apply(tf.trainable_variables())
                 else:
@@ -154,6 +159,13 @@ class BiDAF(BaseModel):
             if self.mode == "train":
                 self.ckpt_debug_saver = tf.train.Saver()
                 self.ckpt_epoch_saver = tf.train.Saver(max_to_keep=self.hyperparams.train_num_epoch) 
+            
+            self.ckpt_debug_writer = None
+            self.ckpt_epoch_writer = None
+            if self.mode == "train" and self.hyperparams.train_ckpt_async_enable == True:
+                self.ckpt_debug_writer = CheckpointWriter(tf.global_variables(), self.ckpt_debug_name)
+                self.ckpt_epoch_writer = CheckpointWriter(tf.global_variables(), self.ckpt_epoch_name,
+                    max_to_keep=self.hyperparams.train_num_epoch)
     
     def _build_representation_layer(self,
                                     input_question_word,
@@ -173,6 +185,7 @@ class BiDAF(BaseModel):
         word_embed_dim = self.hyperparams.model_representation_word_embed_dim
         word_embed_pretrained = self.hyperparams.model_representation_word_embed_pretrained
         word_feat_trainable = self.hyperparams.model_representation_word_feat_trainable
+        word_feat_trainable_size = self.hyperparams.model_representation_word_feat_trainable_size
         word_feat_enable = self.hyperparams.model_representation_word_feat_enable
         subword_vocab_size = self.hyperparams.data_subword_vocab_size
         subword_embed_dim = self.hyperparams.model_representation_subword_embed_dim
@@ -182,6 +195,7 @@ class BiDAF(BaseModel):
         subword_hidden_activation = self.hyperparams.model_representation_subword_hidden_activation
         subword_dropout = self.hyperparams.model_representation_subword_dropout if self.mode == "train" else 0.0
         subword_pooling_type = self.hyperparams.model_representation_subword_pooling_type
+        subword_unique_enable = self.hyperparams.model_representation_subword_unique_enable
         subword_feat_enable = self.hyperparams.model_representation_subword_feat_enable
         char_vocab_size = self.hyperparams.data_char_vocab_size
         char_embed_dim = self.hyperparams.model_representation_char_embed_dim
@@ -191,6 +205,7 @@ class BiDAF(BaseModel):
         char_hidden_activation = self.hyperparams.model_representation_char_hidden_activation
         char_dropout = self.hyperparams.model_representation_char_dropout if self.mode == "train" else 0.0
         char_pooling_type = self.hyperparams.model_representation_char_pooling_type
+        char_unique_enable = self.hyperparams.model_representation_char_unique_enable
         char_feat_enable = self.hyperparams.model_representation_char_feat_enable
         fusion_type = self.hyperparams.model_representation_fusion_type
         fusion_num_layer = self.hyperparams.model_representation_fusion_num_layer
@@ -209,7 +224,8 @@ class BiDAF(BaseModel):
                 self.logger.log_print("# build word-level representation layer")
                 word_feat_layer = WordFeat(vocab_size=word_vocab_size, embed_dim=word_embed_dim, pretrained=word_embed_pretrained,
                     embedding=self.word_embedding, num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id,
-                    regularizer=self.regularizer, random_seed=self.random_seed, trainable=word_feat_trainable)
+                    regularizer=self.regularizer, random_seed=self.random_seed, trainable=word_feat_trainable,
+                    trainable_size=word_feat_trainable_size)
                 
                 (input_question_word_feat,
                     input_question_word_feat_mask) = word_feat_layer(input_question_word, input_question_word_mask)
@@ -229,14 +245,18 @@ class BiDAF(BaseModel):
                 self.logger.log_print("# build subword-level representation layer")
                 subword_feat_layer = SubwordFeat(vocab_size=subword_vocab_size, embed_dim=subword_embed_dim,
                     unit_dim=subword_unit_dim, window_size=subword_window_size, hidden_activation=subword_hidden_activation,
-                    pooling_type=subword_pooling_type, dropout=subword_dropout, num_gpus=self.num_gpus,
-                    default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
-                    random_seed=self.random_seed, trainable=subword_feat_trainable)
+                    pooling_type=subword_pooling_type, dropout=subword_dropout, unique_enable=subword_unique_enable,
+                    feat_table=self.subword_feat_table, num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id,
+                    regularizer=self.regularizer, random_seed=self.random_seed, trainable=subword_feat_trainable)
+                
+                self.subword_feat_layer = subword_feat_layer
                 
                 (input_question_subword_feat,
-                    input_question_subword_feat_mask) = subword_feat_layer(input_question_subword, input_question_subword_mask)
+                    input_question_subword_feat_mask) = subword_feat_layer(input_question_subword,
+                    input_question_subword_mask, input_question_word)
                 (input_context_subword_feat,
-                    input_context_subword_feat_mask) = subword_feat_layer(input_context_subword, input_context_subword_mask)
+                    input_context_subword_feat_mask) = subword_feat_layer(input_context_subword,
+                    input_context_subword_mask, input_context_word)
                 
                 input_question_feat_list.append(input_question_subword_feat)
                 input_question_feat_mask_list.append(input_question_subword_feat_mask)
@@ -249,14 +269,18 @@ class BiDAF(BaseModel):
                 self.logger.log_print("# build char-level representation layer")
                 char_feat_layer = CharFeat(vocab_size=char_vocab_size, embed_dim=char_embed_dim,
                     unit_dim=char_unit_dim, window_size=char_window_size, hidden_activation=char_hidden_activation,
-                    pooling_type=char_pooling_type, dropout=char_dropout, num_gpus=self.num_gpus,
-                    default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
-                    random_seed=self.random_seed, trainable=char_feat_trainable)
+                    pooling_type=char_pooling_type, dropout=char_dropout, unique_enable=char_unique_enable,
+                    feat_table=self.char_feat_table, num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id,
+                    regularizer=self.regularizer, random_seed=self.random_seed, trainable=char_feat_trainable)
+                
+                self.char_feat_layer = char_feat_layer
                 
                 (input_question_char_feat,
-                    input_question_char_feat_mask) = char_feat_layer(input_question_char, input_question_char_mask)
+                    input_question_char_feat_mask) = char_feat_layer(input_question_char,
+                    input_question_char_mask, input_question_word)
                 (input_context_char_feat,
-                    input_context_char_feat_mask) = char_feat_layer(input_context_char, input_context_char_mask)
+                    input_context_char_feat_mask) = char_feat_layer(input_context_char,
+                    input_context_char_mask, input_context_word)
                 
                 input_question_feat_list.append(input_question_char_feat)
                 input_question_feat_mask_list.append(input_question_char_feat_mask)
@@ -633,13 +657,25 @@ class BiDAF(BaseModel):
              global_step,
              save_mode):
         """save checkpoint for bidaf model"""
-        if save_mode == "debug":
+        if save_mode == "debug" and self.ckpt_debug_writer is not None:
+            self.ckpt_debug_writer.save(sess, global_step)
+        elif save_mode == "debug":
             self.ckpt_debug_saver.save(sess, self.ckpt_debug_name, global_step=global_step)
+        elif save_mode == "epoch" and self.ckpt_epoch_writer is not None:
+            self.ckpt_epoch_writer.save(sess, global_step)
         elif save_mode == "epoch":
             self.ckpt_epoch_saver.save(sess, self.ckpt_epoch_name, global_step=global_step)
         else:
             raise ValueError("unsupported save mode {0}".format(save_mode))
     
+    def wait_save(self):
+        """wait until pending checkpoints for bidaf model are fully written"""
+        if self.ckpt_debug_writer is not None:
+            self.ckpt_debug_writer.wait()
+        
+        if self.ckpt_epoch_writer is not None:
+            self.ckpt_epoch_writer.wait()
+    
     def restore(self,
                 sess,
                 ckpt_file,
@@ -703,6 +739,7 @@ class WordFeat(object):
                  regularizer=None,
                  random_seed=0,
                  trainable=True,
+                 trainable_size=0,
                  scope="word_feat"):
         """initialize word-level featurization layer"""
         self.vocab_size = vocab_size
@@ -714,11 +751,12 @@ class WordFeat(object):
         self.regularizer = regularizer
         self.random_seed = random_seed
         self.trainable = trainable
+        self.trainable_size = trainable_size
         self.scope = scope
         
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
-            self.embedding_layer = create_embedding_layer(self.vocab_size, self.embed_dim, self.pretrained,
-                self.embedding, self.num_gpus, self.default_gpu_id, None, self.random_seed, self.trainable)
+            self.embedding_layer = create_embedding_layer(self.vocab_size, self.embed_dim, self.embedding,
+                self.pretrained, self.num_gpus, self.default_gpu_id, None, self.random_seed, self.trainable, self.trainable_size)
     
     def __call__(self,
                  input_word,
@@ -740,6 +778,8 @@ class SubwordFeat(object):
                  hidden_activation,
                  pooling_type,
                  dropout,
+                 unique_enable=False,
+                 feat_table=None,
                  num_gpus=1,
                  default_gpu_id=0,
                  regularizer=None,
@@ -754,6 +794,8 @@ class SubwordFeat(object):
         self.hidden_activation = hidden_activation
         self.pooling_type = pooling_type
         self.dropout = dropout
+        self.unique_enable = unique_enable
+        self.feat_table = feat_table
         self.num_gpus = num_gpus
         self.default_gpu_id = default_gpu_id
         self.regularizer = regularizer
@@ -772,26 +814,54 @@ class SubwordFeat(object):
                 False, False, True, self.num_gpus, self.default_gpu_id, self.regularizer, self.random_seed, self.trainable)
             
             self.pooling_layer = create_pooling_layer(self.pooling_type, self.num_gpus, self.default_gpu_id)
+            
+            if self.feat_table is not None:
+                """feat table holds subword ids & precomputed feature of each word in word vocab"""
+                self.table_subword = tf.constant(self.feat_table[0], dtype=tf.int32)
+                self.table_feat = tf.constant(self.feat_table[1], dtype=tf.float32)
     
     def __call__(self,
                  input_subword,
-                 input_subword_mask):
+                 input_subword_mask,
+                 input_word=None):
         """call subword-level featurization layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
-            input_subword_embedding_mask = tf.expand_dims(input_subword_mask, axis=-1)
-            input_subword_embedding = self.embedding_layer(input_subword)
-            
-            (input_subword_dropout,
-                input_subword_dropout_mask) = self.dropout_layer(input_subword_embedding, input_subword_embedding_mask)
-            
-            (input_subword_conv,
-                input_subword_conv_mask) = self.conv_layer(input_subword_dropout, input_subword_dropout_mask)
-            
-            (input_subword_pool,
-                input_subword_pool_mask) = self.pooling_layer(input_subword_conv, input_subword_conv_mask)
-            
-            input_subword_feat = input_subword_pool
-            input_subword_feat_mask = input_subword_pool_mask
+            if self.feat_table is not None and input_word is not None:
+                (input_subword_feat, input_subword_feat_mask) = generate_table_feat(input_subword, input_subword_mask,
+                    input_word, self.table_subword, self.table_feat, self._featurize)
+            else:
+                input_subword_feat, input_subword_feat_mask = self._featurize(input_subword, input_subword_mask)
+        
+        return input_subword_feat, input_subword_feat_mask
+    
+    def _featurize(self,
+                   input_subword,
+                   input_subword_mask):
+        """featurize subwords of each word by convolution & pooling"""
+        input_subword_shape = tf.shape(input_subword)
+        if self.unique_enable == True:
+            """embedding, convolution & pooling only run over unique words in batch, so repeated words share dropout"""
+            (input_subword, input_subword_mask,
+                input_subword_index) = generate_unique_token(input_subword, input_subword_mask)
+        
+        input_subword_embedding_mask = tf.expand_dims(input_subword_mask, axis=-1)
+        input_subword_embedding = self.embedding_layer(input_subword)
+        
+        (input_subword_dropout,
+            input_subword_dropout_mask) = self.dropout_layer(input_subword_embedding, input_subword_embedding_mask)
+        
+        (input_subword_conv,
+            input_subword_conv_mask) = self.conv_layer(input_subword_dropout, input_subword_dropout_mask)
+        
+        (input_subword_pool,
+            input_subword_pool_mask) = self.pooling_layer(input_subword_conv, input_subword_conv_mask)
+        
+        input_subword_feat = input_subword_pool
+        input_subword_feat_mask = input_subword_pool_mask
+        
+        if self.unique_enable == True:
+            input_subword_feat = restore_unique_token(input_subword_feat, input_subword_index, input_subword_shape)
+            input_subword_feat_mask = restore_unique_token(input_subword_feat_mask, input_subword_index, input_subword_shape)
         
         return input_subword_feat, input_subword_feat_mask
 
@@ -805,6 +875,8 @@ class CharFeat(object):
                  hidden_activation,
                  pooling_type,
                  dropout,
+                 unique_enable=False,
+                 feat_table=None,
                  num_gpus=1,
                  default_gpu_id=0,
                  regularizer=None,
@@ -819,6 +891,8 @@ class CharFeat(object):
         self.hidden_activation = hidden_activation
         self.pooling_type = pooling_type
         self.dropout = dropout
+        self.unique_enable = unique_enable
+        self.feat_table = feat_table
         self.num_gpus = num_gpus
         self.default_gpu_id = default_gpu_id
         self.regularizer = regularizer
@@ -837,25 +911,53 @@ class CharFeat(object):
                 False, False, True, self.num_gpus, self.default_gpu_id, self.regularizer, self.random_seed, self.trainable)
             
             self.pooling_layer = create_pooling_layer(self.pooling_type, self.num_gpus, self.default_gpu_id)
+            
+            if self.feat_table is not None:
+                """feat table holds char ids & precomputed feature of each word in word vocab"""
+                self.table_char = tf.constant(self.feat_table[0], dtype=tf.int32)
+                self.table_feat = tf.constant(self.feat_table[1], dtype=tf.float32)
     
     def __call__(self,
                  input_char,
-                 input_char_mask):
+                 input_char_mask,
+                 input_word=None):
         """call char-level featurization layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
-            input_char_embedding_mask = tf.expand_dims(input_char_mask, axis=-1)
-            input_char_embedding = self.embedding_layer(input_char)
-            
-            (input_char_dropout,
-                input_char_dropout_mask) = self.dropout_layer(input_char_embedding, input_char_embedding_mask)
-            
-            (input_char_conv,
-                input_char_conv_mask) = self.conv_layer(input_char_dropout, input_char_dropout_mask)
-            
-            (input_char_pool,
-                input_char_pool_mask) = self.pooling_layer(input_char_conv, input_char_conv_mask)
-            
-            input_char_feat = input_char_pool
-            input_char_feat_mask = input_char_pool_mask
+            if self.feat_table is not None and input_word is not None:
+                (input_char_feat, input_char_feat_mask) = generate_table_feat(input_char, input_char_mask,
+                    input_word, self.table_char, self.table_feat, self._featurize)
+            else:
+                input_char_feat, input_char_feat_mask = self._featurize(input_char, input_char_mask)
+        
+        return input_char_feat, input_char_feat_mask
+    
+    def _featurize(self,
+                   input_char,
+                   input_char_mask):
+        """featurize chars of each word by convolution & pooling"""
+        input_char_shape = tf.shape(input_char)
+        if self.unique_enable == True:
+            """embedding, convolution & pooling only run over unique words in batch, so repeated words share dropout"""
+            (input_char, input_char_mask,
+                input_char_index) = generate_unique_token(input_char, input_char_mask)
+        
+        input_char_embedding_mask = tf.expand_dims(input_char_mask, axis=-1)
+        input_char_embedding = self.embedding_layer(input_char)
+        
+        (input_char_dropout,
+            input_char_dropout_mask) = self.dropout_layer(input_char_embedding, input_char_embedding_mask)
+        
+        (input_char_conv,
+            input_char_conv_mask) = self.conv_layer(input_char_dropout, input_char_dropout_mask)
+        
+        (input_char_pool,
+            input_char_pool_mask) = self.pooling_layer(input_char_conv, input_char_conv_mask)
+        
+        input_char_feat = input_char_pool
+        input_char_feat_mask = input_char_pool_mask
+        
+        if self.unique_enable == True:
+            input_char_feat = restore_unique_token(input_char_feat, input_char_index, input_char_shape)
+            input_char_feat_mask = restore_unique_token(input_char_feat_mask, input_char_index, input_char_shape)
         
         return input_char_feat, input_char_feat_mask
@@ -7,6 +7,7 @@ import tensorflow as tf
 from util.default_util import *
 from util.reading_comprehension_util import *
 from util.layer_util import *
+from util.ckpt_writer import *
 
 from model.base_model import *
 
@@ -25,9 +26,12 @@ class QANet(BaseModel):
         super(QANet, self).__init__(logger=logger, hyperparams=hyperparams,
             data_pipeline=data_pipeline, external_data=external_data, mode=mode, scope=scope)
         
-        with tf.variable_scope(scope, reuse=tf.AUTO_REUSE):
+        with tf.variable_scope(scope, reuse=tf.AUTO_REUSE, dtype=self.precision_dtype,
+                custom_getter=create_master_weight_getter()):
             self.global_step = tf.get_variable("global_step", shape=[], dtype=tf.int32,
                 initializer=tf.zeros_initializer, trainable=False)
+            if self.mode == "train":
+                self._create_train_position()
                         
             """get batch input from data pipeline"""
             question_word = self.data_pipeline.input_question_word
@@ -93,7 +97,8 @@ class QANet(BaseModel):
                 self.train_loss = tf.reduce_mean(start_loss + end_loss)
                 
                 if self.hyperparams.train_regularization_enable == True:
-                    regularization_variables = tf.get_collection(tf.GraphKeys.REGULARIZATION_LOSSES)
+                    regularization_variables = [tf.cast(regularization_variable, dtype=tf.float32)
+                        for regularization_variable in tf.get_collection(tf.GraphKeys.REGULARIZATION_LOSSES)]
                     regularization_loss = tf.contrib.layers.apply_regularization(self.regularizer, regularization_variables)
                     self.train_loss = self.train_loss + regularization_loss
                 
@@ -122,7 +127,7 @@ class QANet(BaseModel):
                 self.logger.log_print("# setup loss minimization mechanism")
                 self.opt_op, self.clipped_gradients, self.gradient_norm = self._minimize_loss(self.train_loss)
                 
-                if self.hyperparams.train_ema_enable == True:
+                if self.hyperparams.train_ema_enable == True and self.hyperparams.device_distributed_enable == False:
                     with tf.control_dependencies([self.opt_op]):
                         self.update_op = self.ema.apply(tf.trainable_variables())
                 else:
@@ -154,6 +159,13 @@ class QANet(BaseModel):
             if self.mode == "train":
                 self.ckpt_debug_saver = tf.train.Saver()
                 self.ckpt_epoch_saver = tf.train.Saver(max_to_keep=self.hyperparams.train_num_epoch)      
+            
+            self.ckpt_debug_writer = None
+            self.ckpt_epoch_writer = None
+            if self.mode == "train" and self.hyperparams.train_ckpt_async_enable == True:
+                self.ckpt_debug_writer = CheckpointWriter(tf.global_variables(), self.ckpt_debug_name)
+                self.ckpt_epoch_writer = CheckpointWriter(tf.global_variables(), self.ckpt_epoch_name,
+                    max_to_keep=self.hyperparams.train_num_epoch)
     
     def _build_representation_layer(self,
                                     input_question_word,
@@ -174,6 +186,7 @@ class QANet(BaseModel):
         word_dropout = self.hyperparams.model_representation_word_dropout if self.mode == "train" else 0.0
         word_embed_pretrained = self.hyperparams.model_representation_word_embed_pretrained
         word_feat_trainable = self.hyperparams.model_representation_word_feat_trainable
+        word_feat_trainable_size = self.hyperparams.model_representation_word_feat_trainable_size
         word_feat_enable = self.hyperparams.model_representation_word_feat_enable
         subword_vocab_size = self.hyperparams.data_subword_vocab_size
         subword_embed_dim = self.hyperparams.model_representation_subword_embed_dim
@@ -183,6 +196,7 @@ class QANet(BaseModel):
         subword_hidden_activation = self.hyperparams.model_representation_subword_hidden_activation
         subword_dropout = self.hyperparams.model_representation_subword_dropout if self.mode == "train" else 0.0
         subword_pooling_type = self.hyperparams.model_representation_subword_pooling_type
+        subword_unique_enable = self.hyperparams.model_representation_subword_unique_enable
         subword_feat_enable = self.hyperparams.model_representation_subword_feat_enable
         char_vocab_size = self.hyperparams.data_char_vocab_size
         char_embed_dim = self.hyperparams.model_representation_char_embed_dim
@@ -192,6 +206,7 @@ class QANet(BaseModel):
         char_hidden_activation = self.hyperparams.model_representation_char_hidden_activation
         char_dropout = self.hyperparams.model_representation_char_dropout if self.mode == "train" else 0.0
         char_pooling_type = self.hyperparams.model_representation_char_pooling_type
+        char_unique_enable = self.hyperparams.model_representation_char_unique_enable
         char_feat_enable = self.hyperparams.model_representation_char_feat_enable
         fusion_type = self.hyperparams.model_representation_fusion_type
         fusion_num_layer = self.hyperparams.model_representation_fusion_num_layer
@@ -211,7 +226,8 @@ class QANet(BaseModel):
                 word_feat_layer = WordFeat(vocab_size=word_vocab_size, embed_dim=word_embed_dim,
                     dropout=word_dropout, pretrained=word_embed_pretrained, embedding=self.word_embedding,
                     num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
-                    random_seed=self.random_seed, trainable=word_feat_trainable)
+                    random_seed=self.random_seed, trainable=word_feat_trainable,
+                    trainable_size=word_feat_trainable_size)
                 
                 (input_question_word_feat,
                     input_question_word_feat_mask) = word_feat_layer(input_question_word, input_question_word_mask)
@@ -231,14 +247,18 @@ class QANet(BaseModel):
                 self.logger.log_print("# build subword-level representation layer")
                 subword_feat_layer = SubwordFeat(vocab_size=subword_vocab_size, embed_dim=subword_embed_dim,
                     unit_dim=subword_unit_dim, window_size=subword_window_size, hidden_activation=subword_hidden_activation,
-                    pooling_type=subword_pooling_type, dropout=subword_dropout, num_gpus=self.num_gpus,
-                    default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
-                    random_seed=self.random_seed, trainable=subword_feat_trainable)
+                    pooling_type=subword_pooling_type, dropout=subword_dropout, unique_enable=subword_unique_enable,
+                    feat_table=self.subword_feat_table, num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id,
+                    regularizer=self.regularizer, random_seed=self.random_seed, trainable=subword_feat_trainable)
+                
+                self.subword_feat_layer = subword_feat_layer
                 
                 (input_question_subword_feat,
-                    input_question_subword_feat_mask) = subword_feat_layer(input_question_subword, input_question_subword_mask)
+                    input_question_subword_feat_mask) = subword_feat_layer(input_question_subword,
+                    input_question_subword_mask, input_question_word)
                 (input_context_subword_feat,
-                    input_context_subword_feat_mask) = subword_feat_layer(input_context_subword, input_context_subword_mask)
+                    input_context_subword_feat_mask) = subword_feat_layer(input_context_subword,
+                    input_context_subword_mask, input_context_word)
                 
                 input_question_feat_list.append(input_question_subword_feat)
                 input_question_feat_mask_list.append(input_question_subword_feat_mask)
@@ -251,14 +271,18 @@ class QANet(BaseModel):
                 self.logger.log_print("# build char-level representation layer")
                 char_feat_layer = CharFeat(vocab_size=char_vocab_size, embed_dim=char_embed_dim,
                     unit_dim=char_unit_dim, window_size=char_window_size, hidden_activation=char_hidden_activation,
-                    pooling_type=char_pooling_type, dropout=char_dropout, num_gpus=self.num_gpus,
-                    default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
-                    random_seed=self.random_seed, trainable=char_feat_trainable)
+                    pooling_type=char_pooling_type, dropout=char_dropout, unique_enable=char_unique_enable,
+                    feat_table=self.char_feat_table, num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id,
+                    regularizer=self.regularizer, random_seed=self.random_seed, trainable=char_feat_trainable)
+                
+                self.char_feat_layer = char_feat_layer
                 
                 (input_question_char_feat,
-                    input_question_char_feat_mask) = char_feat_layer(input_question_char, input_question_char_mask)
+                    input_question_char_feat_mask) = char_feat_layer(input_question_char,
+                    input_question_char_mask, input_question_word)
                 (input_context_char_feat,
-                    input_context_char_feat_mask) = char_feat_layer(input_context_char, input_context_char_mask)
+                    input_context_char_feat_mask) = char_feat_layer(input_context_char,
+                    input_context_char_mask, input_context_word)
                 
                 input_question_feat_list.append(input_question_char_feat)
                 input_question_feat_mask_list.append(input_question_char_feat_mask)
@@ -296,6 +320,11 @@ class QANet(BaseModel):
         question_understanding_dropout = self.hyperparams.model_understanding_question_dropout if self.mode == "train" else 0.0
         question_understanding_att_dropout = self.hyperparams.model_understanding_question_attention_dropout if self.mode == "train" else 0.0
         question_understanding_layer_dropout = self.hyperparams.model_understanding_question_layer_dropout if self.mode == "train" else 0.0
+        question_understanding_att_type = self.hyperparams.model_understanding_question_attention_type
+        question_understanding_att_chunk_size = self.hyperparams.model_understanding_question_attention_chunk_size
+        question_understanding_att_window_size = self.hyperparams.model_understanding_question_attention_window_size
+        question_understanding_att_num_global = self.hyperparams.model_understanding_question_attention_num_global
+        question_understanding_att_length_mask = self.hyperparams.model_understanding_question_attention_length_mask_enable
         question_understanding_trainable = self.hyperparams.model_understanding_question_trainable
         context_understanding_num_layer = self.hyperparams.model_understanding_context_num_layer
         context_understanding_num_conv = self.hyperparams.model_understanding_context_num_conv
@@ -306,6 +335,11 @@ class QANet(BaseModel):
         context_understanding_dropout = self.hyperparams.model_understanding_context_dropout if self.mode == "train" else 0.0
         context_understanding_att_dropout = self.hyperparams.model_understanding_context_attention_dropout if self.mode == "train" else 0.0
         context_understanding_layer_dropout = self.hyperparams.model_understanding_context_layer_dropout if self.mode == "train" else 0.0
+        context_understanding_att_type = self.hyperparams.model_understanding_context_attention_type
+        context_understanding_att_chunk_size = self.hyperparams.model_understanding_context_attention_chunk_size
+        context_understanding_att_window_size = self.hyperparams.model_understanding_context_attention_window_size
+        context_understanding_att_num_global = self.hyperparams.model_understanding_context_attention_num_global
+        context_understanding_att_length_mask = self.hyperparams.model_understanding_context_attention_length_mask_enable
         context_understanding_trainable = self.hyperparams.model_understanding_context_trainable
         enable_understanding_sharing = self.hyperparams.model_understanding_enable_sharing
         
@@ -320,6 +354,9 @@ class QANet(BaseModel):
                     unit_dim=question_understanding_unit_dim, window_size=question_understanding_window_size,
                     activation=question_understanding_hidden_activation, dropout=question_understanding_dropout,
                     att_dropout=question_understanding_att_dropout, layer_dropout=question_understanding_layer_dropout,
+                    att_type=question_understanding_att_type, att_chunk_size=question_understanding_att_chunk_size,
+                    att_window_size=question_understanding_att_window_size, att_num_global=question_understanding_att_num_global,
+                    att_length_mask=question_understanding_att_length_mask,
                     num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
                     random_seed=self.random_seed, trainable=question_understanding_trainable)
                 
@@ -346,6 +383,9 @@ class QANet(BaseModel):
                         unit_dim=context_understanding_unit_dim, window_size=context_understanding_window_size,
                         activation=context_understanding_hidden_activation, dropout=context_understanding_dropout,
                         att_dropout=context_understanding_att_dropout, layer_dropout=context_understanding_layer_dropout,
+                        att_type=context_understanding_att_type, att_chunk_size=context_understanding_att_chunk_size,
+                        att_window_size=context_understanding_att_window_size, att_num_global=context_understanding_att_num_global,
+                        att_length_mask=context_understanding_att_length_mask,
                         num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
                         random_seed=self.random_seed, trainable=context_understanding_trainable)
                 
@@ -470,6 +510,11 @@ class QANet(BaseModel):
         answer_modeling_dropout = self.hyperparams.model_modeling_answer_dropout if self.mode == "train" else 0.0
         answer_modeling_att_dropout = self.hyperparams.model_modeling_answer_attention_dropout if self.mode == "train" else 0.0
         answer_modeling_layer_dropout = self.hyperparams.model_modeling_answer_layer_dropout if self.mode == "train" else 0.0
+        answer_modeling_att_type = self.hyperparams.model_modeling_answer_attention_type
+        answer_modeling_att_chunk_size = self.hyperparams.model_modeling_answer_attention_chunk_size
+        answer_modeling_att_window_size = self.hyperparams.model_modeling_answer_attention_window_size
+        answer_modeling_att_num_global = self.hyperparams.model_modeling_answer_attention_num_global
+        answer_modeling_att_length_mask = self.hyperparams.model_modeling_answer_attention_length_mask_enable
         answer_modeling_trainable = self.hyperparams.model_modeling_answer_trainable
         answer_modeling_enable_sharing = self.hyperparams.model_modeling_enable_sharing
         
@@ -491,6 +536,9 @@ class QANet(BaseModel):
                     unit_dim=answer_modeling_unit_dim, window_size=answer_modeling_window_size,
                     activation=answer_modeling_hidden_activation, dropout=answer_modeling_dropout,
                     att_dropout=answer_modeling_att_dropout, layer_dropout=answer_modeling_layer_dropout,
+                    att_type=answer_modeling_att_type, att_chunk_size=answer_modeling_att_chunk_size,
+                    att_window_size=answer_modeling_att_window_size, att_num_global=answer_modeling_att_num_global,
+                    att_length_mask=answer_modeling_att_length_mask,
                     num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
                     random_seed=self.random_seed, trainable=answer_modeling_trainable)
                 
@@ -509,6 +557,9 @@ class QANet(BaseModel):
                         unit_dim=answer_modeling_unit_dim, window_size=answer_modeling_window_size,
                         activation=answer_modeling_hidden_activation, dropout=answer_modeling_dropout,
                         att_dropout=answer_modeling_att_dropout, layer_dropout=answer_modeling_layer_dropout,
+                        att_type=answer_modeling_att_type, att_chunk_size=answer_modeling_att_chunk_size,
+                        att_window_size=answer_modeling_att_window_size, att_num_global=answer_modeling_att_num_global,
+                        att_length_mask=answer_modeling_att_length_mask,
                         num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
                         random_seed=self.random_seed, trainable=answer_modeling_trainable)
                 
@@ -527,6 +578,9 @@ class QANet(BaseModel):
                         unit_dim=answer_modeling_unit_dim, window_size=answer_modeling_window_size,
                         activation=answer_modeling_hidden_activation, dropout=answer_modeling_dropout,
                         att_dropout=answer_modeling_att_dropout, layer_dropout=answer_modeling_layer_dropout,
+                        att_type=answer_modeling_att_type, att_chunk_size=answer_modeling_att_chunk_size,
+                        att_window_size=answer_modeling_att_window_size, att_num_global=answer_modeling_att_num_global,
+                        att_length_mask=answer_modeling_att_length_mask,
                         num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
                         random_seed=self.random_seed, trainable=answer_modeling_trainable)
                 
@@ -649,13 +703,25 @@ class QANet(BaseModel):
              global_step,
              save_mode):
         """save checkpoint for qanet model"""
-        if save_mode == "debug":
+        if save_mode == "debug" and self.ckpt_debug_writer is not None:
+            self.ckpt_debug_writer.save(sess, global_step)
+        elif save_mode == "debug":
             self.ckpt_debug_saver.save(sess, self.ckpt_debug_name, global_step=global_step)
+        elif save_mode == "epoch" and self.ckpt_epoch_writer is not None:
+            self.ckpt_epoch_writer.save(sess, global_step)
         elif save_mode == "epoch":
             self.ckpt_epoch_saver.save(sess, self.ckpt_epoch_name, global_step=global_step)
         else:
             raise ValueError("unsupported save mode {0}".format(save_mode))
     
+    def wait_save(self):
+        """wait until pending checkpoints for qanet model are fully written"""
+        if self.ckpt_debug_writer is not None:
+            self.ckpt_debug_writer.wait()
+        
+        if self.ckpt_epoch_writer is not None:
+            self.ckpt_epoch_writer.wait()
+    
     def restore(self,
                 sess,
                 ckpt_file,
@@ -718,6 +784,11 @@ class EncoderBlock(object):
                  dropout,
                  att_dropout,
                  layer_dropout,
+                 att_type="multi_head_att",
+                 att_chunk_size=0,
+                 att_window_size=0,
+                 att_num_global=0,
+                 att_length_mask=False,
                  num_gpus=1,
                  default_gpu_id=0,
                  regularizer=None,
@@ -733,6 +804,11 @@ class EncoderBlock(object):
         self.dropout = dropout
         self.att_dropout = att_dropout
         self.sublayer_index, self.num_sublayer, self.layer_dropout = layer_dropout
+        self.att_type = att_type
+        self.att_chunk_size = att_chunk_size
+        self.att_window_size = att_window_size
+        self.att_num_global = att_num_global
+        self.att_length_mask = att_length_mask
         self.num_gpus = num_gpus
         self.default_gpu_id = default_gpu_id
         self.regularizer = regularizer
@@ -741,6 +817,7 @@ class EncoderBlock(object):
         self.scope = scope
         
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
+            self.precision_dtype = tf.get_variable_scope().dtype
             self.position_layer = create_position_layer("sin_pos", 0, 0, 1, 10000,
                 self.num_gpus, self.default_gpu_id, self.regularizer, self.random_seed, self.trainable)
             
@@ -750,9 +827,10 @@ class EncoderBlock(object):
                 True, True, True, self.num_gpus, self.default_gpu_id, self.regularizer, self.random_seed, self.trainable)
             
             att_layer_dropout = self.layer_dropout * float(self.num_conv + self.sublayer_index) / self.num_sublayer
-            self.attention_layer = create_attention_layer("multi_head_att", self.unit_dim, self.unit_dim,
+            self.attention_layer = create_attention_layer(self.att_type, self.unit_dim, self.unit_dim,
                 self.unit_dim, self.num_head, "scaled_dot", self.dropout, self.att_dropout, att_layer_dropout,
-                True, True, True, None, self.num_gpus, self.default_gpu_id, self.regularizer, self.random_seed, self.trainable)
+                True, True, True, None, self.num_gpus, self.default_gpu_id, self.regularizer, self.random_seed, self.trainable,
+                self.att_chunk_size, self.att_window_size, self.att_num_global, self.att_length_mask)
             
             dense_layer_dropout = [self.layer_dropout * float(self.num_conv + 1 + self.sublayer_index) / self.num_sublayer]
             self.dense_layer = create_dense_layer("double", 1, self.unit_dim, 1, self.activation, [self.dropout], dense_layer_dropout,
@@ -763,6 +841,7 @@ class EncoderBlock(object):
                  input_mask):
         """call encoder-block layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
+            input_data = tf.cast(input_data, dtype=self.precision_dtype)
             input_position, input_position_mask = self.position_layer(input_data, input_mask)
             input_conv, input_conv_mask = self.conv_layer(input_position, input_position_mask)
             input_attention, input_attention_mask = self.attention_layer(input_conv, input_conv, input_conv_mask, input_conv_mask)
@@ -782,6 +861,11 @@ class StackedEncoderBlock(object):
                  dropout,
                  att_dropout,
                  layer_dropout,
+                 att_type="multi_head_att",
+                 att_chunk_size=0,
+                 att_window_size=0,
+                 att_num_global=0,
+                 att_length_mask=False,
                  num_gpus=1,
                  default_gpu_id=0,
                  regularizer=None,
@@ -798,6 +882,11 @@ class StackedEncoderBlock(object):
         self.dropout = dropout
         self.att_dropout = att_dropout
         self.layer_dropout = layer_dropout
+        self.att_type = att_type
+        self.att_chunk_size = att_chunk_size
+        self.att_window_size = att_window_size
+        self.att_num_global = att_num_global
+        self.att_length_mask = att_length_mask
         self.num_gpus = num_gpus
         self.default_gpu_id = default_gpu_id
         self.regularizer = regularizer
@@ -814,8 +903,10 @@ class StackedEncoderBlock(object):
                 block_layer = EncoderBlock(num_conv=self.num_conv, num_head=self.num_head,
                     unit_dim=self.unit_dim, window_size=self.window_size, activation=self.activation,
                     dropout=self.dropout, att_dropout=self.att_dropout, layer_dropout=layer_dropout,
-                    num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id, regularizer=self.regularizer,
-                    random_seed=self.random_seed, trainable=self.trainable, scope=layer_scope)
+                    att_type=self.att_type, att_chunk_size=self.att_chunk_size, att_window_size=self.att_window_size,
+                    att_num_global=self.att_num_global, att_length_mask=self.att_length_mask, num_gpus=self.num_gpus,
+                    default_gpu_id=self.default_gpu_id, regularizer=self.regularizer, random_seed=self.random_seed,
+                    trainable=self.trainable, scope=layer_scope)
                 self.block_layer_list.append(block_layer)
     
     def __call__(self,
@@ -829,7 +920,8 @@ class StackedEncoderBlock(object):
             for block_layer in self.block_layer_list:
                 input_block, input_block_mask = block_layer(input_block, input_block_mask)
             
-            output_block = input_block
+            """activations stay in layer precision across encoder blocks, only cast back on exit"""
+            output_block = tf.cast(input_block, dtype=input_data.dtype)
             output_mask = input_block_mask
         
         return output_block, output_mask
@@ -847,6 +939,7 @@ class WordFeat(object):
                  regularizer=None,
                  random_seed=0,
                  trainable=True,
+                 trainable_size=0,
                  scope="word_feat"):
         """initialize word-level featurization layer"""
         self.vocab_size = vocab_size
@@ -859,11 +952,12 @@ class WordFeat(object):
         self.regularizer = regularizer
         self.random_seed = random_seed
         self.trainable = trainable
+        self.trainable_size = trainable_size
         self.scope = scope
         
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
-            self.embedding_layer = create_embedding_layer(self.vocab_size, self.embed_dim, self.pretrained,
-                self.embedding, self.num_gpus, self.default_gpu_id, None, self.random_seed, self.trainable)
+            self.embedding_layer = create_embedding_layer(self.vocab_size, self.embed_dim, self.embedding,
+                self.pretrained, self.num_gpus, self.default_gpu_id, None, self.random_seed, self.trainable, self.trainable_size)
             
             self.dropout_layer = create_dropout_layer(self.dropout, self.num_gpus, self.default_gpu_id, self.random_seed)
     
@@ -893,6 +987,8 @@ class SubwordFeat(object):
                  hidden_activation,
                  pooling_type,
                  dropout,
+                 unique_enable=False,
+                 feat_table=None,
                  num_gpus=1,
                  default_gpu_id=0,
                  regularizer=None,
@@ -907,6 +1003,8 @@ class SubwordFeat(object):
         self.hidden_activation = hidden_activation
         self.pooling_type = pooling_type
         self.dropout = dropout
+        self.unique_enable = unique_enable
+        self.feat_table = feat_table
         self.num_gpus = num_gpus
         self.default_gpu_id = default_gpu_id
         self.regularizer = regularizer
@@ -925,26 +1023,54 @@ class SubwordFeat(object):
                 False, False, True, self.num_gpus, self.default_gpu_id, self.regularizer, self.random_seed, self.trainable)
             
             self.pooling_layer = create_pooling_layer(self.pooling_type, self.num_gpus, self.default_gpu_id)
+            
+            if self.feat_table is not None:
+                """feat table holds subword ids & precomputed feature of each word in word vocab"""
+                self.table_subword = tf.constant(self.feat_table[0], dtype=tf.int32)
+                self.table_feat = tf.constant(self.feat_table[1], dtype=tf.float32)
     
     def __call__(self,
                  input_subword,
-                 input_subword_mask):
+                 input_subword_mask,
+                 input_word=None):
         """call subword-level featurization layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
-            input_subword_embedding_mask = tf.expand_dims(input_subword_mask, axis=-1)
-            input_subword_embedding = self.embedding_layer(input_subword)
-            
-            (input_subword_dropout,
-                input_subword_dropout_mask) = self.dropout_layer(input_subword_embedding, input_subword_embedding_mask)
-            
-            (input_subword_conv,
-                input_subword_conv_mask) = self.conv_layer(input_subword_dropout, input_subword_dropout_mask)
-            
-            (input_subword_pool,
-                input_subword_pool_mask) = self.pooling_layer(input_subword_conv, input_subword_conv_mask)
-            
-            input_subword_feat = input_subword_pool
-            input_subword_feat_mask = input_subword_pool_mask
+            if self.feat_table is not None and input_word is not None:
+                (input_subword_feat, input_subword_feat_mask) = generate_table_feat(input_subword, input_subword_mask,
+                    input_word, self.table_subword, self.table_feat, self._featurize)
+            else:
+                input_subword_feat, input_subword_feat_mask = self._featurize(input_subword, input_subword_mask)
+        
+        return input_subword_feat, input_subword_feat_mask
+    
+    def _featurize(self,
+                   input_subword,
+                   input_subword_mask):
+        """featurize subwords of each word by convolution & pooling"""
+        input_subword_shape = tf.shape(input_subword)
+        if self.unique_enable == True:
+            """embedding, convolution & pooling only run over unique words in batch, so repeated words share dropout"""
+            (input_subword, input_subword_mask,
+                input_subword_index) = generate_unique_token(input_subword, input_subword_mask)
+        
+        input_subword_embedding_mask = tf.expand_dims(input_subword_mask, axis=-1)
+        input_subword_embedding = self.embedding_layer(input_subword)
+        
+        (input_subword_dropout,
+            input_subword_dropout_mask) = self.dropout_layer(input_subword_embedding, input_subword_embedding_mask)
+        
+        (input_subword_conv,
+            input_subword_conv_mask) = self.conv_layer(input_subword_dropout, input_subword_dropout_mask)
+        
+        (input_subword_pool,
+            input_subword_pool_mask) = self.pooling_layer(input_subword_conv, input_subword_conv_mask)
+        
+        input_subword_feat = input_subword_pool
+        input_subword_feat_mask = input_subword_pool_mask
+        
+        if self.unique_enable == True:
+            input_subword_feat = restore_unique_token(input_subword_feat, input_subword_index, input_subword_shape)
+            input_subword_feat_mask = restore_unique_token(input_subword_feat_mask, input_subword_index, input_subword_shape)
         
         return input_subword_feat, input_subword_feat_mask
 
@@ -958,6 +1084,8 @@ class CharFeat(object):
                  hidden_activation,
                  pooling_type,
                  dropout,
+                 unique_enable=False,
+                 feat_table=None,
                  num_gpus=1,
                  default_gpu_id=0,
                  regularizer=None,
@@ -972,6 +1100,8 @@ class CharFeat(object):
         self.hidden_activation = hidden_activation
         self.pooling_type = pooling_type
         self.dropout = dropout
+        self.unique_enable = unique_enable
+        self.feat_table = feat_table
         self.num_gpus = num_gpus
         self.default_gpu_id = default_gpu_id
         self.regularizer = regularizer
@@ -990,25 +1120,53 @@ class CharFeat(object):
                 False, False, True, self.num_gpus, self.default_gpu_id, self.regularizer, self.random_seed, self.trainable)
             
             self.pooling_layer = create_pooling_layer(self.pooling_type, self.num_gpus, self.default_gpu_id)
+            
+            if self.feat_table is not None:
+                """feat table holds char ids & precomputed feature of each word in word vocab"""
+                self.table_char = tf.constant(self.feat_table[0], dtype=tf.int32)
+                self.table_feat = tf.constant(self.feat_table[1], dtype=tf.float32)
     
     def __call__(self,
                  input_char,
-                 input_char_mask):
+                 input_char_mask,
+                 input_word=None):
         """call char-level featurization layer"""
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
-            input_char_embedding_mask = tf.expand_dims(input_char_mask, axis=-1)
-            input_char_embedding = self.embedding_layer(input_char)
-            
-            (input_char_dropout,
-                input_char_dropout_mask) = self.dropout_layer(input_char_embedding, input_char_embedding_mask)
-            
-            (input_char_conv,
-                input_char_conv_mask) = self.conv_layer(input_char_dropout, input_char_dropout_mask)
-            
-            (input_char_pool,
-                input_char_pool_mask) = self.pooling_layer(input_char_conv, input_char_conv_mask)
-                        
-            input_char_feat = input_char_pool
-            input_char_feat_mask = input_char_pool_mask
+            if self.feat_table is not None and input_word is not None:
+                (input_char_feat, input_char_feat_mask) = generate_table_feat(input_char, input_char_mask,
+                    input_word, self.table_char, self.table_feat, self._featurize)
+            else:
+                input_char_feat, input_char_feat_mask = self._featurize(input_char, input_char_mask)
+        
+        return input_char_feat, input_char_feat_mask
+    
+    def _featurize(self,
+                   input_char,
+                   input_char_mask):
+        """featurize chars of each word by convolution & pooling"""
+        input_char_shape = tf.shape(input_char)
+        if self.unique_enable == True:
+            """embedding, convolution & pooling only run over unique words in batch, so repeated words share dropout"""
+            (input_char, input_char_mask,
+                input_char_index) = generate_unique_token(input_char, input_char_mask)
+        
+        input_char_embedding_mask = tf.expand_dims(input_char_mask, axis=-1)
+        input_char_embedding = self.embedding_layer(input_char)
+        
+        (input_char_dropout,
+            input_char_dropout_mask) = self.dropout_layer(input_char_embedding, input_char_embedding_mask)
+        
+        (input_char_conv,
+            input_char_conv_mask) = self.conv_layer(input_char_dropout, input_char_dropout_mask)
+        
+        (input_char_pool,
+            input_char_pool_mask) = self.pooling_layer(input_char_conv, input_char_conv_mask)
+        
+        input_char_feat = input_char_pool
+        input_char_feat_mask = input_char_pool_mask
+        
+        if self.unique_enable == True:
+            input_char_feat = restore_unique_token(input_char_feat, input_char_index, input_char_shape)
+            input_char_feat_mask = restore_unique_token(input_char_feat_mask, input_char_index, input_char_shape)
         
         return input_char_feat, input_char_feat_mask
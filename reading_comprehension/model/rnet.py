@@ -7,6 +7,7 @@ import tensorflow as tf
 from util.default_util import *
 from util.reading_comprehension_util import *
 from util.layer_util import *
+from util.ckpt_writer import *
 
 from model.base_model import *
 
@@ -25,9 +26,12 @@ class RNet(BaseModel):
         super(RNet, self).__init__(logger=logger, hyperparams=hyperparams,
             data_pipeline=data_pipeline, external_data=external_data, mode=mode, scope=scope)
         
-        with tf.variable_scope(scope, reuse=tf.AUTO_REUSE):
+        with tf.variable_scope(scope, reuse=tf.AUTO_REUSE, dtype=self.precision_dtype,
+                custom_getter=create_master_weight_getter()):
             self.global_step = tf.get_variable("global_step", shape=[], dtype=tf.int32,
                 initializer=tf.zeros_initializer, trainable=False)
+            if self.mode == "train":
+                self._create_train_position()
                         
             """get batch input from data pipeline"""
             question_word = self.data_pipeline.input_question_word
@@ -93,7 +97,8 @@ class RNet(BaseModel):
                 self.train_loss = tf.reduce_mean(start_loss + end_loss)
                 
                 if self.hyperparams.train_regularization_enable == True:
-                    regularization_variables = tf.get_collection(tf.GraphKeys.REGULARIZATION_LOSSES)
+                    regularization_variables = [tf.cast(regularization_variable, dtype=tf.float32)
+                        for regularization_variable in tf.get_collection(tf.GraphKeys.REGULARIZATION_LOSSES)]
                     regularization_loss = tf.contrib.layers.apply_regularization(self.regularizer, regularization_variables)
                     self.train_loss = self.train_loss + regularization_loss
                 
@@ -122,7 +127,7 @@ class RNet(BaseModel):
                 self.logger.log_print("# setup loss minimization mechanism")
                 self.opt_op, self.clipped_gradients, self.gradient_norm = self._minimize_loss(self.train_loss)
                 
-                if self.hyperparams.train_ema_enable == True:
+                if self.hyperparams.train_ema_enable == True and self.hyperparams.device_distributed_enable == False:
                     with tf.control_dependencies([self.opt_op]):
                         self.update_op = self.ema.apply(tf.trainable_variables())
                 else:
@@ -154,6 +159,13 @@ class RNet(BaseModel):
             if self.mode == "train":
                 self.ckpt_debug_saver = tf.train.Saver()
                 self.ckpt_epoch_saver = tf.train.Saver(max_to_keep=self.hyperparams.train_num_epoch) 
+            
+            self.ckpt_debug_writer = None
+            self.ckpt_epoch_writer = None
+            if self.mode == "train" and self.hyperparams.train_ckpt_async_enable == True:
+                self.ckpt_debug_writer = CheckpointWriter(tf.global_variables(), self.ckpt_debug_name)
+                self.ckpt_epoch_writer = CheckpointWriter(tf.global_variables(), self.ckpt_epoch_name,
+                    max_to_keep=self.hyperparams.train_num_epoch)
     
     def _build_representation_layer(self,
                                     input_question_word,
@@ -173,6 +185,7 @@ class RNet(BaseModel):
         word_embed_dim = self.hyperparams.model_representation_word_embed_dim
         word_embed_pretrained = self.hyperparams.model_representation_word_embed_pretrained
         word_feat_trainable = self.hyperparams.model_representation_word_feat_trainable
+        word_feat_trainable_size = self.hyperparams.model_representation_word_feat_trainable_size
         word_feat_enable = self.hyperparams.model_representation_word_feat_enable
         subword_vocab_size = self.hyperparams.data_subword_vocab_size
         subword_embed_dim = self.hyperparams.model_representation_subword_embed_dim
@@ -207,7 +220,8 @@ class RNet(BaseModel):
                 self.logger.log_print("# build word-level representation layer")
                 word_feat_layer = WordFeat(vocab_size=word_vocab_size, embed_dim=word_embed_dim, pretrained=word_embed_pretrained,
                     embedding=self.word_embedding, num_gpus=self.num_gpus, default_gpu_id=self.default_gpu_id,
-                    regularizer=self.regularizer, random_seed=self.random_seed, trainable=word_feat_trainable)
+                    regularizer=self.regularizer, random_seed=self.random_seed, trainable=word_feat_trainable,
+                    trainable_size=word_feat_trainable_size)
                 
                 (input_question_word_feat,
                     input_question_word_feat_mask) = word_feat_layer(input_question_word, input_question_word_mask)
@@ -560,13 +574,25 @@ class RNet(BaseModel):
              global_step,
              save_mode):
         """save checkpoint for rnet model"""
-        if save_mode == "debug":
+        if save_mode == "debug" and self.ckpt_debug_writer is not None:
+            self.ckpt_debug_writer.save(sess, global_step)
+        elif save_mode == "debug":
             self.ckpt_debug_saver.save(sess, self.ckpt_debug_name, global_step=global_step)
+        elif save_mode == "epoch" and self.ckpt_epoch_writer is not None:
+            self.ckpt_epoch_writer.save(sess, global_step)
         elif save_mode == "epoch":
             self.ckpt_epoch_saver.save(sess, self.ckpt_epoch_name, global_step=global_step)
         else:
             raise ValueError("unsupported save mode {0}".format(save_mode))
     
+    def wait_save(self):
+        """wait until pending checkpoints for rnet model are fully written"""
+        if self.ckpt_debug_writer is not None:
+            self.ckpt_debug_writer.wait()
+        
+        if self.ckpt_epoch_writer is not None:
+            self.ckpt_epoch_writer.wait()
+    
     def restore(self,
                 sess,
                 ckpt_file,
@@ -630,6 +656,7 @@ class WordFeat(object):
                  regularizer=None,
                  random_seed=0,
                  trainable=True,
+                 trainable_size=0,
                  scope="word_feat"):
         """initialize word-level featurization layer"""
         self.vocab_size = vocab_size
@@ -641,11 +668,12 @@ class WordFeat(object):
         self.regularizer = regularizer
         self.random_seed = random_seed
         self.trainable = trainable
+        self.trainable_size = trainable_size
         self.scope = scope
         
         with tf.variable_scope(self.scope, reuse=tf.AUTO_REUSE):
-            self.embedding_layer = create_embedding_layer(self.vocab_size, self.embed_dim, self.pretrained,
-                self.embedding, self.num_gpus, self.default_gpu_id, None, self.random_seed, self.trainable)
+            self.embedding_layer = create_embedding_layer(self.vocab_size, self.embed_dim, self.embedding,
+                self.pretrained, self.num_gpus, self.default_gpu_id, None, self.random_seed, self.trainable, self.trainable_size)
     
     def __call__(self,
                  input_word,
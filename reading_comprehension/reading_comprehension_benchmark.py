@@ -0,0 +1,525 @@
+import argparse
+import collections
+import json
+import multiprocessing
+import os.path
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from util.default_util import *
+from util.param_util import *
+from util.data_util import *
+from util.model_util import *
+from util.retrieval_util import *
+from util.debug_logger import *
+
+import layer.attention as attention_layer
+
+IMPORT_BENCHMARK_CODE = """
+import json
+import sys
+import time
+
+start_time = time.time()
+import tensorflow
+tf_end_time = time.time()
+import reading_comprehension_run
+run_end_time = time.time()
+reading_comprehension_run.get_model_creator(sys.argv[1])
+model_end_time = time.time()
+
+print(json.dumps({
+    "tensorflow_import_sec": tf_end_time - start_time,
+    "run_import_sec": run_end_time - tf_end_time,
+    "model_import_sec": model_end_time - run_end_time,
+    "total_import_sec": model_end_time - start_time,
+    "contrib_loaded": "tensorflow.contrib" in sys.modules,
+    "debug_loaded": "tensorflow.python.debug" in sys.modules
+}))
+"""
+
+def add_arguments(parser):
+    parser.add_argument("--benchmark_type", help="benchmark model step time, cli import time, attention score or paragraph retrieval",
+        choices=["model", "import", "attention", "retrieval"], default="model")
+    parser.add_argument("--config", help="path to json config of each model to benchmark", nargs="+", default=[])
+    parser.add_argument("--batch_size", help="list of batch size to benchmark", type=int, nargs="+", default=[32])
+    parser.add_argument("--question_length", help="max question length of synthetic data", type=int, default=40)
+    parser.add_argument("--context_length", help="max context length of synthetic data", type=int, default=400)
+    parser.add_argument("--word_feat", help="enable word feature", choices=["true", "false"], default=None)
+    parser.add_argument("--subword_feat", help="enable subword feature", choices=["true", "false"], default=None)
+    parser.add_argument("--char_feat", help="enable char feature", choices=["true", "false"], default=None)
+    parser.add_argument("--num_warmup_step", help="num of warm-up steps excluded from measurement", type=int, default=5)
+    parser.add_argument("--num_step", help="num of measured steps", type=int, default=50)
+    parser.add_argument("--num_import_run", help="num of fresh interpreters to measure import time", type=int, default=5)
+    parser.add_argument("--attention_score_type", help="list of attention score type to benchmark",
+        nargs="+", default=["linear", "nonlinear", "linear_plus", "nonlinear_plus", "trilinear"])
+    parser.add_argument("--attention_unit_dim", help="input unit dim of attention score benchmark", type=int, default=128)
+    parser.add_argument("--attention_hidden_dim", help="hidden dim of nonlinear attention score benchmark", type=int, default=128)
+    parser.add_argument("--retrieval_data_file", help="path to preprocessed json mrc file whose questions are retrieved", default="")
+    parser.add_argument("--retrieval_paragraph_file", help="path to paragraph file (one per line), default to contexts of mrc file", default="")
+    parser.add_argument("--retrieval_score_type", help="list of retrieval score type to benchmark", nargs="+", default=["bm25", "tfidf"])
+    parser.add_argument("--retrieval_top_k", help="list of num of retrieved paragraphs to benchmark", type=int, nargs="+", default=[1, 3, 5, 10, 20])
+    parser.add_argument("--retrieval_num_worker", help="num of workers to build retrieval index", type=int, default=4)
+    parser.add_argument("--random_seed", help="random seed for synthetic data", type=int, default=100)
+    parser.add_argument("--output_file", help="path to benchmark result file (json lines)", required=True)
+
+def create_synthetic_dataset(num_example,
+                             max_length,
+                             feat_length,
+                             vocab_size,
+                             random_seed):
+    """create synthetic dataset with variable length padded by id 0"""
+    np.random.seed(random_seed)
+    sequence_length = np.random.randint(max(max_length // 2, 1), max_length + 1, size=num_example)
+    synthetic_data = np.random.randint(1, vocab_size, size=[num_example, max_length, feat_length]).astype(np.int32)
+    synthetic_data = synthetic_data * (np.arange(max_length)[None,:,None] < sequence_length[:,None,None])
+    dataset = tf.data.Dataset.from_tensor_slices(synthetic_data.astype(np.int32)).repeat()
+    
+    return dataset
+
+def create_synthetic_answer_dataset(num_example,
+                                    context_length,
+                                    answer_length,
+                                    random_seed):
+    """create synthetic answer span dataset"""
+    np.random.seed(random_seed)
+    answer_start = np.random.randint(0, context_length // 2, size=num_example)
+    answer_end = answer_start + np.random.randint(0, answer_length, size=num_example)
+    synthetic_answer = np.stack([answer_start, answer_end], axis=-1)[:,:,None].astype(np.int32)
+    dataset = tf.data.Dataset.from_tensor_slices(synthetic_answer).repeat()
+    
+    return dataset
+
+def create_synthetic_pipeline(hyperparams,
+                              num_example,
+                              random_seed):
+    """create data pipeline on synthetic inputs"""
+    question_length = hyperparams.data_max_question_length
+    context_length = hyperparams.data_max_context_length
+    word_feat_enable = hyperparams.model_representation_word_feat_enable
+    subword_feat_enable = hyperparams.model_representation_subword_feat_enable
+    char_feat_enable = hyperparams.model_representation_char_feat_enable
+    
+    feat_list = [
+        (1, hyperparams.data_word_vocab_size, hyperparams.data_word_pad),
+        (hyperparams.data_max_subword_length, hyperparams.data_subword_vocab_size, hyperparams.data_subword_pad),
+        (hyperparams.data_max_char_length, hyperparams.data_char_vocab_size, hyperparams.data_char_pad)
+    ]
+    
+    question_dataset_list = []
+    context_dataset_list = []
+    vocab_index_list = []
+    for i, (feat_length, vocab_size, pad) in enumerate(feat_list):
+        question_dataset_list.append(create_synthetic_dataset(num_example,
+            question_length, feat_length, vocab_size, random_seed + i))
+        context_dataset_list.append(create_synthetic_dataset(num_example,
+            context_length, feat_length, vocab_size, random_seed + i + len(feat_list)))
+        vocab_index_list.append(tf.contrib.lookup.index_table_from_tensor(mapping=tf.constant([pad]), default_value=0))
+    
+    answer_dataset = create_synthetic_answer_dataset(num_example,
+        context_length, hyperparams.data_max_answer_length, random_seed)
+    
+    data_size_placeholder = tf.placeholder(shape=[], dtype=tf.int64)
+    batch_size_placeholder = tf.placeholder(shape=[], dtype=tf.int64)
+    data_pipeline = create_data_pipeline(question_dataset_list[0], question_dataset_list[1], question_dataset_list[2],
+        context_dataset_list[0], context_dataset_list[1], context_dataset_list[2], answer_dataset, "span",
+        vocab_index_list[0], hyperparams.data_word_pad, word_feat_enable,
+        vocab_index_list[1], hyperparams.data_subword_pad, subword_feat_enable,
+        vocab_index_list[2], hyperparams.data_char_pad, char_feat_enable,
+        False, 0, random_seed, None, None, None, None, None, None, None, None, None,
+        data_size_placeholder, batch_size_placeholder)
+    
+    return data_pipeline
+
+def build_synthetic_model(logger,
+                          hyperparams,
+                          batch_size,
+                          random_seed,
+                          mode):
+    """build model on synthetic data pipeline and return graph build time"""
+    graph = tf.Graph()
+    start_time = time.time()
+    with graph.as_default():
+        data_pipeline = create_synthetic_pipeline(hyperparams, batch_size * 4, random_seed)
+        
+        external_data = {}
+        if hyperparams.model_representation_word_embed_pretrained == True:
+            np.random.seed(random_seed)
+            external_data["word_embedding"] = np.random.uniform(-0.1, 0.1,
+                size=[hyperparams.data_word_vocab_size, hyperparams.model_representation_word_embed_dim]).astype(np.float32)
+        
+        model_creator = get_model_creator(hyperparams.model_type)
+        model = model_creator(logger=logger, hyperparams=hyperparams, data_pipeline=data_pipeline,
+            external_data=external_data, mode=mode, scope=hyperparams.model_scope)
+    build_time = time.time() - start_time
+    
+    return graph, model, data_pipeline, build_time
+
+def measure_step(step_fn,
+                 num_warmup_step,
+                 num_step):
+    """measure latency of each step after warm-up"""
+    for _ in range(num_warmup_step):
+        step_fn()
+    
+    step_time_list = []
+    for _ in range(num_step):
+        start_time = time.time()
+        step_fn()
+        step_time_list.append(time.time() - start_time)
+    
+    return np.asarray(step_time_list)
+
+def get_latency_statistic(step_time_list,
+                          prefix):
+    """get latency percentiles in milliseconds"""
+    latency_p50, latency_p95, latency_p99 = np.percentile(step_time_list * 1000.0, [50, 95, 99])
+    return {
+        "{0}_latency_p50_ms".format(prefix): float(latency_p50),
+        "{0}_latency_p95_ms".format(prefix): float(latency_p95),
+        "{0}_latency_p99_ms".format(prefix): float(latency_p99)
+    }
+
+def run_benchmark(hyperparams,
+                  batch_size,
+                  num_warmup_step,
+                  num_step,
+                  random_seed,
+                  result_queue):
+    """run benchmark for one model & batch size in an isolated process"""
+    logger = DebugLogger(hyperparams.data_log_output_dir)
+    config_proto = get_config_proto(hyperparams.device_log_device_placement,
+        hyperparams.device_allow_soft_placement, hyperparams.device_allow_growth,
+        hyperparams.device_per_process_gpu_memory_fraction)
+    
+    benchmark_result = {}
+    for mode in ["train", "infer"]:
+        logger.log_print("##### benchmark {0} model in {1} mode with batch size {2} #####"
+            .format(hyperparams.model_type, mode, batch_size))
+        graph, model, data_pipeline, build_time = build_synthetic_model(logger,
+            hyperparams, batch_size, random_seed, mode)
+        benchmark_result["{0}_graph_build_time_sec".format(mode)] = build_time
+        
+        with tf.Session(config=config_proto, graph=graph) as sess:
+            with graph.as_default():
+                sess.run(tf.global_variables_initializer())
+                sess.run(tf.tables_initializer())
+            sess.run(data_pipeline.initializer, feed_dict={data_pipeline.data_size_placeholder: batch_size * 4,
+                data_pipeline.batch_size_placeholder: batch_size})
+            
+            if mode == "train":
+                step_time_list = measure_step(lambda: model.train(sess), num_warmup_step, num_step)
+                benchmark_result["train_step_per_sec"] = float(num_step / np.sum(step_time_list))
+                benchmark_result["train_example_per_sec"] = float(num_step * batch_size / np.sum(step_time_list))
+            else:
+                step_time_list = measure_step(lambda: model.infer(sess), num_warmup_step, num_step)
+                benchmark_result["infer_example_per_sec"] = float(num_step * batch_size / np.sum(step_time_list))
+            
+            benchmark_result.update(get_latency_statistic(step_time_list, mode))
+    
+    benchmark_result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    result_queue.put(benchmark_result)
+
+def generate_tiled_attention_score(input_src_data,
+                                   input_trg_data,
+                                   attention_matrix,
+                                   attention_score_type):
+    """reference attention score which tiles src & trg into [batch_size, src_len, trg_len, unit_dim] before scoring"""
+    src_max_length = tf.shape(input_src_data)[1]
+    trg_max_length = tf.shape(input_trg_data)[1]
+    input_src_data = tf.tile(tf.expand_dims(input_src_data, axis=2), multiples=[1, 1, trg_max_length, 1])
+    input_trg_data = tf.tile(tf.expand_dims(input_trg_data, axis=1), multiples=[1, src_max_length, 1, 1])
+    
+    if attention_score_type == "linear":
+        input_attention = (tf.tensordot(input_src_data, attention_matrix[0], axes=[[3], [1]]) +
+            tf.tensordot(input_trg_data, attention_matrix[1], axes=[[3], [1]]))
+    elif attention_score_type == "linear_plus":
+        input_attention = (tf.tensordot(input_src_data, attention_matrix[0], axes=[[3], [1]]) +
+            tf.tensordot(input_trg_data, attention_matrix[1], axes=[[3], [1]]) +
+            tf.tensordot(input_src_data * input_trg_data, attention_matrix[2], axes=[[3], [1]]))
+    elif attention_score_type == "trilinear":
+        input_attention = (tf.tensordot(input_src_data, attention_matrix[0], axes=[[3], [0]]) +
+            tf.tensordot(input_trg_data, attention_matrix[1], axes=[[3], [0]]) +
+            tf.reduce_sum(input_src_data * input_trg_data * attention_matrix[2], axis=-1, keepdims=True))
+    elif attention_score_type == "nonlinear":
+        input_attention = tf.nn.tanh(tf.tensordot(input_src_data, attention_matrix[0], axes=[[3], [1]]) +
+            tf.tensordot(input_trg_data, attention_matrix[1], axes=[[3], [1]]) + attention_matrix[2])
+        input_attention = tf.tensordot(input_attention, attention_matrix[3], axes=[[3], [1]])
+    elif attention_score_type == "nonlinear_plus":
+        input_attention = tf.nn.tanh(tf.tensordot(input_src_data, attention_matrix[0], axes=[[3], [1]]) +
+            tf.tensordot(input_trg_data, attention_matrix[1], axes=[[3], [1]]) +
+            tf.tensordot(input_src_data * input_trg_data, attention_matrix[2], axes=[[3], [1]]) + attention_matrix[3])
+        input_attention = tf.tensordot(input_attention, attention_matrix[4], axes=[[3], [1]])
+    else:
+        raise ValueError("unsupported attention score type {0}".format(attention_score_type))
+    
+    return tf.squeeze(input_attention, axis=-1)
+
+def get_memory_statistic(run_metadata,
+                         prefix):
+    """get peak allocator bytes & total requested bytes of traced step"""
+    peak_bytes = 0
+    requested_bytes = 0
+    for device_stat in run_metadata.step_stats.dev_stats:
+        for node_stat in device_stat.node_stats:
+            for memory_stat in node_stat.memory:
+                peak_bytes = max(peak_bytes, memory_stat.peak_bytes)
+            for output_stat in node_stat.output:
+                requested_bytes += output_stat.tensor_description.allocation_description.requested_bytes
+    
+    return {
+        "{0}_peak_mb".format(prefix): peak_bytes / 1048576.0,
+        "{0}_requested_mb".format(prefix): requested_bytes / 1048576.0
+    }
+
+def run_attention_benchmark(attention_score_type,
+                            batch_size,
+                            src_length,
+                            trg_length,
+                            unit_dim,
+                            hidden_dim,
+                            num_warmup_step,
+                            num_step,
+                            random_seed):
+    """compare forward & backward of broadcast attention score against tiled reference"""
+    graph = tf.Graph()
+    with graph.as_default():
+        np.random.seed(random_seed)
+        input_src_data = tf.Variable(np.random.uniform(-1.0, 1.0, size=[batch_size, src_length, unit_dim]).astype(np.float32))
+        input_trg_data = tf.Variable(np.random.uniform(-1.0, 1.0, size=[batch_size, trg_length, unit_dim]).astype(np.float32))
+        attention_matrix = attention_layer._create_attention_matrix(unit_dim, unit_dim, hidden_dim,
+            attention_score_type, None, random_seed, True, "att_matrix")
+        
+        score_dict = {
+            "broadcast": attention_layer._generate_attention_score(input_src_data,
+                input_trg_data, attention_matrix, attention_score_type),
+            "tile": generate_tiled_attention_score(input_src_data,
+                input_trg_data, attention_matrix, attention_score_type)
+        }
+        train_op_dict = { score_impl: tf.gradients(tf.reduce_sum(score), [input_src_data, input_trg_data] + attention_matrix)
+            for score_impl, score in score_dict.items() }
+        max_abs_diff = tf.reduce_max(tf.abs(score_dict["broadcast"] - score_dict["tile"]))
+        
+        benchmark_result = {}
+        with tf.Session(graph=graph) as sess:
+            sess.run(tf.global_variables_initializer())
+            benchmark_result["max_abs_diff"] = float(sess.run(max_abs_diff))
+            for score_impl, train_op in train_op_dict.items():
+                step_time_list = measure_step(lambda: sess.run(train_op), num_warmup_step, num_step)
+                benchmark_result["{0}_step_per_sec".format(score_impl)] = float(num_step / np.sum(step_time_list))
+                benchmark_result.update(get_latency_statistic(step_time_list, score_impl))
+                
+                run_metadata = tf.RunMetadata()
+                sess.run(train_op, options=tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE), run_metadata=run_metadata)
+                benchmark_result.update(get_memory_statistic(run_metadata, score_impl))
+        
+        benchmark_result["speedup"] = benchmark_result["broadcast_step_per_sec"] / benchmark_result["tile_step_per_sec"]
+    
+    return benchmark_result
+
+def run_retrieval_benchmark(question_data,
+                            context_data,
+                            paragraph_data,
+                            score_type,
+                            top_k_list,
+                            num_worker):
+    """measure recall of gold paragraph & reader cost of top-k paragraphs against reading all paragraphs"""
+    start_time = time.time()
+    retrieval_index = create_retrieval_index(paragraph_data, num_worker, score_type)
+    build_time = time.time() - start_time
+    
+    paragraph_index_dict = { paragraph: paragraph_index for paragraph_index, paragraph in reversed(list(enumerate(paragraph_data))) }
+    paragraph_length = np.asarray([len(paragraph.split(' ')) for paragraph in paragraph_data])
+    
+    max_top_k = max(top_k_list)
+    search_time_list = []
+    gold_rank_list = []
+    candidate_length_list = []
+    for question, context in zip(question_data, context_data):
+        start_time = time.time()
+        search_result = retrieval_index.search(question, max_top_k)
+        search_time_list.append(time.time() - start_time)
+        
+        candidate_index = [paragraph_index for paragraph_index, _ in search_result]
+        gold_index = paragraph_index_dict.get(context, -1)
+        gold_rank_list.append(candidate_index.index(gold_index) if gold_index in candidate_index else max_top_k)
+        candidate_length_list.append(np.cumsum(paragraph_length[candidate_index]) if len(candidate_index) > 0 else np.zeros(1))
+    
+    gold_rank_list = np.asarray(gold_rank_list)
+    search_result = get_latency_statistic(np.asarray(search_time_list), "search")
+    search_result.update({
+        "index_build_sec": build_time,
+        "num_paragraph": len(paragraph_data),
+        "num_question": len(question_data),
+        "num_term": len(retrieval_index.posting_data)
+    })
+    
+    benchmark_result_list = []
+    for top_k in top_k_list:
+        candidate_length = float(np.mean([length_list[min(top_k, len(length_list)) - 1] for length_list in candidate_length_list]))
+        benchmark_result = {
+            "top_k": top_k,
+            "recall": float(np.mean(gold_rank_list < top_k)),
+            "reader_token_per_question": candidate_length,
+            "reader_cost_ratio": candidate_length / max(float(np.sum(paragraph_length)), 1.0)
+        }
+        benchmark_result.update(search_result)
+        benchmark_result_list.append(benchmark_result)
+    
+    return benchmark_result_list
+
+def get_git_commit():
+    """get current git commit of repo"""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def run_import_benchmark(model_type,
+                         num_import_run):
+    """measure median import time of run script & model module in fresh interpreters"""
+    import_result_list = []
+    for _ in range(num_import_run):
+        import_output = subprocess.check_output([sys.executable, "-c", IMPORT_BENCHMARK_CODE, model_type],
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        import_result_list.append(json.loads(import_output.decode("utf-8").strip().split("\n")[-1]))
+    
+    benchmark_result = {}
+    for result_key in import_result_list[0].keys():
+        result_value_list = [import_result[result_key] for import_result in import_result_list]
+        if isinstance(result_value_list[0], bool):
+            benchmark_result[result_key] = any(result_value_list)
+        else:
+            benchmark_result[result_key] = float(np.median(result_value_list))
+    
+    return benchmark_result
+
+def main(args):
+    output_dir = os.path.dirname(os.path.abspath(args.output_file))
+    if not tf.gfile.Exists(output_dir):
+        tf.gfile.MakeDirs(output_dir)
+    
+    git_commit = get_git_commit()
+    if args.benchmark_type == "attention":
+        for attention_score_type in args.attention_score_type:
+            for batch_size in args.batch_size:
+                benchmark_result = run_attention_benchmark(attention_score_type, batch_size,
+                    args.context_length, args.question_length, args.attention_unit_dim, args.attention_hidden_dim,
+                    args.num_warmup_step, args.num_step, args.random_seed)
+                benchmark_result.update({
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+                    "git_commit": git_commit,
+                    "tf_version": tf.__version__,
+                    "attention_score_type": attention_score_type,
+                    "batch_size": batch_size,
+                    "question_length": args.question_length,
+                    "context_length": args.context_length,
+                    "unit_dim": args.attention_unit_dim,
+                    "hidden_dim": args.attention_hidden_dim
+                })
+                
+                with open(args.output_file, "a") as result_file:
+                    result_file.write("{0}\n".format(json.dumps(benchmark_result, sort_keys=True)))
+                print(json.dumps(benchmark_result, sort_keys=True))
+        
+        return
+    
+    if args.benchmark_type == "retrieval":
+        if not args.retrieval_data_file:
+            raise ValueError("retrieval data file must be specified for retrieval benchmark")
+        
+        _, question_data, context_data, _ = load_mrc_data(args.retrieval_data_file, "json", "span", False)
+        if args.retrieval_paragraph_file:
+            with open(args.retrieval_paragraph_file, "r") as paragraph_file:
+                paragraph_data = [paragraph.strip() for paragraph in paragraph_file if paragraph.strip()]
+        else:
+            paragraph_data = list(collections.OrderedDict.fromkeys(context_data))
+        
+        for retrieval_score_type in args.retrieval_score_type:
+            benchmark_result_list = run_retrieval_benchmark(question_data, context_data,
+                paragraph_data, retrieval_score_type, args.retrieval_top_k, args.retrieval_num_worker)
+            for benchmark_result in benchmark_result_list:
+                benchmark_result.update({
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+                    "git_commit": git_commit,
+                    "retrieval_score_type": retrieval_score_type,
+                    "num_worker": args.retrieval_num_worker
+                })
+                
+                with open(args.output_file, "a") as result_file:
+                    result_file.write("{0}\n".format(json.dumps(benchmark_result, sort_keys=True)))
+                print(json.dumps(benchmark_result, sort_keys=True))
+        
+        return
+    
+    if len(args.config) == 0:
+        raise ValueError("at least one config must be specified for {0} benchmark".format(args.benchmark_type))
+    
+    if args.benchmark_type == "import":
+        for config_file in args.config:
+            hyperparams = load_hyperparams(config_file)
+            benchmark_result = run_import_benchmark(hyperparams.model_type, args.num_import_run)
+            benchmark_result.update({
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+                "git_commit": git_commit,
+                "tf_version": tf.__version__,
+                "model_type": hyperparams.model_type,
+                "num_import_run": args.num_import_run
+            })
+            
+            with open(args.output_file, "a") as result_file:
+                result_file.write("{0}\n".format(json.dumps(benchmark_result, sort_keys=True)))
+            print(json.dumps(benchmark_result, sort_keys=True))
+        
+        return
+    
+    process_context = multiprocessing.get_context("spawn")
+    for config_file in args.config:
+        hyperparams = load_hyperparams(config_file)
+        hyperparams.set_hparam("data_max_question_length", args.question_length)
+        hyperparams.set_hparam("data_max_context_length", args.context_length)
+        hyperparams.set_hparam("train_ckpt_output_dir", tempfile.mkdtemp(prefix="benchmark_ckpt_"))
+        hyperparams.set_hparam("train_ema_enable", False)
+        for feat_name, feat_enable in [("word", args.word_feat), ("subword", args.subword_feat), ("char", args.char_feat)]:
+            if feat_enable is not None:
+                hyperparams.set_hparam("model_representation_{0}_feat_enable".format(feat_name), feat_enable == "true")
+        
+        for batch_size in args.batch_size:
+            result_queue = process_context.Queue()
+            benchmark_process = process_context.Process(target=run_benchmark, args=(hyperparams,
+                batch_size, args.num_warmup_step, args.num_step, args.random_seed, result_queue))
+            benchmark_process.start()
+            benchmark_result = result_queue.get()
+            benchmark_process.join()
+            
+            benchmark_result.update({
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+                "git_commit": git_commit,
+                "tf_version": tf.__version__,
+                "model_type": hyperparams.model_type,
+                "batch_size": batch_size,
+                "question_length": args.question_length,
+                "context_length": args.context_length,
+                "word_feat_enable": hyperparams.model_representation_word_feat_enable,
+                "subword_feat_enable": hyperparams.model_representation_subword_feat_enable,
+                "char_feat_enable": hyperparams.model_representation_char_feat_enable,
+                "precision_type": hyperparams.device_precision_type,
+                "num_gpus": hyperparams.device_num_gpus
+            })
+            
+            with open(args.output_file, "a") as result_file:
+                result_file.write("{0}\n".format(json.dumps(benchmark_result, sort_keys=True)))
+            print(json.dumps(benchmark_result, sort_keys=True))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    args = parser.parse_args()
+    main(args)
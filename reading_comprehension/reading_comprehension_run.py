@@ -1,50 +1,50 @@
 import argparse
+import codecs
+import json
+import multiprocessing
 import os.path
+import shutil
+import subprocess
+import sys
+import tempfile
 import time
 
 import numpy as np
 import tensorflow as tf
 
-from tensorflow.python import debug as tf_debug
-
 from util.default_util import *
 from util.param_util import *
+from util.data_util import *
 from util.model_util import *
 from util.eval_util import *
 from util.debug_logger import *
 from util.train_logger import *
 from util.eval_logger import *
 from util.summary_writer import *
+from util.profile_writer import *
+from util.ckpt_manager import *
+from util.train_controller import *
+from util.reading_comprehension_util import *
+
+PROFILE_SCOPE_LIST = ["representation", "understanding", "interaction", "modeling", "output"]
+EVAL_WORKER_STATE = {}
 
 def add_arguments(parser):
     parser.add_argument("--mode", help="mode to run", required=True)
     parser.add_argument("--config", help="path to json config", required=True)
+    parser.add_argument("--job_name", help="job name for distributed training, either ps or worker", default="worker")
+    parser.add_argument("--task_index", help="task index for distributed training", type=int, default=0)
+    parser.add_argument("--ckpt_file", help="path to checkpoint to export or quantize, default to the latest epoch checkpoint", default=None)
 
-def sample_predict(sess,
-                   model,
-                   batch_size,
-                   ckpt_file,
-                   eval_mode):
-    load_model(sess, model, ckpt_file, eval_mode)
-    
-    data_size = len(model.input_data)
-    feed_dict, data_dict = generate_feed_dict(model, data_size, batch_size)
-    sess.run(model.data_pipeline.initializer, feed_dict=feed_dict)
-    
-    predict_span = []
-    while True:
-        try:
-            infer_result = model.model.infer(sess)
-            predict_span.extend(infer_result.predict)
-        except  tf.errors.OutOfRangeError:
-            break
-    
-    predict_size = len(predict_span)
-    if data_size != predict_size:
-        raise ValueError("input data size {0} and output data size {1} is not the same".format(data_size, predict_size))
-    
+def create_debug_session(sess):
+    """debug module is only imported when debug mode is enabled"""
+    from tensorflow.python import debug as tf_debug
+    return tf_debug.LocalCLIDebugWrapperSession(sess)
+
+def create_sample_result(predict_span,
+                         data_dict):
     sample_result = []
-    for i in range(data_size):
+    for i in range(len(predict_span)):
         sample_id = data_dict["input_data"][i]["id"]
         context = data_dict["input_context"][i]
         context_tokens = context.split(" ")
@@ -64,10 +64,12 @@ def sample_predict(sess,
             "answers": []
         })
         
+        """answer span is labeled on gold context, which differs from context of retrieved paragraph"""
+        label_tokens = data_dict["input_data"][i].get("context", context).split(" ")
         for answer in data_dict["input_data"][i]["answers"]:
             label_start = int(answer["start"])
             label_end = int(answer["end"])
-            label = " ".join(context_tokens[label_start:label_end+1])
+            label = " ".join(label_tokens[label_start:label_end+1])
             
             sample_result[-1]["answers"].append({
                 "text": label,
@@ -77,6 +79,64 @@ def sample_predict(sess,
     
     return sample_result
 
+def sample_predict(sess,
+                   model,
+                   batch_size,
+                   ckpt_file,
+                   eval_mode,
+                   profile_writer=None,
+                   step_per_profile=0,
+                   profile_tag="infer"):
+    data_size = len(model.input_data)
+    feed_dict, data_dict = generate_feed_dict(model, data_size, batch_size)
+    predict_span, predict_score = infer_predict(sess, model, feed_dict,
+        ckpt_file, eval_mode, profile_writer, step_per_profile, profile_tag)
+    
+    return create_predict_result(predict_span, predict_score, data_dict, model.input_window)
+
+def infer_predict(sess,
+                  model,
+                  feed_dict,
+                  ckpt_file,
+                  eval_mode,
+                  profile_writer=None,
+                  step_per_profile=0,
+                  profile_tag="infer"):
+    load_model(sess, model, ckpt_file, eval_mode)
+    sess.run(model.data_pipeline.initializer, feed_dict=feed_dict)
+    
+    predict_span = []
+    predict_score = []
+    infer_step = 0
+    while True:
+        try:
+            infer_step += 1
+            enable_profile = profile_writer is not None and infer_step % step_per_profile == 0
+            run_metadata = tf.RunMetadata() if enable_profile == True else None
+            infer_result = model.model.infer(sess, run_metadata)
+            predict_span.extend(infer_result.predict)
+            predict_score.extend(compute_answer_span_score(infer_result.predict, infer_result.predict_detail))
+            if enable_profile == True:
+                profile_writer.add_profile(run_metadata, infer_step, profile_tag)
+        except  tf.errors.OutOfRangeError:
+            break
+    
+    return predict_span, predict_score
+
+def create_predict_result(predict_span,
+                          predict_score,
+                          data_dict,
+                          input_window):
+    data_size = data_dict["data_size"]
+    predict_size = len(predict_span)
+    if data_size != predict_size:
+        raise ValueError("input data size {0} and output data size {1} is not the same".format(data_size, predict_size))
+    
+    if input_window is not None:
+        predict_span, data_dict = merge_window_predict(predict_span, predict_score, input_window)
+    
+    return create_sample_result(predict_span, data_dict)
+
 def extrinsic_eval(logger,
                    summary_writer,
                    sample_result,
@@ -113,6 +173,10 @@ def extrinsic_eval(logger,
     logger.update_extrinsic_eval_detail(eval_result_detail, basic_info)
     logger.check_extrinsic_eval()
     logger.check_extrinsic_eval_detail()
+    
+    eval_score = { eval_result.metric: eval_result.score for eval_result in eval_result_list }
+    
+    return eval_score
 
 def decoding_eval(logger,
                   sample_result,
@@ -142,6 +206,12 @@ def decoding_eval(logger,
     logger.update_decoding_eval(eval_result_list, basic_info)
     logger.check_decoding_eval()
 
+def add_train_statistic_summary(summary_writer,
+                                train_statistic,
+                                global_step):
+    for statistic_name, statistic_value in train_statistic.items():
+        summary_writer.add_value_summary("train_statistic/{0}".format(statistic_name), statistic_value, global_step)
+
 def generate_feed_dict(model,
                        data_size,
                        batch_size):
@@ -201,10 +271,35 @@ def generate_feed_dict(model,
     
     return feed_dict, data_dict
 
+def create_ckpt_manager(hyperparams):
+    if hyperparams.train_ckpt_best_enable == False:
+        return None
+    
+    ckpt_manager = CheckpointManager(os.path.join(hyperparams.train_ckpt_output_dir, "best"),
+        hyperparams.train_ckpt_best_metric, hyperparams.train_ckpt_best_max_to_keep)
+    
+    return ckpt_manager
+
+def average_epoch_ckpt(logger,
+                       hyperparams,
+                       model):
+    if hyperparams.train_ckpt_average_num <= 0:
+        return None
+    
+    ckpt_file_list = model.model.get_ckpt_list("epoch")[-hyperparams.train_ckpt_average_num:]
+    average_file = average_ckpt(ckpt_file_list,
+        os.path.join(hyperparams.train_ckpt_output_dir, "average", "model_average_ckpt"))
+    logger.log_print("##### average {0} epoch checkpoints into {1} #####".format(len(ckpt_file_list), average_file))
+    
+    return average_file
+
 def train(logger,
           hyperparams,
           enable_eval=True,
           enable_debug=False):
+    if hyperparams.device_distributed_enable == True:
+        raise ValueError("distributed training is enabled, please run with train_dist or train_dist_local mode")
+    
     config_proto = get_config_proto(hyperparams.device_log_device_placement,
         hyperparams.device_allow_soft_placement, hyperparams.device_allow_growth,
         hyperparams.device_per_process_gpu_memory_fraction)
@@ -217,106 +312,606 @@ def train(logger,
     train_model = create_train_model(logger, hyperparams)
     train_sess = tf.Session(config=config_proto, graph=train_model.graph)
     if enable_debug == True:
-        train_sess = tf_debug.LocalCLIDebugWrapperSession(train_sess)
+        train_sess = create_debug_session(train_sess)
     
     train_summary_writer = SummaryWriter(train_model.graph, os.path.join(summary_output_dir, "train"))
     init_model(train_sess, train_model)
-    train_logger = TrainLogger(hyperparams.data_log_output_dir)
+    train_logger = TrainLogger(hyperparams.data_log_output_dir,
+        hyperparams.train_step_latency_window, hyperparams.train_step_breakdown_enable)
+    
+    if hyperparams.train_profile_enable == True:
+        train_profile_writer = ProfileWriter(train_model.graph,
+            os.path.join(hyperparams.train_profile_output_dir, "train"), PROFILE_SCOPE_LIST)
     
     if enable_eval == True:
         logger.log_print("##### create infer model #####")
         infer_model = create_infer_model(logger, hyperparams)
         infer_sess = tf.Session(config=config_proto, graph=infer_model.graph)
         if enable_debug == True:
-            infer_sess = tf_debug.LocalCLIDebugWrapperSession(infer_sess)
+            infer_sess = create_debug_session(infer_sess)
         
         infer_summary_writer = SummaryWriter(infer_model.graph, os.path.join(summary_output_dir, "infer"))
         init_model(infer_sess, infer_model)
         eval_logger = EvalLogger(hyperparams.data_log_output_dir)
+        ckpt_manager = create_ckpt_manager(hyperparams)
     
-    logger.log_print("##### start training #####")
     global_step = 0
-    for epoch in range(hyperparams.train_num_epoch):
+    start_epoch = 0
+    start_step_in_epoch = 0
+    if hyperparams.train_resume_enable == True:
+        ckpt_file, start_epoch, start_step_in_epoch = resume_model(train_sess, train_model)
+        if ckpt_file is not None:
+            global_step = int(train_sess.run(train_model.model.global_step))
+            logger.log_print("##### resume training from {0} at epoch {1} step {2} #####"
+                .format(ckpt_file, start_epoch, start_step_in_epoch))
+    
+    train_controller_state_file = os.path.join(hyperparams.train_ckpt_output_dir, "train_controller_state.json")
+    if hyperparams.train_stop_enable == True:
+        train_controller = TrainController(hyperparams.data_log_output_dir, hyperparams.train_stop_metric,
+            hyperparams.train_stop_patience, hyperparams.train_stop_min_delta, hyperparams.train_stop_metric_threshold,
+            hyperparams.train_stop_max_time, hyperparams.train_stop_max_step)
+        if hyperparams.train_resume_enable == True and global_step > 0:
+            if train_controller.load_state(train_controller_state_file) == True:
+                logger.log_print("##### resume train controller with {0} evals since best step {1} #####"
+                    .format(train_controller.num_stale_eval, train_controller.best_global_step))
+    else:
+        train_controller = None
+    
+    logger.log_print("##### start training #####")
+    train_result = None
+    update_per_profile = 0
+    for epoch in range(start_epoch, hyperparams.train_num_epoch):
         feed_dict, data_dict = generate_feed_dict(train_model, len(train_model.input_answer), hyperparams.train_batch_size)
+        step_in_epoch = start_step_in_epoch if epoch == start_epoch else 0
+        feed_dict[train_model.data_pipeline.skip_size_placeholder] = step_in_epoch
+        feed_dict[train_model.data_pipeline.shuffle_seed_placeholder] = hyperparams.train_random_seed + epoch
         train_sess.run(train_model.data_pipeline.initializer, feed_dict=feed_dict)
         
-        step_in_epoch = 0
         while True:
             try:
+                """profile once per applied update, micro-batches that only accumulate gradients are skipped"""
+                enable_profile = False
+                if hyperparams.train_profile_enable == True and train_model.model.is_update_step() == True:
+                    update_per_profile += 1
+                    enable_profile = update_per_profile % hyperparams.train_step_per_profile == 0
+                run_metadata = tf.RunMetadata() if enable_profile == True else None
+                
                 start_time = time.time()
-                train_result = train_model.model.train(train_sess)
+                train_result = train_model.model.train(train_sess, run_metadata)
                 end_time = time.time()
                 
                 global_step = train_result.global_step
                 step_in_epoch += 1
                 train_logger.update(train_result, epoch, step_in_epoch, end_time-start_time)
                 
+                if enable_profile == True:
+                    train_profile_writer.add_profile(run_metadata, global_step, "train")
+                
                 if step_in_epoch % hyperparams.train_step_per_stat == 0:
-                    train_logger.check()
+                    train_statistic = train_logger.check()
                     train_summary_writer.add_summary(train_result.summary, global_step)
+                    add_train_statistic_summary(train_summary_writer, train_statistic, global_step)
                 if step_in_epoch % hyperparams.train_step_per_ckpt == 0:
+                    train_model.model.set_train_position(train_sess, epoch, step_in_epoch)
                     train_model.model.save(train_sess, global_step, "debug")
+                    if train_controller is not None:
+                        train_controller.save_state(train_controller_state_file)
                 if step_in_epoch % hyperparams.train_step_per_eval == 0 and enable_eval == True:
+                    train_model.model.wait_save()
                     ckpt_file = infer_model.model.get_latest_ckpt("debug")
                     sample_result = sample_predict(infer_sess, infer_model, hyperparams.train_eval_batch_size, ckpt_file, "debug")
-                    extrinsic_eval(eval_logger, infer_summary_writer, sample_result,
+                    eval_score = extrinsic_eval(eval_logger, infer_summary_writer, sample_result,
                         hyperparams.train_eval_metric, hyperparams.train_eval_detail_type, global_step, epoch)
+                    if ckpt_manager is not None:
+                        ckpt_manager.add_ckpt(ckpt_file, global_step, eval_score)
+                    if train_controller is not None:
+                        train_controller.update_eval(eval_score, global_step)
+                        train_controller.save_state(train_controller_state_file)
                     decoding_eval(eval_logger, sample_result, hyperparams.train_decoding_sample_size, 
                         hyperparams.train_random_seed + global_step, global_step, epoch)
+                if train_controller is not None and train_controller.check_stop(global_step) == True:
+                    train_model.model.set_train_position(train_sess, epoch, step_in_epoch)
+                    train_model.model.save(train_sess, global_step, "debug")
+                    train_controller.save_state(train_controller_state_file)
+                    break
             except tf.errors.OutOfRangeError:
-                train_logger.check()
-                train_summary_writer.add_summary(train_result.summary, global_step)
+                train_statistic = train_logger.check()
+                if train_result is not None:
+                    train_summary_writer.add_summary(train_result.summary, global_step)
+                add_train_statistic_summary(train_summary_writer, train_statistic, global_step)
+                train_model.model.set_train_position(train_sess, epoch + 1, 0)
                 train_model.model.save(train_sess, global_step, "epoch")
+                if train_controller is not None:
+                    train_controller.save_state(train_controller_state_file)
                 if enable_eval == True:
+                    train_model.model.wait_save()
                     ckpt_file = infer_model.model.get_latest_ckpt("epoch")
                     sample_result = sample_predict(infer_sess, infer_model, hyperparams.train_eval_batch_size, ckpt_file, "epoch")
-                    extrinsic_eval(eval_logger, infer_summary_writer, sample_result,
+                    eval_score = extrinsic_eval(eval_logger, infer_summary_writer, sample_result,
                         hyperparams.train_eval_metric, hyperparams.train_eval_detail_type, global_step, epoch)
+                    if ckpt_manager is not None:
+                        ckpt_manager.add_ckpt(ckpt_file, global_step, eval_score)
+                    if train_controller is not None:
+                        train_controller.update_eval(eval_score, global_step)
+                        train_controller.save_state(train_controller_state_file)
                     decoding_eval(eval_logger, sample_result, hyperparams.train_decoding_sample_size, 
                         hyperparams.train_random_seed + global_step, global_step, epoch)
                 break
-
+        
+        if train_controller is not None and train_controller.check_stop(global_step) == True:
+            logger.log_print("##### stop training at epoch {0} step {1} due to {2}: {3} #####".format(epoch,
+                global_step, train_controller.stop_reason, train_controller.stop_detail))
+            break
+    
+    if train_controller is not None:
+        train_controller.write_record()
+    
+    train_model.model.wait_save()
+    average_epoch_ckpt(logger, hyperparams, train_model)
     train_summary_writer.close_writer()
     if enable_eval == True:
         infer_summary_writer.close_writer()
     
     logger.log_print("##### finish training #####")
 
-def evaluate(logger,
-             hyperparams,
-             enable_debug=False):   
+def train_distributed(logger,
+                      hyperparams,
+                      job_name,
+                      task_index):
+    if hyperparams.device_distributed_enable == False:
+        raise ValueError("distributed training is disabled, please set device_distributed_enable as true")
+    if hyperparams.train_resume_enable == True:
+        raise ValueError("resume training is not supported in distributed training, please set train_resume_enable as false")
+    if hyperparams.train_profile_enable == True:
+        raise ValueError("profiling is not supported in distributed training, please set train_profile_enable as false")
+    if hyperparams.train_stop_enable == True:
+        raise ValueError("early stopping is not supported in distributed training, please set train_stop_enable as false")
+    if hyperparams.train_ckpt_best_enable == True or hyperparams.train_ckpt_average_num > 0:
+        raise ValueError("best & average checkpoint are not supported in distributed training, "
+            "please set train_ckpt_best_enable as false and train_ckpt_average_num as 0")
+    if hyperparams.train_optimizer_accumulate_enable == True:
+        raise ValueError("gradient accumulation is not supported in distributed training, please set train_optimizer_accumulate_enable as false")
+    if hyperparams.train_step_breakdown_enable == True:
+        raise ValueError("step breakdown is not supported in distributed training, please set train_step_breakdown_enable as false")
+    
     config_proto = get_config_proto(hyperparams.device_log_device_placement,
         hyperparams.device_allow_soft_placement, hyperparams.device_allow_growth,
         hyperparams.device_per_process_gpu_memory_fraction)
     
+    cluster_spec = get_cluster_spec(hyperparams.device_ps_hosts, hyperparams.device_worker_hosts)
+    server = tf.train.Server(cluster_spec, job_name=job_name, task_index=task_index, config=config_proto)
+    
+    if job_name == "ps":
+        logger.log_print("##### start parameter server {0} #####".format(task_index))
+        server.join()
+        return
+    elif job_name != "worker":
+        raise ValueError("unsupported job name {0}".format(job_name))
+    
+    is_chief = (task_index == 0)
+    num_worker = cluster_spec.num_tasks("worker")
+    
     summary_output_dir = hyperparams.train_summary_output_dir
-    if not tf.gfile.Exists(summary_output_dir):
+    if is_chief == True and not tf.gfile.Exists(summary_output_dir):
         tf.gfile.MakeDirs(summary_output_dir)
     
-    logger.log_print("##### create infer model #####")
-    infer_model = create_infer_model(logger, hyperparams)
-    infer_sess = tf.Session(config=config_proto, graph=infer_model.graph)
-    if enable_debug == True:
-        infer_sess = tf_debug.LocalCLIDebugWrapperSession(infer_sess)
+    logger.log_print("##### create train model for worker {0} #####".format(task_index))
+    train_model = create_train_model(logger, hyperparams, cluster_spec, task_index)
+    with train_model.graph.as_default():
+        optimizer = train_model.model.optimizer
+        if is_chief == True:
+            local_init_op = tf.group(optimizer.chief_init_op, tf.local_variables_initializer(), tf.tables_initializer())
+        else:
+            local_init_op = tf.group(optimizer.local_step_init_op, tf.local_variables_initializer(), tf.tables_initializer())
+        
+        session_manager = tf.train.SessionManager(local_init_op=local_init_op,
+            ready_op=tf.report_uninitialized_variables(), ready_for_local_init_op=optimizer.ready_for_local_init_op,
+            graph=train_model.graph)
+        
+        if is_chief == True:
+            train_sess = session_manager.prepare_session(server.target,
+                init_op=tf.global_variables_initializer(), config=config_proto)
+            train_sess.run(optimizer.get_init_tokens_op())
+            coordinator = tf.train.Coordinator()
+            queue_runner_threads = optimizer.get_chief_queue_runner().create_threads(train_sess,
+                coord=coordinator, daemon=True, start=True)
+            train_summary_writer = SummaryWriter(train_model.graph, os.path.join(summary_output_dir, "train"))
+            train_logger = TrainLogger(hyperparams.data_log_output_dir,
+                hyperparams.train_step_latency_window, hyperparams.train_step_breakdown_enable)
+        else:
+            train_sess = session_manager.wait_for_session(server.target, config=config_proto)
     
-    infer_summary_writer = SummaryWriter(infer_model.graph, os.path.join(summary_output_dir, "infer"))
+    """keep all workers in lockstep by feeding each of them the same number of full batches"""
+    data_size = len(train_model.input_answer) // (num_worker * hyperparams.train_batch_size) * (num_worker * hyperparams.train_batch_size)
+    if data_size == 0:
+        raise ValueError("train data size {0} is too small for {1} workers with batch size {2}"
+            .format(len(train_model.input_answer), num_worker, hyperparams.train_batch_size))
+    
+    if is_chief == False:
+        logger.log_print("##### worker {0} is not chief, summary & checkpoint are written by chief only #####".format(task_index))
+    
+    logger.log_print("##### start training on worker {0} #####".format(task_index))
+    global_step = 0
+    for epoch in range(hyperparams.train_num_epoch):
+        feed_dict, data_dict = generate_feed_dict(train_model, data_size, hyperparams.train_batch_size)
+        train_sess.run(train_model.data_pipeline.initializer, feed_dict=feed_dict)
+        
+        step_in_epoch = 0
+        while True:
+            try:
+                start_time = time.time()
+                train_result = train_model.model.train(train_sess)
+                end_time = time.time()
+                
+                global_step = train_result.global_step
+                step_in_epoch += 1
+                if is_chief == False:
+                    continue
+                
+                train_logger.update(train_result, epoch, step_in_epoch, end_time-start_time)
+                if step_in_epoch % hyperparams.train_step_per_stat == 0:
+                    train_statistic = train_logger.check()
+                    train_summary_writer.add_summary(train_result.summary, global_step)
+                    add_train_statistic_summary(train_summary_writer, train_statistic, global_step)
+                if step_in_epoch % hyperparams.train_step_per_ckpt == 0:
+                    train_model.model.set_train_position(train_sess, epoch, step_in_epoch)
+                    train_model.model.save(train_sess, global_step, "debug")
+            except tf.errors.OutOfRangeError:
+                if is_chief == True:
+                    train_statistic = train_logger.check()
+                    train_summary_writer.add_summary(train_result.summary, global_step)
+                    add_train_statistic_summary(train_summary_writer, train_statistic, global_step)
+                    train_model.model.set_train_position(train_sess, epoch + 1, 0)
+                    train_model.model.save(train_sess, global_step, "epoch")
+                break
+    
+    if is_chief == True:
+        train_model.model.wait_save()
+        coordinator.request_stop()
+        coordinator.join(queue_runner_threads)
+        train_summary_writer.close_writer()
+    
+    logger.log_print("##### finish training on worker {0} #####".format(task_index))
+
+def train_distributed_local(logger,
+                            hyperparams,
+                            config_file):
+    if hyperparams.device_distributed_enable == False:
+        raise ValueError("distributed training is disabled, please set device_distributed_enable as true")
+    
+    for host in hyperparams.device_ps_hosts + hyperparams.device_worker_hosts:
+        if host.split(":")[0] not in ["localhost", "127.0.0.1"]:
+            raise ValueError("local cluster only supports localhost, but got {0}".format(host))
+    
+    run_command = [sys.executable, os.path.abspath(__file__), "--mode", "train_dist", "--config", config_file]
+    logger.log_print("##### launch local cluster with {0} ps and {1} workers #####"
+        .format(len(hyperparams.device_ps_hosts), len(hyperparams.device_worker_hosts)))
+    ps_process_list = [subprocess.Popen(run_command + ["--job_name", "ps", "--task_index", str(i)])
+        for i in range(len(hyperparams.device_ps_hosts))]
+    worker_process_list = [subprocess.Popen(run_command + ["--job_name", "worker", "--task_index", str(i)])
+        for i in range(len(hyperparams.device_worker_hosts))]
+    
+    return_code_list = [worker_process.wait() for worker_process in worker_process_list]
+    for ps_process in ps_process_list:
+        ps_process.terminate()
+        ps_process.wait()
+    
+    if any(return_code != 0 for return_code in return_code_list):
+        raise RuntimeError("local cluster workers exit with return codes {0}".format(return_code_list))
+    
+    logger.log_print("##### shutdown local cluster #####")
+
+def init_eval_worker(hyperparams,
+                     feature_dir):
+    logger = DebugLogger(hyperparams.data_log_output_dir)
+    config_proto = get_config_proto(hyperparams.device_log_device_placement,
+        hyperparams.device_allow_soft_placement, hyperparams.device_allow_growth,
+        hyperparams.device_per_process_gpu_memory_fraction)
+    config_proto.intra_op_parallelism_threads = hyperparams.train_eval_num_intra_thread
+    
+    """worker graph reads shared feature files only, eval data, vocab & embedding files are never re-read"""
+    infer_model = create_feature_infer_model(logger, hyperparams, feature_dir)
+    infer_sess = tf.Session(config=config_proto, graph=infer_model.graph)
     init_model(infer_sess, infer_model)
-    eval_logger = EvalLogger(hyperparams.data_log_output_dir)
     
+    if hyperparams.train_profile_enable == True:
+        infer_profile_writer = ProfileWriter(infer_model.graph,
+            os.path.join(hyperparams.train_profile_output_dir, "infer"), PROFILE_SCOPE_LIST)
+    else:
+        infer_profile_writer = None
+    
+    EVAL_WORKER_STATE["hyperparams"] = hyperparams
+    EVAL_WORKER_STATE["infer_model"] = infer_model
+    EVAL_WORKER_STATE["infer_sess"] = infer_sess
+    EVAL_WORKER_STATE["infer_profile_writer"] = infer_profile_writer
+
+def run_eval_worker(eval_task):
+    ckpt_index, ckpt_file, eval_mode = eval_task
+    hyperparams = EVAL_WORKER_STATE["hyperparams"]
+    infer_model = EVAL_WORKER_STATE["infer_model"]
+    feed_dict = {
+        infer_model.data_pipeline.data_size_placeholder: len(infer_model.input_answer),
+        infer_model.data_pipeline.batch_size_placeholder: hyperparams.train_eval_batch_size
+    }
+    
+    """only raw predictions are sent back, results are created in parent process which holds eval data"""
+    predict_span, predict_score = infer_predict(EVAL_WORKER_STATE["infer_sess"], infer_model, feed_dict,
+        ckpt_file, eval_mode, EVAL_WORKER_STATE["infer_profile_writer"],
+        hyperparams.train_step_per_profile, "infer_{0}".format(ckpt_index))
+    
+    return predict_span, predict_score
+
+def get_eval_ckpt_list(hyperparams,
+                       eval_mode):
+    ckpt_state = tf.train.get_checkpoint_state(os.path.join(hyperparams.train_ckpt_output_dir, eval_mode))
+    if ckpt_state is None:
+        raise FileNotFoundError("checkpoint files doesn't exist")
+    
+    return ckpt_state.all_model_checkpoint_paths
+
+def run_evaluation(logger,
+                   hyperparams,
+                   eval_logger,
+                   infer_summary_writer,
+                   ckpt_manager,
+                   ckpt_file_list,
+                   sample_result_list):
     logger.log_print("##### start evaluation #####")
-    global_step = 0
-    eval_mode = "debug" if enable_debug == True else "epoch"
-    ckpt_file_list = infer_model.model.get_ckpt_list(eval_mode)
-    for i, ckpt_file in enumerate(ckpt_file_list):
-        sample_result = sample_predict(infer_sess, infer_model, hyperparams.train_eval_batch_size, ckpt_file, eval_mode)
-        extrinsic_eval(eval_logger, infer_summary_writer, sample_result,
+    
+    """merge results into single eval logger stream in checkpoint order, keyed by global step of each checkpoint"""
+    for i, sample_result in enumerate(sample_result_list):
+        global_step = int(ckpt_file_list[i].split("-")[-1])
+        eval_score = extrinsic_eval(eval_logger, infer_summary_writer, sample_result,
             hyperparams.train_eval_metric, hyperparams.train_eval_detail_type, global_step, i)
+        if ckpt_manager is not None:
+            ckpt_manager.add_ckpt(ckpt_file_list[i], global_step, eval_score)
         decoding_eval(eval_logger, sample_result,
             hyperparams.train_decoding_sample_size, hyperparams.train_random_seed, global_step, i)
+
+def evaluate(logger,
+             hyperparams,
+             enable_debug=False):   
+    config_proto = get_config_proto(hyperparams.device_log_device_placement,
+        hyperparams.device_allow_soft_placement, hyperparams.device_allow_growth,
+        hyperparams.device_per_process_gpu_memory_fraction)
+    
+    summary_output_dir = hyperparams.train_summary_output_dir
+    if not tf.gfile.Exists(summary_output_dir):
+        tf.gfile.MakeDirs(summary_output_dir)
+    
+    eval_logger = EvalLogger(hyperparams.data_log_output_dir)
+    ckpt_manager = create_ckpt_manager(hyperparams)
+    
+    eval_mode = "debug" if enable_debug == True else "epoch"
+    ckpt_file_list = get_eval_ckpt_list(hyperparams, eval_mode)
+    num_worker = min(hyperparams.train_eval_num_worker, len(ckpt_file_list))
+    if num_worker > 1:
+        feature_dir = tempfile.mkdtemp(prefix="eval_feature_")
+        try:
+            """featurize eval data once and share it with workers via memory-mapped files, no infer graph is built in parent"""
+            logger.log_print("##### create infer feature #####")
+            infer_data = create_infer_feature(logger, hyperparams, feature_dir)
+            infer_summary_writer = SummaryWriter(None, os.path.join(summary_output_dir, "infer"))
+            data_dict = {
+                "data_size": len(infer_data.input_data),
+                "input_data": infer_data.input_data,
+                "input_context": infer_data.input_context
+            }
+            
+            logger.log_print("##### evaluate {0} checkpoints with {1} workers #####".format(len(ckpt_file_list), num_worker))
+            eval_pool = multiprocessing.get_context("spawn").Pool(num_worker,
+                initializer=init_eval_worker, initargs=(hyperparams, feature_dir))
+            try:
+                predict_result_list = eval_pool.imap(run_eval_worker,
+                    [(i, ckpt_file, eval_mode) for i, ckpt_file in enumerate(ckpt_file_list)])
+                sample_result_list = (create_predict_result(predict_span, predict_score, data_dict, infer_data.input_window)
+                    for predict_span, predict_score in predict_result_list)
+                run_evaluation(logger, hyperparams, eval_logger, infer_summary_writer,
+                    ckpt_manager, ckpt_file_list, sample_result_list)
+            finally:
+                """stop workers even if one of them fails, all results are consumed on success"""
+                eval_pool.terminate()
+                eval_pool.join()
+        finally:
+            shutil.rmtree(feature_dir, ignore_errors=True)
+    else:
+        logger.log_print("##### create infer model #####")
+        infer_model = create_infer_model(logger, hyperparams)
+        infer_sess = tf.Session(config=config_proto, graph=infer_model.graph)
+        if enable_debug == True:
+            infer_sess = create_debug_session(infer_sess)
+        
+        infer_summary_writer = SummaryWriter(infer_model.graph, os.path.join(summary_output_dir, "infer"))
+        init_model(infer_sess, infer_model)
+        
+        if hyperparams.train_profile_enable == True:
+            infer_profile_writer = ProfileWriter(infer_model.graph,
+                os.path.join(hyperparams.train_profile_output_dir, "infer"), PROFILE_SCOPE_LIST)
+        else:
+            infer_profile_writer = None
+        
+        sample_result_list = (sample_predict(infer_sess, infer_model, hyperparams.train_eval_batch_size, ckpt_file, eval_mode,
+            infer_profile_writer, hyperparams.train_step_per_profile, "infer_{0}".format(i)) for i, ckpt_file in enumerate(ckpt_file_list))
+        
+        run_evaluation(logger, hyperparams, eval_logger, infer_summary_writer,
+            ckpt_manager, ckpt_file_list, sample_result_list)
     
     infer_summary_writer.close_writer()
     logger.log_print("##### finish evaluation #####")
 
+def export(logger,
+           hyperparams,
+           ckpt_file=None):
+    """export module pulls in graph transforms, so it is only imported in export mode"""
+    from util.export_util import freeze_model, optimize_graph, create_saved_model
+    
+    config_proto = get_config_proto(hyperparams.device_log_device_placement,
+        hyperparams.device_allow_soft_placement, hyperparams.device_allow_growth,
+        hyperparams.device_per_process_gpu_memory_fraction)
+    
+    logger.log_print("##### create export model #####")
+    export_model = create_export_model(logger, hyperparams)
+    export_sess = tf.Session(config=config_proto, graph=export_model.graph)
+    
+    """restore checkpoint through infer saver, which maps ema shadow variables onto model variables"""
+    if ckpt_file is None:
+        ckpt_file = export_model.model.get_latest_ckpt("epoch")
+    load_model(export_sess, export_model, ckpt_file, "epoch")
+    
+    if hyperparams.train_export_feat_table_enable == True:
+        """char/subword cnn only runs for words missing from precomputed table in exported graph"""
+        logger.log_print("##### precompute subword & char feature table over word vocab #####")
+        feat_table_dict = create_feat_table(logger, export_sess, export_model, hyperparams)
+        export_sess.close()
+        
+        export_model = create_export_model(logger, hyperparams, feat_table_dict)
+        export_sess = tf.Session(config=config_proto, graph=export_model.graph)
+        load_model(export_sess, export_model, ckpt_file, "epoch")
+    
+    logger.log_print("##### freeze & optimize graph from {0} #####".format(ckpt_file))
+    input_name_dict = { input_key: input_tensor.op.name for input_key, input_tensor in export_model.input_dict.items() }
+    output_name_dict = { output_key: output_tensor.op.name for output_key, output_tensor in export_model.output_dict.items() }
+    frozen_graph_def = freeze_model(export_sess, export_model)
+    optimized_graph_def = optimize_graph(frozen_graph_def,
+        list(input_name_dict.values()), list(output_name_dict.values()))
+    export_sess.close()
+    
+    export_dir = os.path.join(hyperparams.train_export_output_dir, ckpt_file.split("-")[-1])
+    if tf.gfile.Exists(export_dir):
+        tf.gfile.DeleteRecursively(export_dir)
+    
+    tf.gfile.MakeDirs(export_dir)
+    tf.train.write_graph(optimized_graph_def, export_dir, "frozen_graph.pb", as_text=False)
+    create_saved_model(optimized_graph_def, input_name_dict, output_name_dict, os.path.join(export_dir, "saved_model"))
+    
+    """ship vocab files so that clients can convert tokens into input ids"""
+    vocab_dir = os.path.join(export_dir, "vocab")
+    tf.gfile.MakeDirs(vocab_dir)
+    for vocab_file, feat_enable in [(hyperparams.data_word_vocab_file, hyperparams.model_representation_word_feat_enable),
+        (hyperparams.data_subword_vocab_file, hyperparams.model_representation_subword_feat_enable),
+        (hyperparams.data_char_vocab_file, hyperparams.model_representation_char_feat_enable)]:
+        if feat_enable == True and tf.gfile.Exists(vocab_file):
+            tf.gfile.Copy(vocab_file, os.path.join(vocab_dir, os.path.basename(vocab_file)), overwrite=True)
+    
+    logger.log_print("##### export {0} nodes into {1} #####".format(len(optimized_graph_def.node), export_dir))
+    
+    return export_dir
+
+def quantize(logger,
+             hyperparams,
+             ckpt_file=None):
+    """quantize module pulls in protobuf & tensor util, so it is only imported in quantize mode"""
+    from util.export_util import create_saved_model
+    from util.quantize_util import (get_quantize_op_list, calibrate_graph,
+        quantize_graph, quantize_graph_kernel, create_graph_session, run_graph)
+    
+    config_proto = get_config_proto(hyperparams.device_log_device_placement,
+        hyperparams.device_allow_soft_placement, hyperparams.device_allow_growth,
+        hyperparams.device_per_process_gpu_memory_fraction)
+    
+    export_dir = export(logger, hyperparams, ckpt_file)
+    graph_def = tf.GraphDef()
+    with tf.gfile.GFile(os.path.join(export_dir, "frozen_graph.pb"), mode="rb") as graph_reader:
+        graph_def.ParseFromString(graph_reader.read())
+    
+    """export graph names input placeholders & output identities after their keys"""
+    input_name_dict = { node.name: node.name for node in graph_def.node if node.op == "Placeholder" }
+    output_name_dict = { output_key: output_key for output_key in ["answer_start", "answer_end", "answer_start_mask", "answer_end_mask"] }
+    
+    logger.log_print("##### create quantize eval data #####")
+    infer_model = create_infer_model(logger, hyperparams)
+    infer_sess = tf.Session(config=config_proto, graph=infer_model.graph)
+    init_model(infer_sess, infer_model)
+    
+    data_size = len(infer_model.input_data)
+    feed_dict, data_dict = generate_feed_dict(infer_model, data_size, hyperparams.train_eval_batch_size)
+    infer_sess.run(infer_model.data_pipeline.initializer, feed_dict=feed_dict)
+    
+    feature_tensor_dict = {
+        "question_word": infer_model.data_pipeline.input_question_word,
+        "question_subword": infer_model.data_pipeline.input_question_subword,
+        "question_char": infer_model.data_pipeline.input_question_char,
+        "context_word": infer_model.data_pipeline.input_context_word,
+        "context_subword": infer_model.data_pipeline.input_context_subword,
+        "context_char": infer_model.data_pipeline.input_context_char
+    }
+    feature_tensor_dict = { feat_name: feature_tensor for feat_name, feature_tensor in feature_tensor_dict.items() if feat_name in input_name_dict }
+    
+    feed_batch_list = []
+    while True:
+        try:
+            feed_batch_list.append(infer_sess.run(feature_tensor_dict))
+        except tf.errors.OutOfRangeError:
+            break
+    
+    infer_sess.close()
+    
+    logger.log_print("##### calibrate activation & quantize weight #####")
+    calibration_batch_num = max(1, -(-hyperparams.train_quantize_calibration_size // hyperparams.train_eval_batch_size))
+    quantize_op_list = get_quantize_op_list(graph_def, hyperparams.train_quantize_min_weight_size)
+    float_sess = create_graph_session(graph_def, config_proto)
+    activation_range_dict = calibrate_graph(float_sess, input_name_dict, feed_batch_list[:calibration_batch_num], quantize_op_list)
+    float_sess.close()
+    
+    """int8 weight graph only shrinks size, int8 weight & activation graph simulates int8 accuracy, int8 kernel graph is shipped"""
+    weight_graph_def = quantize_graph(graph_def, quantize_op_list)
+    activation_graph_def = quantize_graph(graph_def, quantize_op_list, activation_range_dict)
+    kernel_graph_def = quantize_graph_kernel(graph_def, list(input_name_dict.values()),
+        list(output_name_dict.values()), hyperparams.train_quantize_min_weight_size)
+    
+    quantize_report = {
+        "quantize_op_size": len(quantize_op_list),
+        "calibration_size": min(data_size, calibration_batch_num * hyperparams.train_eval_batch_size),
+        "eval_size": data_size,
+        "activation_range": { op_name: list(activation_range) for op_name, activation_range in activation_range_dict.items() }
+    }
+    
+    for graph_type, eval_graph_def in [("float", graph_def), ("int8_weight", weight_graph_def),
+        ("int8_weight_activation", activation_graph_def), ("int8_kernel", kernel_graph_def)]:
+        eval_sess = create_graph_session(eval_graph_def, config_proto)
+        output_list, latency = run_graph(eval_sess, input_name_dict, output_name_dict, feed_batch_list)
+        eval_sess.close()
+        
+        predict_span = []
+        predict_score = []
+        for output in output_list:
+            predict, predict_detail = decode_answer_span(output["answer_start"], output["answer_end"],
+                output["answer_start_mask"], output["answer_end_mask"], len(output["answer_start"]),
+                hyperparams.data_max_context_length, hyperparams.data_max_answer_length)
+            predict_span.extend(predict)
+            predict_score.extend(compute_answer_span_score(predict, predict_detail))
+        
+        sample_data_dict = data_dict
+        if infer_model.input_window is not None:
+            predict_span, sample_data_dict = merge_window_predict(predict_span, predict_score, infer_model.input_window)
+        
+        sample_result = create_sample_result(predict_span, sample_data_dict)
+        predict_text = [sample["predict"]["text"] for sample in sample_result]
+        label_text = [[answer["text"] for answer in sample["answers"]] for sample in sample_result]
+        
+        graph_report = { metric: evaluate_from_data(predict_text, label_text, metric) for metric in hyperparams.train_eval_metric }
+        graph_report["latency_ms"] = latency * 1000
+        graph_report["graph_size_bytes"] = eval_graph_def.ByteSize()
+        if graph_type != "float":
+            float_report = quantize_report["float"]
+            for metric in hyperparams.train_eval_metric:
+                graph_report["{0}_delta".format(metric)] = graph_report[metric] - float_report[metric]
+            graph_report["speedup"] = float_report["latency_ms"] / max(graph_report["latency_ms"], EPSILON)
+            graph_report["size_reduction"] = float_report["graph_size_bytes"] / max(graph_report["graph_size_bytes"], 1)
+        
+        quantize_report[graph_type] = graph_report
+        logger.log_print("# {0} graph: {1}".format(graph_type, ", ".join("{0}={1:.4f}".format(report_key, float(report_value))
+            for report_key, report_value in sorted(graph_report.items()))))
+    
+    tf.train.write_graph(kernel_graph_def, export_dir, "frozen_graph.int8.pb", as_text=False)
+    create_saved_model(kernel_graph_def, input_name_dict, output_name_dict, os.path.join(export_dir, "saved_model_int8"))
+    
+    report_file = os.path.join(export_dir, "quantize_report.json")
+    with codecs.getwriter("utf-8")(tf.gfile.GFile(report_file, mode="w")) as report_writer:
+        json.dump(quantize_report, report_writer, indent=4)
+    
+    logger.log_print("##### quantize {0} ops into {1} #####".format(len(quantize_op_list), export_dir))
+
 def main(args):
     hyperparams = load_hyperparams(args.config)
     logger = DebugLogger(hyperparams.data_log_output_dir)
@@ -330,10 +925,18 @@ def main(args):
         train(logger, hyperparams, enable_eval=True, enable_debug=False)
     elif (args.mode == 'train_debug'):
         train(logger, hyperparams, enable_eval=False, enable_debug=True)
+    elif (args.mode == 'train_dist'):
+        train_distributed(logger, hyperparams, args.job_name, args.task_index)
+    elif (args.mode == 'train_dist_local'):
+        train_distributed_local(logger, hyperparams, args.config)
     elif (args.mode == 'eval'):
         evaluate(logger, hyperparams, enable_debug=False)
     elif (args.mode == 'eval_debug'):
         evaluate(logger, hyperparams, enable_debug=True)
+    elif (args.mode == 'export'):
+        export(logger, hyperparams, args.ckpt_file)
+    elif (args.mode == 'quantize'):
+        quantize(logger, hyperparams, args.ckpt_file)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -193,6 +193,18 @@ def output_to_split(data_list, file_prefix):
                 as_data_plain = "{0}|{1}\r\n".format(answer["start"], answer["end"])
                 as_file.write(as_data_plain.encode("utf-8"))
 
+def output_to_paragraph(data_list, file_name):
+    with open(file_name, "wb") as file:
+        paragraph_set = set()
+        for data in data_list:
+            paragraph = data["context"].replace("\n", " ")
+            if paragraph in paragraph_set:
+                continue
+            
+            paragraph_set.add(paragraph)
+            paragraph_plain = "{0}\r\n".format(paragraph)
+            file.write(paragraph_plain.encode("utf-8"))
+
 def main(args):
     processed_data = preprocess(args.input_file)
     if (args.format == 'json'):
@@ -201,6 +213,8 @@ def main(args):
         output_to_plain(processed_data, args.output_file)
     elif (args.format == 'split'):
         output_to_split(processed_data, args.output_file)
+    elif (args.format == 'paragraph'):
+        output_to_paragraph(processed_data, args.output_file)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
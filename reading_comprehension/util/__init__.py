@@ -1,2 +1,2 @@
-__all__ = ["debug_logger", "train_logger", "eval_logger.py", "summary_writer", "result_writer",
+__all__ = ["debug_logger", "train_logger", "eval_logger.py", "summary_writer", "result_writer", "profile_writer", "ckpt_writer", "ckpt_manager", "train_controller", "search_scheduler", "export_util", "quantize_util", "retrieval_util",
            "default_util", "param_util", "data_util", "model_util", "eval_util", "layer_util", "reading_comprehension_util"]
\ No newline at end of file
@@ -0,0 +1,119 @@
+import codecs
+import json
+import os.path
+
+import numpy as np
+import tensorflow as tf
+
+__all__ = ["CheckpointManager", "average_ckpt"]
+
+class CheckpointManager(object):
+    """checkpoint manager which retains top-k checkpoints by eval metric"""
+    def __init__(self,
+                 output_dir,
+                 metric,
+                 max_to_keep):
+        """initialize checkpoint manager"""
+        self.output_dir = output_dir
+        self.metric = metric
+        self.max_to_keep = max_to_keep
+        if not tf.gfile.Exists(self.output_dir):
+            tf.gfile.MakeDirs(self.output_dir)
+        
+        self.score_file = os.path.join(self.output_dir, "ckpt_score.json")
+        if tf.gfile.Exists(self.score_file):
+            with codecs.getreader("utf-8")(tf.gfile.GFile(self.score_file, "rb")) as score_reader:
+                self.ckpt_score_list = json.load(score_reader)
+        else:
+            self.ckpt_score_list = []
+    
+    def add_ckpt(self,
+                 ckpt_file,
+                 global_step,
+                 eval_score):
+        """record eval score of checkpoint and retain it if it is within top-k"""
+        if self.metric not in eval_score:
+            raise ValueError("eval score doesn't contain metric {0}".format(self.metric))
+        
+        ckpt_score = {
+            "ckpt_file": os.path.join(self.output_dir, os.path.basename(ckpt_file)),
+            "source_ckpt_file": ckpt_file,
+            "global_step": int(global_step),
+            "score": { metric: float(score) for metric, score in eval_score.items() }
+        }
+        
+        ckpt_score_list = [score for score in self.ckpt_score_list if score["ckpt_file"] != ckpt_score["ckpt_file"]]
+        ckpt_score_list.append(ckpt_score)
+        ckpt_score_list = sorted(ckpt_score_list, key=lambda score: score["score"][self.metric], reverse=True)
+        retained_score_list = ckpt_score_list[:self.max_to_keep]
+        dropped_score_list = ckpt_score_list[self.max_to_keep:]
+        
+        if ckpt_score in retained_score_list:
+            for source_file in tf.gfile.Glob("{0}.*".format(ckpt_file)):
+                target_file = os.path.join(self.output_dir, os.path.basename(source_file))
+                tf.gfile.Copy(source_file, target_file, overwrite=True)
+        
+        for dropped_score in dropped_score_list:
+            for dropped_file in tf.gfile.Glob("{0}.*".format(dropped_score["ckpt_file"])):
+                tf.gfile.Remove(dropped_file)
+        
+        """update checkpoint state after files are in place, best checkpoint is reported as the latest one"""
+        self.ckpt_score_list = retained_score_list
+        tf.train.update_checkpoint_state(self.output_dir, self.ckpt_score_list[0]["ckpt_file"],
+            all_model_checkpoint_paths=[score["ckpt_file"] for score in reversed(self.ckpt_score_list)])
+        with codecs.getwriter("utf-8")(tf.gfile.GFile(self.score_file, "w")) as score_writer:
+            json.dump(self.ckpt_score_list, score_writer, indent=4)
+        
+        return ckpt_score in retained_score_list
+    
+    def get_best_ckpt(self):
+        """get the best checkpoint retained so far"""
+        if len(self.ckpt_score_list) == 0:
+            raise FileNotFoundError("best checkpoint file doesn't exist")
+        
+        return self.ckpt_score_list[0]["ckpt_file"]
+
+def average_ckpt(ckpt_file_list,
+                 output_file):
+    """average checkpoints variable by variable, so that only one model copy is held in memory"""
+    if len(ckpt_file_list) == 0:
+        raise ValueError("checkpoint list to average is empty")
+    
+    output_dir = os.path.dirname(output_file)
+    if not tf.gfile.Exists(output_dir):
+        tf.gfile.MakeDirs(output_dir)
+    
+    ckpt_reader_list = [tf.train.load_checkpoint(ckpt_file) for ckpt_file in ckpt_file_list]
+    variable_shape_list = tf.train.list_variables(ckpt_file_list[-1])
+    variable_dtype_map = ckpt_reader_list[-1].get_variable_to_dtype_map()
+    global_step = int(ckpt_file_list[-1].split("-")[-1])
+    
+    graph = tf.Graph()
+    with graph.as_default(), tf.device("/device:CPU:0"):
+        average_placeholder_dict = {}
+        average_variable_dict = {}
+        for i, (variable_name, _) in enumerate(variable_shape_list):
+            average_placeholder = tf.placeholder(dtype=variable_dtype_map[variable_name])
+            average_variable = tf.Variable(average_placeholder, trainable=False,
+                collections=[], validate_shape=False, name="average_{0}".format(i))
+            average_placeholder_dict[variable_name] = average_placeholder
+            average_variable_dict[variable_name] = average_variable
+        
+        average_saver = tf.train.Saver(average_variable_dict, max_to_keep=1)
+    
+    with tf.Session(graph=graph, config=tf.ConfigProto(device_count={"GPU": 0})) as sess:
+        for variable_name, _ in variable_shape_list:
+            """non-float variables such as global step are taken from the latest checkpoint"""
+            variable_value = ckpt_reader_list[-1].get_tensor(variable_name)
+            if variable_dtype_map[variable_name].is_floating:
+                variable_value = variable_value.astype(np.float64) / len(ckpt_reader_list)
+                for ckpt_reader in ckpt_reader_list[:-1]:
+                    variable_value += ckpt_reader.get_tensor(variable_name) / len(ckpt_reader_list)
+                variable_value = variable_value.astype(variable_dtype_map[variable_name].as_numpy_dtype)
+            
+            sess.run(average_variable_dict[variable_name].initializer,
+                feed_dict={average_placeholder_dict[variable_name]: variable_value})
+        
+        average_file = average_saver.save(sess, output_file, global_step=global_step)
+    
+    return average_file
@@ -0,0 +1,83 @@
+import queue
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+__all__ = ["CheckpointWriter"]
+
+class CheckpointWriter(object):
+    """checkpoint writer which serializes host-memory snapshots on background thread, at most max_pending + 1 snapshots are held"""
+    def __init__(self,
+                 variable_list,
+                 ckpt_name,
+                 max_to_keep=5,
+                 max_pending=1):
+        """initialize checkpoint writer"""
+        self.variable_list = variable_list
+        self.variable_name_list = [variable.op.name for variable in variable_list]
+        self.ckpt_name = ckpt_name
+        
+        """build standalone graph which holds snapshot values & mirrors checkpoint names of source variables"""
+        self.graph = tf.Graph()
+        with self.graph.as_default(), tf.device("/device:CPU:0"):
+            self.snapshot_placeholder_list = []
+            snapshot_variable_dict = {}
+            for i, variable in enumerate(self.variable_list):
+                snapshot_placeholder = tf.placeholder(dtype=variable.dtype.base_dtype)
+                snapshot_variable = tf.Variable(snapshot_placeholder, trainable=False,
+                    collections=[], validate_shape=False, name="snapshot_{0}".format(i))
+                self.snapshot_placeholder_list.append(snapshot_placeholder)
+                snapshot_variable_dict[variable.op.name] = snapshot_variable
+            
+            self.snapshot_initializer = [variable.initializer for variable in snapshot_variable_dict.values()]
+            self.snapshot_release = [tf.assign(variable, tf.zeros(shape=[0], dtype=variable.dtype.base_dtype), validate_shape=False)
+                for variable in snapshot_variable_dict.values()]
+            self.snapshot_saver = tf.train.Saver(snapshot_variable_dict, max_to_keep=max_to_keep)
+        
+        self.sess = tf.Session(graph=self.graph, config=tf.ConfigProto(device_count={"GPU": 0}))
+        self.snapshot_queue = queue.Queue(maxsize=max_pending)
+        self.snapshot_error = None
+        self.writer_thread = threading.Thread(target=self._write_snapshot)
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+    
+    def save(self,
+             sess,
+             global_step):
+        """snapshot variables into host memory and queue them for background serialization"""
+        self._check_error()
+        variable_name_list = [variable.op.name for variable in sess.graph.get_collection(tf.GraphKeys.GLOBAL_VARIABLES)]
+        if variable_name_list != self.variable_name_list:
+            raise ValueError("global variables are changed after creating checkpoint writer for {0}".format(self.ckpt_name))
+        
+        snapshot_value_list = sess.run(self.variable_list)
+        self.snapshot_queue.put((snapshot_value_list, global_step))
+    
+    def wait(self):
+        """wait until all queued snapshots are written"""
+        self.snapshot_queue.join()
+        self._check_error()
+    
+    def _check_error(self):
+        """re-raise background serialization error in caller thread"""
+        if self.snapshot_error is not None:
+            snapshot_error = self.snapshot_error
+            self.snapshot_error = None
+            raise snapshot_error
+    
+    def _write_snapshot(self):
+        """serialize queued snapshots, checkpoint state is only updated after data files are fully written"""
+        while True:
+            snapshot_value_list, global_step = self.snapshot_queue.get()
+            try:
+                feed_dict = dict(zip(self.snapshot_placeholder_list, snapshot_value_list))
+                self.sess.run(self.snapshot_initializer, feed_dict=feed_dict)
+                self.snapshot_saver.save(self.sess, self.ckpt_name, global_step=global_step)
+            except Exception as error:
+                self.snapshot_error = error
+            finally:
+                """release snapshot values, so no persistent host copy of parameters is kept between checkpoints"""
+                self.sess.run(self.snapshot_release)
+                snapshot_value_list = None
+                self.snapshot_queue.task_done()
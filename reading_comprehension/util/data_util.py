@@ -7,16 +7,17 @@ import numpy as np
 import tensorflow as tf
 
 from util.default_util import *
+from util.retrieval_util import *
 
 __all__ = ["DataPipeline", "create_data_pipeline",
            "create_src_data", "create_trg_data", "create_src_dataset", "create_trg_dataset",
            "generate_word_feat", "generate_subword_feat", "generate_char_feat",
-           "generate_dataset_from_tfrecord", "create_tfrecord_file",
+           "generate_dataset_from_tfrecord", "create_tfrecord_file", "create_feature_file", "load_feature_file", "create_feature_dataset",
            "create_embedding_file", "load_embedding_file", "convert_embedding",
            "create_vocab_file", "load_vocab_file", "process_vocab_table",
            "create_word_vocab", "create_subword_vocab", "create_char_vocab",
            "load_tsv_data", "load_json_data", "load_mrc_data",
-           "prepare_data", "prepare_mrc_data"]
+           "create_window_data", "merge_window_predict", "prepare_data", "prepare_mrc_data"]
 
 class DataPipeline(collections.namedtuple("DataPipeline",
     ("initializer", "input_question_word", "input_question_subword", "input_question_char",
@@ -27,7 +28,8 @@ class DataPipeline(collections.namedtuple("DataPipeline",
      "input_question_subword_placeholder", "input_question_char_placeholder",
      "input_context_placeholder", "input_context_word_placeholder",
      "input_context_subword_placeholder", "input_context_char_placeholder",
-     "input_answer_placeholder", "data_size_placeholder", "batch_size_placeholder"))):
+     "input_answer_placeholder", "data_size_placeholder", "batch_size_placeholder", "skip_size_placeholder",
+     "shuffle_seed_placeholder", "batch_data"))):
     pass
 
 def create_data_pipeline(input_question_word_dataset,
@@ -60,7 +62,9 @@ def create_data_pipeline(input_question_word_dataset,
                          input_context_char_placeholder,
                          input_answer_placeholder,
                          data_size_placeholder,
-                         batch_size_placeholder):
+                         batch_size_placeholder,
+                         num_shard=1,
+                         shard_index=0):
     """create data pipeline for reading comprehension model"""
     default_pad_id = tf.constant(0, shape=[], dtype=tf.int32)
     default_dataset_tensor = tf.constant(0, shape=[1,1], dtype=tf.int32)
@@ -90,10 +94,26 @@ def create_data_pipeline(input_question_word_dataset,
     dataset = tf.data.Dataset.zip((input_question_word_dataset, input_question_subword_dataset, input_question_char_dataset,
         input_context_word_dataset, input_context_subword_dataset, input_context_char_dataset, input_answer_dataset))
     
+    """shard before shuffle, so that workers read disjoint examples regardless of shuffle order"""
+    if num_shard > 1:
+        dataset = dataset.take(data_size_placeholder)
+        dataset = dataset.shard(num_shard, shard_index)
+    
+    """shuffle seed can be fed per epoch, so that resumed epoch replays the same order before skipping consumed batches"""
+    if random_seed is not None:
+        default_shuffle_seed = tf.constant(random_seed, dtype=tf.int64)
+    else:
+        default_shuffle_seed = tf.random_uniform(shape=[], maxval=MAX_INT, dtype=tf.int64)
+    
+    shuffle_seed_placeholder = tf.placeholder_with_default(default_shuffle_seed, shape=[])
     if enable_shuffle == True:
-        dataset = dataset.shuffle(buffer_size, random_seed)
+        dataset = dataset.shuffle(buffer_size, shuffle_seed_placeholder)
     
     dataset = dataset.batch(batch_size=batch_size_placeholder)
+    
+    """skip already consumed batches when resuming in the middle of epoch"""
+    skip_size_placeholder = tf.placeholder_with_default(tf.constant(0, dtype=tf.int64), shape=[])
+    dataset = dataset.skip(skip_size_placeholder)
     dataset = dataset.prefetch(buffer_size=1)
     
     iterator = dataset.make_initializable_iterator()
@@ -159,7 +179,8 @@ def create_data_pipeline(input_question_word_dataset,
         input_context_subword_placeholder=input_context_subword_placeholder,
         input_context_char_placeholder=input_context_char_placeholder,
         input_answer_placeholder=input_answer_placeholder,
-        data_size_placeholder=data_size_placeholder, batch_size_placeholder=batch_size_placeholder)
+        data_size_placeholder=data_size_placeholder, batch_size_placeholder=batch_size_placeholder,
+        skip_size_placeholder=skip_size_placeholder, shuffle_seed_placeholder=shuffle_seed_placeholder, batch_data=batch_data)
 
 def create_src_data(input_data,
                     word_vocab_index,
@@ -589,6 +610,53 @@ def create_tfrecord_file(tfrecord_file,
             example = tf.train.Example(features=tf.train.Features(feature=feature))
             writer.write(example.SerializeToString())          
 
+def create_feature_file(feature_dir,
+                        input_question_word,
+                        input_question_subword,
+                        input_question_char,
+                        input_context_word,
+                        input_context_subword,
+                        input_context_char,
+                        input_answer,
+                        word_embedding):
+    """create feature files which can be shared across processes via memory-mapping"""
+    if not os.path.exists(feature_dir):
+        os.makedirs(feature_dir)
+    
+    feature_data = {
+        "question_word": input_question_word,
+        "question_subword": input_question_subword,
+        "question_char": input_question_char,
+        "context_word": input_context_word,
+        "context_subword": input_context_subword,
+        "context_char": input_context_char,
+        "answer": input_answer,
+        "word_embedding": word_embedding
+    }
+    
+    for feature_name, feature in feature_data.items():
+        if feature is not None:
+            np.save(os.path.join(feature_dir, "{0}.npy".format(feature_name)), feature)
+
+def load_feature_file(feature_dir):
+    """load memory-mapped feature files"""
+    feature_data = []
+    for feature_name in ["question_word", "question_subword", "question_char",
+        "context_word", "context_subword", "context_char", "answer", "word_embedding"]:
+        feature_file = os.path.join(feature_dir, "{0}.npy".format(feature_name))
+        feature = np.load(feature_file, mmap_mode="r") if os.path.exists(feature_file) else None
+        feature_data.append(feature)
+    
+    return tuple(feature_data)
+
+def create_feature_dataset(feature):
+    """create dataset which reads rows of memory-mapped feature lazily rather than copying feature into graph"""
+    if feature is None:
+        return None
+    
+    return tf.data.Dataset.from_generator(lambda: iter(feature),
+        output_types=tf.int32, output_shapes=tf.TensorShape(feature.shape[1:]))
+
 def create_embedding_file(embedding_file,
                           embedding_table):
     """create embedding file based on embedding table"""
@@ -881,6 +949,103 @@ def validate_data(logger,
     
     return output_mrc_data, output_question_data, output_context_data, output_answer_data
 
+def create_window_data(input_mrc_data,
+                       input_question_data,
+                       input_context_data,
+                       input_answer_data,
+                       window_length,
+                       window_stride,
+                       answer_type,
+                       keep_no_answer,
+                       input_document_index=None):
+    """split context into overlapping windows, answer span is shifted to window offset"""
+    if window_stride <= 0 or window_stride > window_length:
+        raise ValueError("window stride {0} must be in (0, {1}]".format(window_stride, window_length))
+    
+    """records sharing document index are candidate contexts of the same document, e.g. retrieved paragraphs"""
+    if input_document_index is None:
+        input_document_index = list(range(len(input_context_data)))
+    
+    output_mrc_data = []
+    output_question_data = []
+    output_context_data = []
+    output_answer_data = []
+    window_offset = []
+    document_data = collections.OrderedDict()
+    
+    input_data = zip(input_document_index, input_mrc_data, input_question_data, input_context_data, input_answer_data)
+    for context_index, (document_index, input_mrc, input_question, input_context, input_answer) in enumerate(input_data):
+        document_data.setdefault(document_index, input_mrc)
+        context_tokens = input_context.split(' ')
+        context_length = len(context_tokens)
+        
+        window_start_list = list(range(0, max(context_length - window_length, 0) + 1, window_stride))
+        if window_start_list[-1] + window_length < context_length:
+            window_start_list.append(context_length - window_length)
+        
+        for window_start in window_start_list:
+            window_end = window_start + window_length
+            window_answer = input_answer
+            if answer_type == "span":
+                answer_span = input_answer.split('|')
+                answer_start = int(answer_span[0].strip())
+                answer_end = int(answer_span[1].strip())
+                if answer_start >= window_start and answer_end < window_end:
+                    window_answer = "{0}|{1}".format(answer_start - window_start, answer_end - window_start)
+                elif keep_no_answer == True:
+                    window_answer = "0|0"
+                else:
+                    continue
+            elif answer_type == "text":
+                """text answer is kept as is, window without answer tokens is dropped same as span answer"""
+                answer_tokens = input_answer.split(' ')
+                window_tokens = context_tokens[window_start:window_end]
+                answer_found = any(window_tokens[i:i+len(answer_tokens)] == answer_tokens
+                    for i in range(len(window_tokens) - len(answer_tokens) + 1))
+                if answer_found == False and keep_no_answer == False:
+                    continue
+            
+            output_mrc_data.append(input_mrc)
+            output_question_data.append(input_question)
+            output_context_data.append(" ".join(context_tokens[window_start:window_end]))
+            output_answer_data.append(window_answer)
+            window_offset.append((document_index, context_index, window_start))
+    
+    window_data = {
+        "input_data": document_data,
+        "input_context": list(input_context_data),
+        "window_offset": window_offset
+    }
+    
+    return output_mrc_data, output_question_data, output_context_data, output_answer_data, window_data
+
+def merge_window_predict(predict_span,
+                         predict_score,
+                         window_data):
+    """map window span back to context offset, keep span with max score for each document"""
+    document_predict = collections.OrderedDict()
+    window_predict = zip(window_data["window_offset"], predict_span, predict_score)
+    for (document_index, context_index, window_start), window_span, window_score in window_predict:
+        if document_index in document_predict and document_predict[document_index][2] >= window_score:
+            continue
+        
+        if window_span[0] < 0:
+            context_span = (-1, -1)
+        else:
+            context_span = (int(window_span[0]) + window_start, int(window_span[1]) + window_start)
+        
+        document_predict[document_index] = (context_span, context_index, window_score)
+    
+    document_index_list = [document_index for document_index in window_data["input_data"] if document_index in document_predict]
+    document_span = [document_predict[document_index][0] for document_index in document_index_list]
+    document_dict = {
+        "data_size": len(document_index_list),
+        "input_data": [window_data["input_data"][document_index] for document_index in document_index_list],
+        "input_context": [window_data["input_context"][document_predict[document_index][1]] for document_index in document_index_list]
+    }
+    
+    return document_span, document_dict
+
 def prepare_data(logger,
                  input_data,
                  word_vocab_file,
@@ -1015,6 +1180,17 @@ def prepare_mrc_data(logger,
                      max_context_length,
                      max_answer_length,
                      enable_validation,
+                     enable_window,
+                     window_stride,
+                     window_keep_no_answer,
+                     enable_retrieval,
+                     retrieval_index_file,
+                     retrieval_paragraph_file,
+                     retrieval_score_type,
+                     retrieval_top_k,
+                     retrieval_num_worker,
+                     retrieval_bm25_k1,
+                     retrieval_bm25_b,
                      word_vocab_file,
                      word_vocab_size,
                      word_vocab_threshold,
@@ -1056,12 +1232,36 @@ def prepare_mrc_data(logger,
         raise ValueError("question, context & answer input data must have the same size")
     
     if enable_validation == True:
+        """long context is split into windows instead of being dropped when window is enabled"""
+        validate_context_length = MAX_INT if enable_window == True else max_context_length
         (input_mrc_data, input_question_data, input_context_data,
             input_answer_data) = validate_data(logger, input_mrc_data, input_question_data, input_context_data, input_answer_data,
-            max_question_length, max_context_length, max_answer_length, input_answer_type)
+            max_question_length, validate_context_length, max_answer_length, input_answer_type)
         input_mrc_size = len(input_mrc_data)
         logger.log_print("# input mrc data has {0} lines after validation".format(input_mrc_size))
     
+    input_document_index = None
+    if enable_retrieval == True:
+        retrieval_index = prepare_retrieval_index(logger, retrieval_index_file, retrieval_paragraph_file, input_context_data,
+            retrieval_num_worker, retrieval_score_type, retrieval_bm25_k1, retrieval_bm25_b)
+        (input_mrc_data, input_question_data, input_context_data,
+            input_answer_data, input_document_index) = create_retrieval_data(input_mrc_data, input_question_data,
+            input_context_data, input_answer_data, retrieval_index, retrieval_top_k, input_answer_type)
+        input_mrc_size = len(input_mrc_data)
+        logger.log_print("# input mrc data has {0} retrieved paragraphs".format(input_mrc_size))
+    
+    input_window_data = None
+    if enable_window == True or enable_retrieval == True:
+        """retrieved paragraphs are merged like windows, each paragraph is one window if window is disabled"""
+        window_length = max_context_length if enable_window == True else MAX_INT
+        window_stride = window_stride if enable_window == True else window_length
+        (input_mrc_data, input_question_data, input_context_data,
+            input_answer_data, input_window_data) = create_window_data(input_mrc_data, input_question_data,
+            input_context_data, input_answer_data, window_length, window_stride, input_answer_type,
+            window_keep_no_answer, input_document_index)
+        input_mrc_size = len(input_mrc_data)
+        logger.log_print("# input mrc data has {0} windows after splitting context".format(input_mrc_size))
+    
     input_text_data = set()
     input_text_data.update(input_question_data)
     input_text_data.update(input_context_data)
@@ -1077,7 +1277,7 @@ def prepare_mrc_data(logger,
             subword_vocab_file, subword_vocab_size, subword_vocab_threshold, subword_unk, subword_pad, subword_size,
             subword_feat_enable, char_vocab_file, char_vocab_size, char_vocab_threshold, char_unk, char_pad, char_feat_enable)
     
-    return (input_mrc_data, input_question_data, input_context_data, input_answer_data,
+    return (input_mrc_data, input_question_data, input_context_data, input_answer_data, input_window_data,
         word_embed_data, word_vocab_size, word_vocab_index, word_vocab_inverted_index,
         subword_vocab_size, subword_vocab_index, subword_vocab_inverted_index,
         char_vocab_size, char_vocab_index, char_vocab_inverted_index)
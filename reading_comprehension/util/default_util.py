@@ -1,11 +1,14 @@
 import numpy as np
 import tensorflow as tf
 
-__all__ = ["EPSILON", "MAX_INT", "MIN_FLOAT", "check_tensorflow_version", "safe_exp", "get_config_proto", "get_device_spec"]
+__all__ = ["EPSILON", "MAX_INT", "MIN_FLOAT", "MIN_HALF_FLOAT", "MIN_BFLOAT", "check_tensorflow_version", "safe_exp", "get_config_proto", "get_device_spec",
+           "get_cluster_spec", "get_replica_device_setter", "get_precision_dtype", "get_min_float", "create_master_weight_getter"]
 
 EPSILON = 1e-30
 MAX_INT = 2147483647
 MIN_FLOAT = -1e30
+MIN_HALF_FLOAT = -1e4
+MIN_BFLOAT = -1e9
 
 def check_tensorflow_version():
     """check tensorflow version in current environment"""
@@ -43,3 +46,66 @@ def get_device_spec(device_id, num_gpus):
         device_spec = "/device:GPU:{0}".format(device_id % num_gpus)
     
     return device_spec
+
+def get_cluster_spec(ps_hosts,
+                     worker_hosts):
+    """get cluster specification"""
+    if len(ps_hosts) == 0 or len(worker_hosts) == 0:
+        raise ValueError("cluster must have at least one ps host and one worker host")
+    
+    cluster_spec = tf.train.ClusterSpec({
+        "ps": ps_hosts,
+        "worker": worker_hosts
+    })
+    
+    return cluster_spec
+
+def get_replica_device_setter(cluster_spec,
+                              task_index):
+    """get replica device setter for distributed training"""
+    if cluster_spec is None:
+        return None
+    
+    device_setter = tf.train.replica_device_setter(
+        worker_device="/job:worker/task:{0}".format(task_index), cluster=cluster_spec)
+    
+    return device_setter
+
+def get_precision_dtype(precision_type):
+    """get compute data type for precision type"""
+    if precision_type == "float32":
+        precision_dtype = tf.float32
+    elif precision_type == "float16":
+        precision_dtype = tf.float16
+    elif precision_type == "bfloat16":
+        precision_dtype = tf.bfloat16
+    else:
+        raise ValueError("unsupported precision type {0}".format(precision_type))
+    
+    return precision_dtype
+
+def get_min_float(data_type):
+    """get masking value which is safe for data type"""
+    if data_type.base_dtype == tf.float16:
+        return MIN_HALF_FLOAT
+    elif data_type.base_dtype == tf.bfloat16:
+        return MIN_BFLOAT
+    
+    return MIN_FLOAT
+
+def create_master_weight_getter():
+    """create variable getter which keeps float32 master weights for reduced-precision variables"""
+    def master_weight_getter(getter,
+                             name,
+                             *args,
+                             **kwargs):
+        precision_dtype = kwargs.get("dtype")
+        if precision_dtype not in [tf.float16, tf.bfloat16]:
+            return getter(name, *args, **kwargs)
+        
+        kwargs["dtype"] = tf.float32
+        variable = getter(name, *args, **kwargs)
+        
+        return tf.cast(variable, precision_dtype)
+    
+    return master_weight_getter
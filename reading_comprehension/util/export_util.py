@@ -0,0 +1,55 @@
+import os.path
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.tools.graph_transforms import TransformGraph
+
+__all__ = ["freeze_model", "optimize_graph", "create_saved_model"]
+
+GRAPH_TRANSFORM_LIST = [
+    "remove_nodes(op=Identity, op=CheckNumerics, op=StopGradient)",
+    "fold_constants(ignore_errors=true)",
+    "fold_batch_norms",
+    "merge_duplicate_nodes",
+    "sort_by_execution_order"
+]
+
+def freeze_model(sess,
+                 model):
+    """convert restored variables into constants & keep only ops reachable from outputs"""
+    output_node_list = [output.op.name for output in model.output_dict.values()]
+    frozen_graph_def = tf.graph_util.convert_variables_to_constants(sess,
+        model.graph.as_graph_def(), output_node_list)
+    frozen_graph_def = tf.graph_util.remove_training_nodes(frozen_graph_def, protected_nodes=output_node_list)
+    
+    return frozen_graph_def
+
+def optimize_graph(graph_def,
+                   input_node_list,
+                   output_node_list):
+    """apply constant folding & pruning transforms on frozen graph"""
+    optimized_graph_def = TransformGraph(graph_def, input_node_list, output_node_list, GRAPH_TRANSFORM_LIST)
+    
+    return optimized_graph_def
+
+def create_saved_model(graph_def,
+                       input_name_dict,
+                       output_name_dict,
+                       export_dir):
+    """create serving saved model from frozen graph"""
+    graph = tf.Graph()
+    with graph.as_default():
+        tf.import_graph_def(graph_def, name="")
+        input_dict = { input_key: graph.get_tensor_by_name("{0}:0".format(input_name))
+            for input_key, input_name in input_name_dict.items() }
+        output_dict = { output_key: graph.get_tensor_by_name("{0}:0".format(output_name))
+            for output_key, output_name in output_name_dict.items() }
+        
+        with tf.Session(graph=graph) as sess:
+            saved_model_builder = tf.saved_model.builder.SavedModelBuilder(export_dir)
+            serving_signature = tf.saved_model.signature_def_utils.predict_signature_def(inputs=input_dict, outputs=output_dict)
+            saved_model_builder.add_meta_graph_and_variables(sess, [tf.saved_model.tag_constants.SERVING],
+                signature_def_map={ tf.saved_model.signature_constants.DEFAULT_SERVING_SIGNATURE_DEF_KEY: serving_signature },
+                strip_default_attrs=True)
+            saved_model_builder.save()
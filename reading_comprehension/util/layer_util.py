@@ -30,11 +30,13 @@ def create_embedding_layer(vocab_size,
                            default_gpu_id,
                            regularizer,
                            random_seed,
-                           trainable):
+                           trainable,
+                           trainable_size=0):
     """create embedding layer"""
     if pretrained == True:
         embed_layer = PretrainedEmbedding(vocab_size=vocab_size, embed_dim=embed_dim, embed_data=embed_data,
-            num_gpus=num_gpus, default_gpu_id=default_gpu_id, regularizer=regularizer, trainable=trainable)
+            num_gpus=num_gpus, default_gpu_id=default_gpu_id, regularizer=regularizer,
+            trainable=trainable, trainable_size=trainable_size)
     else:
         embed_layer = Embedding(vocab_size=vocab_size, embed_dim=embed_dim,
             num_gpus=num_gpus, default_gpu_id=default_gpu_id, regularizer=regularizer, random_seed=random_seed, trainable=trainable)
@@ -224,7 +226,11 @@ def create_attention_layer(attention_type,
                            default_gpu_id,
                            regularizer,
                            random_seed,
-                           trainable):
+                           trainable,
+                           chunk_size=0,
+                           window_size=0,
+                           num_global=0,
+                           length_mask=False):
     """create attention layer"""
     scope = "attention/{0}".format(attention_type)
     if attention_type == "att":
@@ -256,7 +262,18 @@ def create_attention_layer(attention_type,
             score_type=score_type, dropout=dropout, att_dropout=att_dropout, layer_dropout=layer_dropout,
             layer_norm=layer_norm, residual_connect=residual_connect, is_self=is_self,
             external_matrix=external_matrix, num_gpus=num_gpus, default_gpu_id=default_gpu_id, 
-            regularizer=regularizer, random_seed=random_seed, trainable=trainable, scope=scope)
+            regularizer=regularizer, random_seed=random_seed, trainable=trainable, chunk_size=chunk_size,
+            length_mask=length_mask, scope=scope)
+    elif attention_type == "local_multi_head_att":
+        if window_size <= 0:
+            raise ValueError("window size must be positive for local multi-head attention")
+        
+        attention_layer = MultiHeadAttention(src_dim=src_dim, trg_dim=trg_dim, att_dim=att_dim, num_head=num_head,
+            score_type=score_type, dropout=dropout, att_dropout=att_dropout, layer_dropout=layer_dropout,
+            layer_norm=layer_norm, residual_connect=residual_connect, is_self=is_self,
+            external_matrix=external_matrix, num_gpus=num_gpus, default_gpu_id=default_gpu_id,
+            regularizer=regularizer, random_seed=random_seed, trainable=trainable,
+            window_size=window_size, num_global=num_global, scope=scope)
     else:
         raise ValueError("unsupported attention type {0}".format(attention_type))
     
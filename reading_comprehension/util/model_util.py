@@ -1,17 +1,23 @@
 import collections
+import importlib
 import os.path
 
 import numpy as np
 import tensorflow as tf
 
-from model.bidaf import *
-from model.qanet import *
-from model.rnet import *
+from util.default_util import *
 from util.data_util import *
 
-__all__ = ["TrainModel", "InferModel",
-           "create_train_model", "create_infer_model",
-           "init_model", "load_model"]
+__all__ = ["TrainModel", "InferModel", "InferData", "ExportModel",
+           "create_train_model", "create_infer_model", "create_infer_feature", "create_feature_infer_model",
+           "create_export_model", "create_feat_table", "get_model_creator",
+           "init_model", "load_model", "resume_model"]
+
+MODEL_REGISTRY = {
+    "bidaf": ("model.bidaf", "BiDAF"),
+    "qanet": ("model.qanet", "QANet"),
+    "rnet": ("model.rnet", "RNet")
+}
 
 class TrainModel(collections.namedtuple("TrainModel",
     ("graph", "model", "data_pipeline", "word_embedding", "input_data",
@@ -22,21 +28,37 @@ class TrainModel(collections.namedtuple("TrainModel",
 class InferModel(collections.namedtuple("InferModel",
     ("graph", "model", "data_pipeline", "word_embedding", "input_data",
      "input_question", "input_question_word", "input_question_subword", "input_question_char",
-     "input_context", "input_context_word", "input_context_subword", "input_context_char", "input_answer"))):
+     "input_context", "input_context_word", "input_context_subword", "input_context_char", "input_answer", "input_window"))):
+    pass
+
+class InferData(collections.namedtuple("InferData",
+    ("word_embedding", "input_data",
+     "input_question", "input_question_word", "input_question_subword", "input_question_char",
+     "input_context", "input_context_word", "input_context_subword", "input_context_char", "input_answer", "input_window"))):
+    pass
+
+class ExportModel(collections.namedtuple("ExportModel",
+    ("graph", "model", "data_pipeline", "input_dict", "output_dict"))):
     pass
 
 def create_train_model(logger,
-                       hyperparams):
+                       hyperparams,
+                       cluster_spec=None,
+                       task_index=0):
     graph = tf.Graph()
     with graph.as_default():
         logger.log_print("# prepare train data")
-        (input_data, input_question_data, input_context_data, input_answer_data,
+        (input_data, input_question_data, input_context_data, input_answer_data, _,
              word_embed_data, word_vocab_size, word_vocab_index, word_vocab_inverted_index,
              subword_vocab_size, subword_vocab_index, subword_vocab_inverted_index,
              char_vocab_size, char_vocab_index, char_vocab_inverted_index) = prepare_mrc_data(logger,
              hyperparams.data_train_mrc_file, hyperparams.data_train_mrc_file_type, hyperparams.data_answer_type,
              hyperparams.data_expand_multiple_answer, hyperparams.data_max_question_length, hyperparams.data_max_context_length,
-             hyperparams.data_max_answer_length, hyperparams.data_enable_validation, hyperparams.data_word_vocab_file,
+             hyperparams.data_max_answer_length, hyperparams.data_enable_validation, hyperparams.data_context_window_enable,
+             hyperparams.data_context_window_stride, False, False, hyperparams.data_retrieval_index_file,
+             hyperparams.data_retrieval_paragraph_file, hyperparams.data_retrieval_score_type, hyperparams.data_retrieval_top_k,
+             hyperparams.data_retrieval_num_worker, hyperparams.data_retrieval_bm25_k1, hyperparams.data_retrieval_bm25_b,
+             hyperparams.data_word_vocab_file,
              hyperparams.data_word_vocab_size, hyperparams.data_word_vocab_threshold, hyperparams.model_representation_word_embed_dim,
              hyperparams.data_embedding_file, hyperparams.data_full_embedding_file, hyperparams.data_word_unk,
              hyperparams.data_word_pad, hyperparams.data_word_sos, hyperparams.data_word_eos,
@@ -231,6 +253,7 @@ def create_train_model(logger,
                 hyperparams.data_word_placeholder_enable, hyperparams.data_num_parallel)
         
         logger.log_print("# create train data pipeline")
+        num_shard = cluster_spec.num_tasks("worker") if cluster_spec is not None else 1
         data_size_placeholder = tf.placeholder(shape=[], dtype=tf.int64)
         batch_size_placeholder = tf.placeholder(shape=[], dtype=tf.int64)
         data_pipeline = create_data_pipeline(input_question_word_dataset,
@@ -243,11 +266,12 @@ def create_train_model(logger,
             input_question_placeholder, input_question_word_placeholder, input_question_subword_placeholder,
             input_question_char_placeholder, input_context_placeholder, input_context_word_placeholder,
             input_context_subword_placeholder, input_context_char_placeholder, input_answer_placeholder,
-            data_size_placeholder, batch_size_placeholder)
+            data_size_placeholder, batch_size_placeholder, num_shard, task_index)
         
         model_creator = get_model_creator(hyperparams.model_type)
-        model = model_creator(logger=logger, hyperparams=hyperparams, data_pipeline=data_pipeline,
-            external_data=external_data, mode="train", scope=hyperparams.model_scope)
+        with tf.device(get_replica_device_setter(cluster_spec, task_index)):
+            model = model_creator(logger=logger, hyperparams=hyperparams, data_pipeline=data_pipeline,
+                external_data=external_data, mode="train", scope=hyperparams.model_scope)
         
         return TrainModel(graph=graph, model=model, data_pipeline=data_pipeline,
             word_embedding=word_embed_data, input_data=input_data, input_question=input_question_data,
@@ -261,13 +285,17 @@ def create_infer_model(logger,
     graph = tf.Graph()
     with graph.as_default():
         logger.log_print("# prepare infer data")
-        (input_data, input_question_data, input_context_data, input_answer_data,
+        (input_data, input_question_data, input_context_data, input_answer_data, input_window_data,
              word_embed_data, word_vocab_size, word_vocab_index, word_vocab_inverted_index,
              subword_vocab_size, subword_vocab_index, subword_vocab_inverted_index,
              char_vocab_size, char_vocab_index, char_vocab_inverted_index) = prepare_mrc_data(logger,
              hyperparams.data_eval_mrc_file, hyperparams.data_eval_mrc_file_type, hyperparams.data_answer_type,
              hyperparams.data_expand_multiple_answer, hyperparams.data_max_question_length, hyperparams.data_max_context_length,
-             hyperparams.data_max_answer_length, hyperparams.data_enable_validation, hyperparams.data_word_vocab_file,
+             hyperparams.data_max_answer_length, hyperparams.data_enable_validation, hyperparams.data_context_window_enable,
+             hyperparams.data_context_window_stride, True, hyperparams.data_retrieval_enable, hyperparams.data_retrieval_index_file,
+             hyperparams.data_retrieval_paragraph_file, hyperparams.data_retrieval_score_type, hyperparams.data_retrieval_top_k,
+             hyperparams.data_retrieval_num_worker, hyperparams.data_retrieval_bm25_k1, hyperparams.data_retrieval_bm25_b,
+             hyperparams.data_word_vocab_file,
              hyperparams.data_word_vocab_size, hyperparams.data_word_vocab_threshold, hyperparams.model_representation_word_embed_dim,
              hyperparams.data_embedding_file, hyperparams.data_full_embedding_file, hyperparams.data_word_unk,
              hyperparams.data_word_pad, hyperparams.data_word_sos, hyperparams.data_word_eos,
@@ -484,18 +512,259 @@ def create_infer_model(logger,
             input_question_word=input_question_word_data, input_question_subword=input_question_subword_data,
             input_question_char=input_question_char_data, input_context=input_context_data,
             input_context_word=input_context_word_data, input_context_subword=input_context_subword_data,
-            input_context_char=input_context_char_data, input_answer=input_answer_data)
+            input_context_char=input_context_char_data, input_answer=input_answer_data, input_window=input_window_data)
+
+def create_infer_feature(logger,
+                         hyperparams,
+                         feature_dir):
+    logger.log_print("# prepare infer data")
+    (input_data, input_question_data, input_context_data, input_answer_data, input_window_data,
+         word_embed_data, word_vocab_size, word_vocab_index, word_vocab_inverted_index,
+         subword_vocab_size, subword_vocab_index, subword_vocab_inverted_index,
+         char_vocab_size, char_vocab_index, char_vocab_inverted_index) = prepare_mrc_data(logger,
+         hyperparams.data_eval_mrc_file, hyperparams.data_eval_mrc_file_type, hyperparams.data_answer_type,
+         hyperparams.data_expand_multiple_answer, hyperparams.data_max_question_length, hyperparams.data_max_context_length,
+         hyperparams.data_max_answer_length, hyperparams.data_enable_validation, hyperparams.data_context_window_enable,
+         hyperparams.data_context_window_stride, True, hyperparams.data_retrieval_enable, hyperparams.data_retrieval_index_file,
+         hyperparams.data_retrieval_paragraph_file, hyperparams.data_retrieval_score_type, hyperparams.data_retrieval_top_k,
+         hyperparams.data_retrieval_num_worker, hyperparams.data_retrieval_bm25_k1, hyperparams.data_retrieval_bm25_b,
+         hyperparams.data_word_vocab_file,
+         hyperparams.data_word_vocab_size, hyperparams.data_word_vocab_threshold, hyperparams.model_representation_word_embed_dim,
+         hyperparams.data_embedding_file, hyperparams.data_full_embedding_file, hyperparams.data_word_unk,
+         hyperparams.data_word_pad, hyperparams.data_word_sos, hyperparams.data_word_eos,
+         hyperparams.model_representation_word_feat_enable, hyperparams.model_representation_word_embed_pretrained,
+         hyperparams.data_subword_vocab_file, hyperparams.data_subword_vocab_size, hyperparams.data_subword_vocab_threshold, 
+         hyperparams.data_subword_unk, hyperparams.data_subword_pad, hyperparams.data_subword_size,
+         hyperparams.model_representation_subword_feat_enable, hyperparams.data_char_vocab_file,
+         hyperparams.data_char_vocab_size, hyperparams.data_char_vocab_threshold, hyperparams.data_char_unk,
+         hyperparams.data_char_pad, hyperparams.model_representation_char_feat_enable)
+    
+    logger.log_print("# create infer question data")
+    (input_question_word_data, input_question_subword_data,
+         input_question_char_data) = create_src_data(input_question_data,
+         word_vocab_index, hyperparams.data_max_question_length, hyperparams.data_word_pad, hyperparams.data_word_sos,
+         hyperparams.data_word_eos, hyperparams.data_word_placeholder_enable, hyperparams.model_representation_word_feat_enable,
+         subword_vocab_index, hyperparams.data_max_subword_length, hyperparams.data_subword_pad,
+         hyperparams.data_subword_size, hyperparams.model_representation_subword_feat_enable, char_vocab_index,
+         hyperparams.data_max_char_length, hyperparams.data_char_pad, hyperparams.model_representation_char_feat_enable)
+    
+    logger.log_print("# create infer context data")
+    (input_context_word_data, input_context_subword_data,
+         input_context_char_data) = create_src_data(input_context_data,
+         word_vocab_index, hyperparams.data_max_context_length, hyperparams.data_word_pad, hyperparams.data_word_sos,
+         hyperparams.data_word_eos, hyperparams.data_word_placeholder_enable, hyperparams.model_representation_word_feat_enable,
+         subword_vocab_index, hyperparams.data_max_subword_length, hyperparams.data_subword_pad,
+         hyperparams.data_subword_size, hyperparams.model_representation_subword_feat_enable, char_vocab_index,
+         hyperparams.data_max_char_length, hyperparams.data_char_pad, hyperparams.model_representation_char_feat_enable)
+    
+    logger.log_print("# create infer answer data")
+    input_answer_data = create_trg_data(input_answer_data, hyperparams.data_answer_type,
+        word_vocab_index, hyperparams.data_max_answer_length, hyperparams.data_word_pad,
+        hyperparams.data_word_sos, hyperparams.data_word_eos, hyperparams.data_word_placeholder_enable)
+    
+    logger.log_print("# create infer feature file")
+    create_feature_file(feature_dir, input_question_word_data, input_question_subword_data, input_question_char_data,
+        input_context_word_data, input_context_subword_data, input_context_char_data, input_answer_data, word_embed_data)
+    
+    return InferData(word_embedding=word_embed_data, input_data=input_data, input_question=input_question_data,
+        input_question_word=input_question_word_data, input_question_subword=input_question_subword_data,
+        input_question_char=input_question_char_data, input_context=input_context_data,
+        input_context_word=input_context_word_data, input_context_subword=input_context_subword_data,
+        input_context_char=input_context_char_data, input_answer=input_answer_data, input_window=input_window_data)
+
+def create_feature_infer_model(logger,
+                               hyperparams,
+                               feature_dir):
+    graph = tf.Graph()
+    with graph.as_default():
+        logger.log_print("# load infer feature data")
+        (input_question_word_data, input_question_subword_data, input_question_char_data,
+            input_context_word_data, input_context_subword_data, input_context_char_data,
+            input_answer_data, word_embed_data) = load_feature_file(feature_dir)
+        
+        external_data = {}
+        if word_embed_data is not None:
+            external_data["word_embedding"] = word_embed_data
+        
+        """process_vocab_table always places unk & pad at index 0 & 1 of vocab, so full vocab is not needed for pad lookup"""
+        word_vocab_tensor_index = (tf.contrib.lookup.index_table_from_tensor(
+            mapping=tf.constant([hyperparams.data_word_unk, hyperparams.data_word_pad]), default_value=0)
+            if hyperparams.model_representation_word_feat_enable else None)
+        subword_vocab_tensor_index = (tf.contrib.lookup.index_table_from_tensor(
+            mapping=tf.constant([hyperparams.data_subword_unk, hyperparams.data_subword_pad]), default_value=0)
+            if hyperparams.model_representation_subword_feat_enable else None)
+        char_vocab_tensor_index = (tf.contrib.lookup.index_table_from_tensor(
+            mapping=tf.constant([hyperparams.data_char_unk, hyperparams.data_char_pad]), default_value=0)
+            if hyperparams.model_representation_char_feat_enable else None)
+        
+        logger.log_print("# create infer dataset from feature data")
+        input_question_word_dataset = create_feature_dataset(input_question_word_data)
+        input_question_subword_dataset = create_feature_dataset(input_question_subword_data)
+        input_question_char_dataset = create_feature_dataset(input_question_char_data)
+        input_context_word_dataset = create_feature_dataset(input_context_word_data)
+        input_context_subword_dataset = create_feature_dataset(input_context_subword_data)
+        input_context_char_dataset = create_feature_dataset(input_context_char_data)
+        input_answer_dataset = create_feature_dataset(input_answer_data)
+        
+        logger.log_print("# create infer data pipeline")
+        data_size_placeholder = tf.placeholder(shape=[], dtype=tf.int64)
+        batch_size_placeholder = tf.placeholder(shape=[], dtype=tf.int64)
+        data_pipeline = create_data_pipeline(input_question_word_dataset,
+            input_question_subword_dataset, input_question_char_dataset, input_context_word_dataset,
+            input_context_subword_dataset, input_context_char_dataset, input_answer_dataset, hyperparams.data_answer_type,
+            word_vocab_tensor_index, hyperparams.data_word_pad, hyperparams.model_representation_word_feat_enable,
+            subword_vocab_tensor_index, hyperparams.data_subword_pad, hyperparams.model_representation_subword_feat_enable,
+            char_vocab_tensor_index, hyperparams.data_char_pad, hyperparams.model_representation_char_feat_enable, False, 0, 0,
+            None, None, None, None, None, None, None, None, None, data_size_placeholder, batch_size_placeholder)
+        
+        model_creator = get_model_creator(hyperparams.model_type)
+        model = model_creator(logger=logger, hyperparams=hyperparams, data_pipeline=data_pipeline,
+            external_data=external_data, mode="infer", scope=hyperparams.model_scope)
+        
+        return InferModel(graph=graph, model=model, data_pipeline=data_pipeline,
+            word_embedding=word_embed_data, input_data=None, input_question=None,
+            input_question_word=input_question_word_data, input_question_subword=input_question_subword_data,
+            input_question_char=input_question_char_data, input_context=None,
+            input_context_word=input_context_word_data, input_context_subword=input_context_subword_data,
+            input_context_char=input_context_char_data, input_answer=input_answer_data, input_window=None)
+
+def create_export_model(logger,
+                        hyperparams,
+                        feat_table_dict=None):
+    graph = tf.Graph()
+    with graph.as_default():
+        logger.log_print("# create export input placeholder")
+        input_placeholder_dict = {}
+        input_feature_dict = {}
+        for input_type, max_length in [("question", hyperparams.data_max_question_length),
+            ("context", hyperparams.data_max_context_length)]:
+            for feat_type, feat_length, feat_enable in [("word", 1, hyperparams.model_representation_word_feat_enable),
+                ("subword", hyperparams.data_max_subword_length, hyperparams.model_representation_subword_feat_enable),
+                ("char", hyperparams.data_max_char_length, hyperparams.model_representation_char_feat_enable)]:
+                feat_name = "{0}_{1}".format(input_type, feat_type)
+                if feat_enable == False:
+                    input_feature_dict[feat_name] = (None, None)
+                    continue
+                
+                """process_vocab_table always places unk & pad at index 0 & 1 of vocab"""
+                input_placeholder = tf.placeholder(shape=[None, max_length, feat_length], dtype=tf.int32, name=feat_name)
+                input_mask = tf.cast(tf.not_equal(input_placeholder, 1), dtype=tf.float32)
+                input_placeholder_dict[feat_name] = input_placeholder
+                input_feature_dict[feat_name] = (input_placeholder, input_mask)
+        
+        if len(input_placeholder_dict) == 0:
+            raise ValueError("at least one of word, subword or char feature must be enabled")
+        
+        """answer input is only consumed by train ops, so constant span is fed to infer graph"""
+        batch_size = tf.shape(list(input_placeholder_dict.values())[0])[0]
+        input_answer = tf.zeros(shape=tf.stack([batch_size, 2, 1]), dtype=tf.int32)
+        input_answer_mask = tf.ones(shape=tf.stack([batch_size, 2, 1]), dtype=tf.float32)
+        
+        data_pipeline = DataPipeline(initializer=None,
+            input_question_word=input_feature_dict["question_word"][0],
+            input_question_subword=input_feature_dict["question_subword"][0],
+            input_question_char=input_feature_dict["question_char"][0],
+            input_context_word=input_feature_dict["context_word"][0],
+            input_context_subword=input_feature_dict["context_subword"][0],
+            input_context_char=input_feature_dict["context_char"][0], input_answer=input_answer,
+            input_question_word_mask=input_feature_dict["question_word"][1],
+            input_question_subword_mask=input_feature_dict["question_subword"][1],
+            input_question_char_mask=input_feature_dict["question_char"][1],
+            input_context_word_mask=input_feature_dict["context_word"][1],
+            input_context_subword_mask=input_feature_dict["context_subword"][1],
+            input_context_char_mask=input_feature_dict["context_char"][1], input_answer_mask=input_answer_mask,
+            input_question_placeholder=None, input_question_word_placeholder=input_feature_dict["question_word"][0],
+            input_question_subword_placeholder=input_feature_dict["question_subword"][0],
+            input_question_char_placeholder=input_feature_dict["question_char"][0],
+            input_context_placeholder=None, input_context_word_placeholder=input_feature_dict["context_word"][0],
+            input_context_subword_placeholder=input_feature_dict["context_subword"][0],
+            input_context_char_placeholder=input_feature_dict["context_char"][0], input_answer_placeholder=None,
+            data_size_placeholder=None, batch_size_placeholder=None, skip_size_placeholder=None,
+            shuffle_seed_placeholder=None, batch_data=None)
+        
+        """pretrained embedding values are restored from checkpoint, so only scalar initial value is needed"""
+        external_data = {}
+        if hyperparams.model_representation_word_embed_pretrained == True:
+            external_data["word_embedding"] = np.float32(0.0)
+        
+        """precomputed subword/char feature of vocab words are frozen into graph as constants"""
+        if feat_table_dict is not None:
+            external_data.update(feat_table_dict)
+        
+        model_creator = get_model_creator(hyperparams.model_type)
+        model = model_creator(logger=logger, hyperparams=hyperparams, data_pipeline=data_pipeline,
+            external_data=external_data, mode="infer", scope=hyperparams.model_scope)
+        
+        output_dict = {
+            "answer_start": tf.identity(model.infer_answer_start, name="answer_start"),
+            "answer_end": tf.identity(model.infer_answer_end, name="answer_end"),
+            "answer_start_mask": tf.identity(model.infer_answer_start_mask, name="answer_start_mask"),
+            "answer_end_mask": tf.identity(model.infer_answer_end_mask, name="answer_end_mask")
+        }
+        
+        return ExportModel(graph=graph, model=model, data_pipeline=data_pipeline,
+            input_dict=input_placeholder_dict, output_dict=output_dict)
+
+def create_feat_table(logger,
+                      sess,
+                      model,
+                      hyperparams):
+    if hyperparams.model_representation_word_feat_enable == False:
+        raise ValueError("word feature must be enabled to look up precomputed feature table by word id")
+    
+    (_, word_vocab_size, word_vocab_index, word_vocab_inverted_index,
+        _, subword_vocab_index, _, _, char_vocab_index, _) = prepare_data(logger, None,
+            hyperparams.data_word_vocab_file, hyperparams.data_word_vocab_size, hyperparams.data_word_vocab_threshold,
+            hyperparams.model_representation_word_embed_dim, hyperparams.data_embedding_file, hyperparams.data_full_embedding_file,
+            hyperparams.data_word_unk, hyperparams.data_word_pad, hyperparams.data_word_sos, hyperparams.data_word_eos,
+            hyperparams.model_representation_word_feat_enable, hyperparams.model_representation_word_embed_pretrained,
+            hyperparams.data_subword_vocab_file, hyperparams.data_subword_vocab_size, hyperparams.data_subword_vocab_threshold,
+            hyperparams.data_subword_unk, hyperparams.data_subword_pad, hyperparams.data_subword_size,
+            model.model.subword_feat_layer is not None, hyperparams.data_char_vocab_file, hyperparams.data_char_vocab_size,
+            hyperparams.data_char_vocab_threshold, hyperparams.data_char_unk, hyperparams.data_char_pad,
+            model.model.char_feat_layer is not None)
+    
+    word_list = [word_vocab_inverted_index[word_index] for word_index in range(word_vocab_size)]
+    _, subword_data, char_data = create_src_data(word_list, None, 1, hyperparams.data_word_pad,
+        hyperparams.data_word_sos, hyperparams.data_word_eos, False, False, subword_vocab_index,
+        hyperparams.data_max_subword_length, hyperparams.data_subword_pad, hyperparams.data_subword_size,
+        model.model.subword_feat_layer is not None, char_vocab_index, hyperparams.data_max_char_length,
+        hyperparams.data_char_pad, model.model.char_feat_layer is not None)
+    
+    """padding positions hold pad token in every slot, so pad word is featurized from all-pad tokens"""
+    word_pad_index = word_vocab_index[hyperparams.data_word_pad]
+    feat_batch_size = hyperparams.train_eval_batch_size * hyperparams.data_max_context_length
+    feat_table_dict = {}
+    for feat_type, feat_layer, token_data, token_vocab_index, token_pad in [
+        ("subword", model.model.subword_feat_layer, subword_data, subword_vocab_index, hyperparams.data_subword_pad),
+        ("char", model.model.char_feat_layer, char_data, char_vocab_index, hyperparams.data_char_pad)]:
+        if feat_layer is None or token_data is None:
+            continue
+        
+        token_pad_index = token_vocab_index[token_pad]
+        token_data = np.squeeze(token_data, axis=1).astype(np.int32)
+        token_data[word_pad_index] = token_pad_index
+        with model.graph.as_default():
+            input_token = tf.placeholder(shape=[None, 1, token_data.shape[-1]], dtype=tf.int32)
+            input_token_mask = tf.cast(tf.not_equal(input_token, token_pad_index), dtype=tf.float32)
+            output_feat, _ = feat_layer(input_token, input_token_mask)
+        
+        feat_data = [sess.run(output_feat, feed_dict={ input_token: np.expand_dims(token_data[i:i+feat_batch_size], axis=1) })
+            for i in range(0, len(token_data), feat_batch_size)]
+        feat_data = np.squeeze(np.concatenate(feat_data, axis=0), axis=1).astype(np.float32)
+        feat_table_dict["{0}_feat_table".format(feat_type)] = (token_data, feat_data)
+        logger.log_print("# {0} feature table has {1} words with {2} dims".format(feat_type, feat_data.shape[0], feat_data.shape[1]))
+    
+    return feat_table_dict
 
 def get_model_creator(model_type):
-    if model_type == "bidaf":
-        model_creator = BiDAF
-    elif model_type == "qanet":
-        model_creator = QANet
-    elif model_type == "rnet":
-        model_creator = RNet
-    else:
+    """get model creator from registry, model module is only imported on first use"""
+    if model_type not in MODEL_REGISTRY:
         raise ValueError("can not create model with unsupported model type {0}".format(model_type))
     
+    model_module, model_class = MODEL_REGISTRY[model_type]
+    model_creator = getattr(importlib.import_module(model_module), model_class)
+    
     return model_creator
 
 def init_model(sess,
@@ -510,3 +779,24 @@ def load_model(sess,
                ckpt_type):
     with model.graph.as_default():
         model.model.restore(sess, ckpt_file, ckpt_type)
+
+def resume_model(sess,
+                 model):
+    ckpt_candidate_list = []
+    for ckpt_type in ["debug", "epoch"]:
+        try:
+            ckpt_file = model.model.get_latest_ckpt(ckpt_type)
+        except FileNotFoundError:
+            continue
+        
+        ckpt_step = int(ckpt_file.split("-")[-1])
+        ckpt_candidate_list.append((ckpt_step, ckpt_type, ckpt_file))
+    
+    if len(ckpt_candidate_list) == 0:
+        return None, 0, 0
+    
+    _, ckpt_type, ckpt_file = max(ckpt_candidate_list)
+    load_model(sess, model, ckpt_file, ckpt_type)
+    epoch, step_in_epoch = model.model.get_train_position(sess)
+    
+    return ckpt_file, epoch, step_in_epoch
@@ -48,6 +48,16 @@ def create_default_hyperparams(config_type):
             data_answer_type="",
             data_expand_multiple_answer=False,
             data_enable_validation=True,
+            data_context_window_enable=False,
+            data_context_window_stride=128,
+            data_retrieval_enable=False,
+            data_retrieval_index_file="data/squad/resource/squad.dev.paragraph.index",
+            data_retrieval_paragraph_file="",
+            data_retrieval_score_type="bm25",
+            data_retrieval_top_k=5,
+            data_retrieval_num_worker=4,
+            data_retrieval_bm25_k1=1.2,
+            data_retrieval_bm25_b=0.75,
             data_pipeline_mode="tfrecord",
             data_num_parallel=4,
             data_log_output_dir="",
@@ -57,15 +67,39 @@ def create_default_hyperparams(config_type):
             train_shuffle_buffer_size=30000,
             train_batch_size=60,
             train_eval_batch_size=100,
+            train_eval_num_worker=1,
+            train_eval_num_intra_thread=0,
             train_eval_metric=["exact", "f1"],
             train_eval_detail_type="full",
             train_decoding_sample_size=3,
             train_num_epoch=3,
             train_ckpt_output_dir="",
             train_summary_output_dir="",
+            train_profile_output_dir="",
+            train_export_output_dir="",
+            train_export_feat_table_enable=False,
+            train_quantize_calibration_size=100,
+            train_quantize_min_weight_size=1024,
             train_step_per_stat=10,
             train_step_per_ckpt=1000,
+            train_ckpt_async_enable=False,
+            train_resume_enable=False,
+            train_ckpt_best_enable=False,
+            train_ckpt_best_metric="f1",
+            train_ckpt_best_max_to_keep=3,
+            train_ckpt_average_num=0,
             train_step_per_eval=1000,
+            train_step_breakdown_enable=False,
+            train_step_latency_window=1000,
+            train_profile_enable=False,
+            train_step_per_profile=1000,
+            train_stop_enable=False,
+            train_stop_metric="f1",
+            train_stop_patience=3,
+            train_stop_min_delta=0.0,
+            train_stop_metric_threshold=0.0,
+            train_stop_max_time=0,
+            train_stop_max_step=0,
             train_clip_norm=5.0,
             train_label_smoothing=0.0,
             train_enable_debugging=False,
@@ -87,6 +121,10 @@ def create_default_hyperparams(config_type):
             train_optimizer_decay_rate=0.95,
             train_optimizer_decay_step=1000,
             train_optimizer_decay_start_step=10000,
+            train_optimizer_accumulate_enable=False,
+            train_optimizer_accumulate_step=4,
+            train_optimizer_loss_scale_init=32768.0,
+            train_optimizer_loss_scale_incr_step=1000,
             train_optimizer_momentum_beta=0.9,
             train_optimizer_rmsprop_beta=0.999,
             train_optimizer_rmsprop_epsilon=1e-8,
@@ -101,6 +139,7 @@ def create_default_hyperparams(config_type):
             model_representation_word_embed_dim=100,
             model_representation_word_embed_pretrained=True,
             model_representation_word_feat_trainable=False,
+            model_representation_word_feat_trainable_size=0,
             model_representation_word_feat_enable=True,
             model_representation_subword_embed_dim=8,
             model_representation_subword_unit_dim=100,
@@ -108,6 +147,7 @@ def create_default_hyperparams(config_type):
             model_representation_subword_hidden_activation="relu",
             model_representation_subword_dropout=0.2,
             model_representation_subword_pooling_type="max",
+            model_representation_subword_unique_enable=False,
             model_representation_subword_feat_trainable=True,
             model_representation_subword_feat_enable=True,
             model_representation_char_embed_dim=8,
@@ -116,6 +156,7 @@ def create_default_hyperparams(config_type):
             model_representation_char_hidden_activation="relu",
             model_representation_char_dropout=0.2,
             model_representation_char_pooling_type="max",
+            model_representation_char_unique_enable=False,
             model_representation_char_feat_trainable=True,
             model_representation_char_feat_enable=True,
             model_representation_fusion_type="highway",
@@ -200,7 +241,11 @@ def create_default_hyperparams(config_type):
             device_log_device_placement=False,
             device_allow_soft_placement=False,
             device_allow_growth=False,
-            device_per_process_gpu_memory_fraction=0.8
+            device_per_process_gpu_memory_fraction=0.8,
+            device_precision_type="float32",
+            device_distributed_enable=False,
+            device_ps_hosts=["localhost:2222"],
+            device_worker_hosts=["localhost:2223", "localhost:2224"]
         )
     elif config_type == "qanet":
         hyperparams = tf.contrib.training.HParams(
@@ -238,6 +283,16 @@ def create_default_hyperparams(config_type):
             data_answer_type="",
             data_expand_multiple_answer=False,
             data_enable_validation=True,
+            data_context_window_enable=False,
+            data_context_window_stride=128,
+            data_retrieval_enable=False,
+            data_retrieval_index_file="data/squad/resource/squad.dev.paragraph.index",
+            data_retrieval_paragraph_file="",
+            data_retrieval_score_type="bm25",
+            data_retrieval_top_k=5,
+            data_retrieval_num_worker=4,
+            data_retrieval_bm25_k1=1.2,
+            data_retrieval_bm25_b=0.75,
             data_pipeline_mode="tfrecord",
             data_num_parallel=4,
             data_log_output_dir="",
@@ -247,15 +302,39 @@ def create_default_hyperparams(config_type):
             train_shuffle_buffer_size=30000,
             train_batch_size=32,
             train_eval_batch_size=100,
+            train_eval_num_worker=1,
+            train_eval_num_intra_thread=0,
             train_eval_metric=["exact", "f1"],
             train_eval_detail_type="full",
             train_decoding_sample_size=3,
             train_num_epoch=3,
             train_ckpt_output_dir="",
             train_summary_output_dir="",
+            train_profile_output_dir="",
+            train_export_output_dir="",
+            train_export_feat_table_enable=False,
+            train_quantize_calibration_size=100,
+            train_quantize_min_weight_size=1024,
             train_step_per_stat=10,
             train_step_per_ckpt=1000,
+            train_ckpt_async_enable=False,
+            train_resume_enable=False,
+            train_ckpt_best_enable=False,
+            train_ckpt_best_metric="f1",
+            train_ckpt_best_max_to_keep=3,
+            train_ckpt_average_num=0,
             train_step_per_eval=1000,
+            train_step_breakdown_enable=False,
+            train_step_latency_window=1000,
+            train_profile_enable=False,
+            train_step_per_profile=1000,
+            train_stop_enable=False,
+            train_stop_metric="f1",
+            train_stop_patience=3,
+            train_stop_min_delta=0.0,
+            train_stop_metric_threshold=0.0,
+            train_stop_max_time=0,
+            train_stop_max_step=0,
             train_clip_norm=5.0,
             train_label_smoothing=0.0,
             train_enable_debugging=False,
@@ -277,6 +356,10 @@ def create_default_hyperparams(config_type):
             train_optimizer_decay_rate=0.95,
             train_optimizer_decay_step=1000,
             train_optimizer_decay_start_step=10000,
+            train_optimizer_accumulate_enable=False,
+            train_optimizer_accumulate_step=4,
+            train_optimizer_loss_scale_init=32768.0,
+            train_optimizer_loss_scale_incr_step=1000,
             train_optimizer_momentum_beta=0.9,
             train_optimizer_rmsprop_beta=0.999,
             train_optimizer_rmsprop_epsilon=1e-8,
@@ -292,6 +375,7 @@ def create_default_hyperparams(config_type):
             model_representation_word_dropout=0.1,
             model_representation_word_embed_pretrained=True,
             model_representation_word_feat_trainable=False,
+            model_representation_word_feat_trainable_size=0,
             model_representation_word_feat_enable=True,
             model_representation_subword_embed_dim=64,
             model_representation_subword_unit_dim=200,
@@ -299,6 +383,7 @@ def create_default_hyperparams(config_type):
             model_representation_subword_hidden_activation="relu",
             model_representation_subword_dropout=0.05,
             model_representation_subword_pooling_type="max",
+            model_representation_subword_unique_enable=False,
             model_representation_subword_feat_trainable=True,
             model_representation_subword_feat_enable=True,
             model_representation_char_embed_dim=64,
@@ -307,6 +392,7 @@ def create_default_hyperparams(config_type):
             model_representation_char_hidden_activation="relu",
             model_representation_char_dropout=0.05,
             model_representation_char_pooling_type="max",
+            model_representation_char_unique_enable=False,
             model_representation_char_feat_trainable=True,
             model_representation_char_feat_enable=True,
             model_representation_fusion_type="highway",
@@ -323,6 +409,11 @@ def create_default_hyperparams(config_type):
             model_understanding_question_hidden_activation="relu",
             model_understanding_question_dropout=0.1,
             model_understanding_question_attention_dropout=0.0,
+            model_understanding_question_attention_type="multi_head_att",
+            model_understanding_question_attention_chunk_size=0,
+            model_understanding_question_attention_window_size=0,
+            model_understanding_question_attention_num_global=0,
+            model_understanding_question_attention_length_mask_enable=False,
             model_understanding_question_layer_dropout=0.1,
             model_understanding_question_trainable=True,
             model_understanding_context_num_layer=1,
@@ -333,6 +424,11 @@ def create_default_hyperparams(config_type):
             model_understanding_context_hidden_activation="relu",
             model_understanding_context_dropout=0.1,
             model_understanding_context_attention_dropout=0.0,
+            model_understanding_context_attention_type="multi_head_att",
+            model_understanding_context_attention_chunk_size=0,
+            model_understanding_context_attention_window_size=0,
+            model_understanding_context_attention_num_global=0,
+            model_understanding_context_attention_length_mask_enable=False,
             model_understanding_context_layer_dropout=0.1,
             model_understanding_context_trainable=True,
             model_understanding_enable_sharing=True,
@@ -364,6 +460,11 @@ def create_default_hyperparams(config_type):
             model_modeling_answer_hidden_activation="relu",
             model_modeling_answer_dropout=0.1,
             model_modeling_answer_attention_dropout=0.0,
+            model_modeling_answer_attention_type="multi_head_att",
+            model_modeling_answer_attention_chunk_size=0,
+            model_modeling_answer_attention_window_size=0,
+            model_modeling_answer_attention_num_global=0,
+            model_modeling_answer_attention_length_mask_enable=False,
             model_modeling_answer_layer_dropout=0.1,
             model_modeling_answer_trainable=True,
             model_modeling_enable_sharing=True,
@@ -376,7 +477,11 @@ def create_default_hyperparams(config_type):
             device_log_device_placement=False,
             device_allow_soft_placement=False,
             device_allow_growth=False,
-            device_per_process_gpu_memory_fraction=0.8
+            device_per_process_gpu_memory_fraction=0.8,
+            device_precision_type="float32",
+            device_distributed_enable=False,
+            device_ps_hosts=["localhost:2222"],
+            device_worker_hosts=["localhost:2223", "localhost:2224"]
         )
     elif config_type == "rnet":
         hyperparams = tf.contrib.training.HParams(
@@ -414,6 +519,16 @@ def create_default_hyperparams(config_type):
             data_answer_type="",
             data_expand_multiple_answer=False,
             data_enable_validation=True,
+            data_context_window_enable=False,
+            data_context_window_stride=128,
+            data_retrieval_enable=False,
+            data_retrieval_index_file="data/squad/resource/squad.dev.paragraph.index",
+            data_retrieval_paragraph_file="",
+            data_retrieval_score_type="bm25",
+            data_retrieval_top_k=5,
+            data_retrieval_num_worker=4,
+            data_retrieval_bm25_k1=1.2,
+            data_retrieval_bm25_b=0.75,
             data_pipeline_mode="tfrecord",
             data_num_parallel=4,
             data_log_output_dir="",
@@ -423,15 +538,39 @@ def create_default_hyperparams(config_type):
             train_shuffle_buffer_size=30000,
             train_batch_size=64,
             train_eval_batch_size=100,
+            train_eval_num_worker=1,
+            train_eval_num_intra_thread=0,
             train_eval_metric=["exact", "f1"],
             train_eval_detail_type="full",
             train_decoding_sample_size=3,
             train_num_epoch=3,
             train_ckpt_output_dir="",
             train_summary_output_dir="",
+            train_profile_output_dir="",
+            train_export_output_dir="",
+            train_export_feat_table_enable=False,
+            train_quantize_calibration_size=100,
+            train_quantize_min_weight_size=1024,
             train_step_per_stat=10,
             train_step_per_ckpt=1000,
+            train_ckpt_async_enable=False,
+            train_resume_enable=False,
+            train_ckpt_best_enable=False,
+            train_ckpt_best_metric="f1",
+            train_ckpt_best_max_to_keep=3,
+            train_ckpt_average_num=0,
             train_step_per_eval=1000,
+            train_step_breakdown_enable=False,
+            train_step_latency_window=1000,
+            train_profile_enable=False,
+            train_step_per_profile=1000,
+            train_stop_enable=False,
+            train_stop_metric="f1",
+            train_stop_patience=3,
+            train_stop_min_delta=0.0,
+            train_stop_metric_threshold=0.0,
+            train_stop_max_time=0,
+            train_stop_max_step=0,
             train_clip_norm=5.0,
             train_label_smoothing=0.0,
             train_enable_debugging=False,
@@ -453,6 +592,10 @@ def create_default_hyperparams(config_type):
             train_optimizer_decay_rate=0.95,
             train_optimizer_decay_step=1000,
             train_optimizer_decay_start_step=10000,
+            train_optimizer_accumulate_enable=False,
+            train_optimizer_accumulate_step=4,
+            train_optimizer_loss_scale_init=32768.0,
+            train_optimizer_loss_scale_incr_step=1000,
             train_optimizer_momentum_beta=0.9,
             train_optimizer_rmsprop_beta=0.999,
             train_optimizer_rmsprop_epsilon=1e-8,
@@ -467,6 +610,7 @@ def create_default_hyperparams(config_type):
             model_representation_word_embed_dim=300,
             model_representation_word_embed_pretrained=True,
             model_representation_word_feat_trainable=False,
+            model_representation_word_feat_trainable_size=0,
             model_representation_word_feat_enable=True,
             model_representation_subword_embed_dim=8,
             model_representation_subword_unit_dim=75,
@@ -543,7 +687,11 @@ def create_default_hyperparams(config_type):
             device_log_device_placement=False,
             device_allow_soft_placement=False,
             device_allow_growth=False,
-            device_per_process_gpu_memory_fraction=0.8
+            device_per_process_gpu_memory_fraction=0.8,
+            device_precision_type="float32",
+            device_distributed_enable=False,
+            device_ps_hosts=["localhost:2222"],
+            device_worker_hosts=["localhost:2223", "localhost:2224"]
         )
     else:
         raise ValueError("unsupported config type {0}".format(config_type))
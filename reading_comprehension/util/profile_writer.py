@@ -0,0 +1,69 @@
+import codecs
+import json
+import os.path
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.python.client import timeline
+
+__all__ = ["ProfileWriter"]
+
+class ProfileWriter(object):
+    """profile writer"""
+    def __init__(self,
+                 graph,
+                 output_dir,
+                 scope_list):
+        """initialize profile writer"""
+        self.scope_list = scope_list
+        self.output_dir = output_dir
+        if not tf.gfile.Exists(self.output_dir):
+            tf.gfile.MakeDirs(self.output_dir)
+        
+        self.profiler = tf.profiler.Profiler(graph)
+        self.profile_step = 0
+    
+    def add_profile(self,
+                    run_metadata,
+                    global_step,
+                    profile_tag):
+        """add new profile based on traced run metadata, keyed by monotonically increasing profile step"""
+        self.profile_step += 1
+        self.profiler.add_step(self.profile_step, run_metadata)
+        
+        """dump chrome-trace timeline"""
+        trace_file = os.path.join(self.output_dir, "timeline.{0}.{1}.json".format(profile_tag, global_step))
+        trace_timeline = timeline.Timeline(run_metadata.step_stats)
+        with tf.gfile.GFile(trace_file, mode="w") as trace_writer:
+            trace_writer.write(trace_timeline.generate_chrome_trace_format(show_memory=True))
+        
+        """dump op time, flops & memory report by name scope"""
+        report_file = os.path.join(self.output_dir, "profile.{0}.{1}.txt".format(profile_tag, global_step))
+        profile_option = (tf.profiler.ProfileOptionBuilder(tf.profiler.ProfileOptionBuilder.time_and_memory())
+            .with_step(self.profile_step).with_file_output(report_file)
+            .select(["micros", "float_ops", "bytes", "occurrence"]).order_by("micros").build())
+        profile_result = self.profiler.profile_name_scope(profile_option)
+        
+        """aggregate report by model scope"""
+        scope_statistic = { scope: { "exec_micros": 0, "float_ops": 0, "requested_bytes": 0 } for scope in self.scope_list }
+        self._aggregate_scope_statistic(profile_result, scope_statistic)
+        scope_file = os.path.join(self.output_dir, "profile.{0}.{1}.scope.json".format(profile_tag, global_step))
+        with codecs.getwriter("utf-8")(tf.gfile.GFile(scope_file, mode="w")) as scope_writer:
+            json.dump(scope_statistic, scope_writer, indent=4)
+        
+        return scope_statistic
+    
+    def _aggregate_scope_statistic(self,
+                                   profile_node,
+                                   scope_statistic):
+        """aggregate statistic of profile node into the model scope it belongs to"""
+        scope_name = profile_node.name.split("/")[-1]
+        if scope_name in scope_statistic:
+            scope_statistic[scope_name]["exec_micros"] += profile_node.total_exec_micros
+            scope_statistic[scope_name]["float_ops"] += profile_node.total_float_ops
+            scope_statistic[scope_name]["requested_bytes"] += profile_node.total_requested_bytes
+            return
+        
+        for child_node in profile_node.children:
+            self._aggregate_scope_statistic(child_node, scope_statistic)
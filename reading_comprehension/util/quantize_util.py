@@ -0,0 +1,192 @@
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from tensorflow.core.framework import attr_value_pb2
+from tensorflow.core.framework import graph_pb2
+from tensorflow.core.framework import node_def_pb2
+from tensorflow.python.framework import tensor_util
+from tensorflow.tools.graph_transforms import TransformGraph
+
+__all__ = ["get_quantize_op_list", "quantize_graph", "quantize_graph_kernel", "calibrate_graph", "create_graph_session", "run_graph"]
+
+QUANTIZE_OP_TYPE_LIST = ["MatMul", "Conv2D", "DepthwiseConv2dNative"]
+QUANTIZE_NUM_BITS = 8
+QUANTIZE_MAX_VALUE = 127
+QUANTIZE_KERNEL_TRANSFORM_LIST = [
+    "quantize_weights(minimum_size={0})",
+    "quantize_nodes",
+    "sort_by_execution_order"
+]
+
+def _get_node_name(input_name):
+    """strip control dependency prefix & output index suffix from node input"""
+    return input_name.lstrip("^").split(":")[0]
+
+def _get_channel_axis(node,
+                      weight_value):
+    """get axis list of output channel, scale is shared by all weights in one channel"""
+    if node.op == "MatMul":
+        channel_axis = [0] if node.attr["transpose_b"].b == True else [weight_value.ndim - 1]
+    elif node.op == "Conv2D":
+        channel_axis = [weight_value.ndim - 1]
+    elif node.op == "DepthwiseConv2dNative":
+        channel_axis = [weight_value.ndim - 2, weight_value.ndim - 1]
+    else:
+        raise ValueError("unsupported quantize op type {0}".format(node.op))
+    
+    return channel_axis
+
+def _quantize_weight(weight_value,
+                     channel_axis):
+    """quantize float weight into int8 with symmetric per-channel scale"""
+    reduce_axis = tuple(axis for axis in range(weight_value.ndim) if axis not in channel_axis)
+    weight_max = np.max(np.abs(weight_value), axis=reduce_axis, keepdims=True)
+    weight_scale = np.maximum(weight_max, np.finfo(np.float32).tiny) / QUANTIZE_MAX_VALUE
+    weight_quantized = np.clip(np.round(weight_value / weight_scale), -QUANTIZE_MAX_VALUE, QUANTIZE_MAX_VALUE)
+    
+    return weight_quantized.astype(np.int8), weight_scale.astype(np.float32)
+
+def _create_const_node(name,
+                       value,
+                       dtype,
+                       device):
+    """create const node holding numpy value"""
+    node = node_def_pb2.NodeDef(name=name, op="Const", device=device)
+    node.attr["dtype"].CopyFrom(attr_value_pb2.AttrValue(type=dtype.as_datatype_enum))
+    node.attr["value"].CopyFrom(attr_value_pb2.AttrValue(tensor=tensor_util.make_tensor_proto(value, dtype=dtype)))
+    
+    return node
+
+def get_quantize_op_list(graph_def,
+                         min_weight_size):
+    """get (op name, activation input, weight name) of ops whose weight is large float constant"""
+    node_dict = { node.name: node for node in graph_def.node }
+    quantize_op_list = []
+    for node in graph_def.node:
+        if node.op not in QUANTIZE_OP_TYPE_LIST or len(node.input) < 2:
+            continue
+        
+        weight_node = node_dict.get(_get_node_name(node.input[1]))
+        if weight_node is None or weight_node.op != "Const" or weight_node.attr["dtype"].type != tf.float32.as_datatype_enum:
+            continue
+        
+        weight_shape = tensor_util.TensorShapeProtoToList(weight_node.attr["value"].tensor.tensor_shape)
+        if int(np.prod(weight_shape)) < min_weight_size:
+            continue
+        
+        quantize_op_list.append((node.name, node.input[0], weight_node.name))
+    
+    return quantize_op_list
+
+def quantize_graph(graph_def,
+                   quantize_op_list,
+                   activation_range_dict=None):
+    """rewrite weight constants into int8 constants with float32 per-channel dequantize, optionally simulate int8 activation"""
+    node_dict = { node.name: node for node in graph_def.node }
+    weight_axis_dict = {}
+    for op_name, _, weight_name in quantize_op_list:
+        weight_value = tensor_util.MakeNdarray(node_dict[weight_name].attr["value"].tensor)
+        channel_axis = _get_channel_axis(node_dict[op_name], weight_value)
+        if weight_name in weight_axis_dict and weight_axis_dict[weight_name] != channel_axis:
+            raise ValueError("weight {0} is shared by ops with different output channel".format(weight_name))
+        weight_axis_dict[weight_name] = channel_axis
+    
+    activation_range_dict = activation_range_dict or {}
+    quantized_graph_def = graph_pb2.GraphDef()
+    quantized_graph_def.versions.CopyFrom(graph_def.versions)
+    quantized_graph_def.library.CopyFrom(graph_def.library)
+    for node in graph_def.node:
+        if node.name in weight_axis_dict:
+            """keep weight node name, so consumers read dequantized weight without being rewired"""
+            weight_value = tensor_util.MakeNdarray(node.attr["value"].tensor)
+            weight_quantized, weight_scale = _quantize_weight(weight_value, weight_axis_dict[node.name])
+            quantized_node = _create_const_node("{0}/quantized".format(node.name), weight_quantized, tf.int8, node.device)
+            scale_node = _create_const_node("{0}/scale".format(node.name), weight_scale, tf.float32, node.device)
+            
+            cast_node = node_def_pb2.NodeDef(name="{0}/dequantize".format(node.name),
+                op="Cast", input=[quantized_node.name], device=node.device)
+            cast_node.attr["SrcT"].CopyFrom(attr_value_pb2.AttrValue(type=tf.int8.as_datatype_enum))
+            cast_node.attr["DstT"].CopyFrom(attr_value_pb2.AttrValue(type=tf.float32.as_datatype_enum))
+            
+            mul_node = node_def_pb2.NodeDef(name=node.name, op="Mul", input=[cast_node.name, scale_node.name], device=node.device)
+            mul_node.attr["T"].CopyFrom(attr_value_pb2.AttrValue(type=tf.float32.as_datatype_enum))
+            
+            quantized_graph_def.node.extend([quantized_node, scale_node, cast_node, mul_node])
+            continue
+        
+        new_node = quantized_graph_def.node.add()
+        new_node.CopyFrom(node)
+        if node.name in activation_range_dict:
+            """fake quant rounds activation onto calibrated int8 grid, which simulates int8 kernel accuracy"""
+            activation_min, activation_max = activation_range_dict[node.name]
+            fake_quant_node = node_def_pb2.NodeDef(name="{0}/activation_quant".format(node.name),
+                op="FakeQuantWithMinMaxArgs", input=[node.input[0]], device=node.device)
+            fake_quant_node.attr["min"].CopyFrom(attr_value_pb2.AttrValue(f=min(activation_min, 0.0)))
+            fake_quant_node.attr["max"].CopyFrom(attr_value_pb2.AttrValue(f=max(activation_max, 0.0)))
+            fake_quant_node.attr["num_bits"].CopyFrom(attr_value_pb2.AttrValue(i=QUANTIZE_NUM_BITS))
+            fake_quant_node.attr["narrow_range"].CopyFrom(attr_value_pb2.AttrValue(b=False))
+            quantized_graph_def.node.extend([fake_quant_node])
+            new_node.input[0] = fake_quant_node.name
+    
+    return quantized_graph_def
+
+def quantize_graph_kernel(graph_def,
+                          input_name_list,
+                          output_name_list,
+                          min_weight_size):
+    """rewrite float ops into quantized kernels (e.g. QuantizedMatMul, QuantizedConv2D) with 8-bit weights & per-tensor activation range"""
+    transform_list = [transform.format(min_weight_size) for transform in QUANTIZE_KERNEL_TRANSFORM_LIST]
+    quantized_graph_def = TransformGraph(graph_def, input_name_list, output_name_list, transform_list)
+    
+    return quantized_graph_def
+
+def calibrate_graph(sess,
+                    input_name_dict,
+                    feed_batch_list,
+                    quantize_op_list):
+    """collect min & max of activation feeding each quantized op over calibration batches"""
+    activation_tensor_list = [sess.graph.get_tensor_by_name(activation_name if ":" in activation_name
+        else "{0}:0".format(activation_name)) for _, activation_name, _ in quantize_op_list]
+    
+    activation_range_list = [(float("inf"), float("-inf"))] * len(quantize_op_list)
+    for feed_batch in feed_batch_list:
+        feed_dict = { "{0}:0".format(input_name_dict[input_key]): input_value for input_key, input_value in feed_batch.items() }
+        activation_value_list = sess.run(activation_tensor_list, feed_dict=feed_dict)
+        activation_range_list = [(min(activation_min, float(np.min(activation_value))), max(activation_max, float(np.max(activation_value))))
+            for (activation_min, activation_max), activation_value in zip(activation_range_list, activation_value_list)]
+    
+    activation_range_dict = { op_name: activation_range
+        for (op_name, _, _), activation_range in zip(quantize_op_list, activation_range_list) }
+    
+    return activation_range_dict
+
+def create_graph_session(graph_def,
+                         config_proto=None):
+    """import graph def into standalone graph & create session on it"""
+    graph = tf.Graph()
+    with graph.as_default():
+        tf.import_graph_def(graph_def, name="")
+    
+    return tf.Session(config=config_proto, graph=graph)
+
+def run_graph(sess,
+              input_name_dict,
+              output_name_dict,
+              feed_batch_list):
+    """run graph over feed batches, return fetched outputs & average latency per batch after warm-up"""
+    fetch_dict = { output_key: "{0}:0".format(output_name) for output_key, output_name in output_name_dict.items() }
+    feed_dict_list = [{ "{0}:0".format(input_name_dict[input_key]): input_value for input_key, input_value in feed_batch.items() }
+        for feed_batch in feed_batch_list]
+    
+    if len(feed_dict_list) > 0:
+        sess.run(fetch_dict, feed_dict=feed_dict_list[0])
+    
+    output_list = []
+    start_time = time.time()
+    for feed_dict in feed_dict_list:
+        output_list.append(sess.run(fetch_dict, feed_dict=feed_dict))
+    latency = (time.time() - start_time) / max(len(feed_dict_list), 1)
+    
+    return output_list, latency
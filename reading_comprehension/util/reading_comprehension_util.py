@@ -1,10 +1,14 @@
 import numpy as np
 import tensorflow as tf
 
+from tensorflow.python.ops import gen_array_ops
+
 from util.default_util import *
 
 __all__ = ["create_variable_initializer", "create_weight_regularizer", "create_activation_function",
-           "softmax_with_mask", "generate_masked_data", "generate_onehot_label"]
+           "softmax_with_mask", "generate_masked_data", "generate_onehot_label", "decode_answer_span", "compute_answer_span_score",
+           "generate_unique_token", "restore_unique_token", "generate_table_feat", "apply_stochastic_depth",
+           "generate_mask_length"]
 
 def create_variable_initializer(initializer_type,
                                 random_seed=None,
@@ -80,20 +84,145 @@ def create_activation_function(activation):
 def softmax_with_mask(input_data,
                       input_mask,
                       axis=-1):
-    """compute softmax with masking"""    
-    return tf.nn.softmax(input_data * input_mask + MIN_FLOAT * (1 - input_mask), axis=axis)
+    """compute softmax with masking"""
+    input_mask = tf.cast(input_mask, dtype=input_data.dtype)
+    return tf.nn.softmax(input_data * input_mask + get_min_float(input_data.dtype) * (1 - input_mask), axis=axis)
 
 def generate_masked_data(input_data,
                          input_mask):
     """generate masked data"""
-    return input_data * input_mask + MIN_FLOAT * (1 - input_mask)
+    input_mask = tf.cast(input_mask, dtype=input_data.dtype)
+    return input_data * input_mask + get_min_float(input_data.dtype) * (1 - input_mask)
 
 def generate_onehot_label(input_data,
                           input_depth):
     """generate one-hot label"""
     return tf.one_hot(input_data, depth=input_depth, on_value=1.0, off_value=0.0, dtype=tf.float32)
 
+def generate_mask_length(input_mask):
+    """generate [batch_size] length from [batch_size, max_length, 1] mask, padding is assumed to be at the end of sequence"""
+    return tf.cast(tf.reduce_sum(tf.squeeze(input_mask, axis=-1), axis=-1), dtype=tf.int32)
+
+def generate_unique_token(input_data,
+                          input_mask):
+    """dedup token rows of [batch, length, token_length] into [1, num_unique, token_length] with index to restore"""
+    input_shape = tf.shape(input_data)
+    input_data = tf.reshape(input_data, shape=[-1, input_shape[-1]])
+    input_mask = tf.reshape(input_mask, shape=[-1, input_shape[-1]])
+    
+    """unique op has no gpu kernel, padding positions collapse into one all-pad row"""
+    with tf.device("/cpu:0"):
+        unique_data, unique_index = gen_array_ops.unique_v2(input_data, axis=[0], out_idx=tf.int32)
+    
+    unique_mask = tf.unsorted_segment_max(input_mask, unique_index, tf.shape(unique_data)[0])
+    
+    return tf.expand_dims(unique_data, axis=0), tf.expand_dims(unique_mask, axis=0), unique_index
+
+def restore_unique_token(unique_data,
+                         unique_index,
+                         input_shape):
+    """gather [1, num_unique, unit_dim] result of unique tokens back to [batch, length, unit_dim]"""
+    unit_dim = unique_data.get_shape().as_list()[-1]
+    output_data = tf.gather(tf.squeeze(unique_data, axis=0), unique_index)
+    
+    return tf.reshape(output_data, shape=[input_shape[0], input_shape[1], unit_dim])
+
+def generate_table_feat(input_token,
+                        input_token_mask,
+                        input_word,
+                        table_token,
+                        table_feat,
+                        feat_function):
+    """read feature of in-vocab words from precomputed table, only words missing from table run feat function"""
+    input_word = tf.squeeze(input_word, axis=-1)
+    table_match = tf.reduce_all(tf.equal(tf.gather(table_token, input_word), input_token), axis=-1)
+    
+    """unk word & word whose tokens differ from its vocab entry (e.g. case fallback of word id) miss table"""
+    table_match = tf.logical_and(table_match, tf.not_equal(input_word, 0))
+    miss_index = tf.where(tf.logical_not(table_match))
+    miss_token = tf.expand_dims(tf.gather_nd(input_token, miss_index), axis=0)
+    miss_token_mask = tf.expand_dims(tf.gather_nd(input_token_mask, miss_index), axis=0)
+    miss_feat, _ = feat_function(miss_token, miss_token_mask)
+    miss_feat = tf.squeeze(miss_feat, axis=0)
+    
+    output_shape = tf.concat([tf.shape(input_word, out_type=tf.int64), tf.shape(miss_feat, out_type=tf.int64)[-1:]], axis=0)
+    output_feat = tf.scatter_nd(miss_index, miss_feat, output_shape)
+    output_feat = output_feat + tf.cast(tf.gather(table_feat, input_word), dtype=miss_feat.dtype) * tf.cast(
+        tf.expand_dims(table_match, axis=-1), dtype=miss_feat.dtype)
+    output_feat.set_shape(input_word.get_shape().concatenate(miss_feat.get_shape()[-1:]))
+    output_mask = tf.reduce_max(input_token_mask, axis=-1, keepdims=True)
+    
+    return output_feat, output_mask
+
+def apply_stochastic_depth(layer_function,
+                           input_data,
+                           input_mask,
+                           layer_dropout,
+                           gate_output=False):
+    """residual-connect sublayer which is skipped as a whole with probability of layer dropout, no random op or cond is built if layer dropout is 0"""
+    def residual_function():
+        output_data, _ = layer_function()
+        return output_data + input_data, input_mask
+    
+    if layer_dropout > 0.0 and gate_output == True:
+        """sublayer is always computed and its output is zeroed instead, which keeps custom-gradient sublayers out of cond"""
+        output_data, _ = layer_function()
+        layer_keep = tf.cast(tf.greater_equal(tf.random_uniform([]), layer_dropout), dtype=output_data.dtype)
+        return output_data * layer_keep + input_data, input_mask
+    
+    if layer_dropout > 0.0:
+        return tf.cond(tf.random_uniform([]) < layer_dropout, lambda: (input_data, input_mask), residual_function)
+    
+    return residual_function()
+
 def gelu(input_tensor):
     """Gaussian Error Linear Unit"""
     cdf = 0.5 * (1.0 + tf.erf(input_tensor / tf.sqrt(2.0)))
     return input_tensor * cdf
+
+def decode_answer_span(answer_start,
+                       answer_end,
+                       answer_start_mask,
+                       answer_end_mask,
+                       batch_size,
+                       max_context_length,
+                       max_answer_length):
+    """decode answer span with max joint probability from start & end distribution"""
+    predict_start = np.expand_dims(answer_start[:max_context_length], axis=-1)
+    predict_start_mask = np.expand_dims(answer_start_mask[:max_context_length], axis=-1)
+    predict_end = np.expand_dims(answer_end[:max_context_length], axis=-1)
+    predict_end_mask = np.expand_dims(answer_end_mask[:max_context_length], axis=-1)
+    predict_end = predict_end * predict_end_mask
+    
+    predict_span = np.matmul(predict_start, predict_end.transpose((0,2,1)))
+    predict_span_mask = np.matmul(predict_start_mask, predict_end_mask.transpose((0,2,1)))
+    predict_span = predict_span * predict_span_mask
+    
+    predict = np.full((batch_size, 2), -1)
+    for k in range(batch_size):
+        max_prob = float('-inf')
+        max_prob_start = -1
+        max_prob_end = -1
+        for i in range(max_context_length):
+            for j in range(i, min(max_context_length, i+max_answer_length)):
+                if predict_span[k, i, j] > max_prob:
+                    max_prob = predict_span[k, i, j]
+                    max_prob_start = i
+                    max_prob_end = j
+        
+        predict[k, 0] = max_prob_start
+        predict[k, 1] = max_prob_end
+    
+    predict_detail = np.concatenate((predict_start, predict_end), axis=-1)
+    
+    return predict, predict_detail
+
+def compute_answer_span_score(predict,
+                              predict_detail):
+    """compute joint probability of decoded answer span, span not found is scored as -inf"""
+    batch_index = np.arange(len(predict))
+    predict_start = np.maximum(predict[:,0], 0)
+    predict_end = np.maximum(predict[:,1], 0)
+    predict_score = predict_detail[batch_index, predict_start, 0] * predict_detail[batch_index, predict_end, 1]
+    
+    return np.where(predict[:,0] >= 0, predict_score, float("-inf"))
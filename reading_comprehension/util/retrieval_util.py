@@ -0,0 +1,231 @@
+import codecs
+import collections
+import hashlib
+import json
+import math
+import multiprocessing
+import string
+
+import numpy as np
+import tensorflow as tf
+
+__all__ = ["RetrievalIndex", "tokenize_retrieval_text", "create_index_signature", "create_retrieval_index",
+           "load_retrieval_index", "prepare_retrieval_index", "create_retrieval_data"]
+
+RETRIEVAL_PUNCTUATION = set(string.punctuation)
+
+def tokenize_retrieval_text(text):
+    """split text normalized by squad/preprocess.py into lower-cased terms without punctuation"""
+    return [token for token in text.lower().split(' ') if token and not token.isspace() and token not in RETRIEVAL_PUNCTUATION]
+
+def create_index_signature(paragraph_data,
+                           paragraph_file):
+    """create signature of paragraph corpus & source which index file is built from"""
+    corpus_hash = hashlib.sha1("\n".join(paragraph_data).encode("utf-8")).hexdigest()
+    return { "paragraph_file": paragraph_file if paragraph_file else "", "corpus_hash": corpus_hash }
+
+def _create_shard_posting(shard_data):
+    """create posting list & paragraph length of one shard of paragraphs"""
+    shard_offset, paragraph_list = shard_data
+    posting_data = {}
+    paragraph_length = []
+    for paragraph_index, paragraph in enumerate(paragraph_list):
+        term_list = tokenize_retrieval_text(paragraph)
+        paragraph_length.append(len(term_list))
+        for term, term_freq in collections.Counter(term_list).items():
+            posting = posting_data.setdefault(term, ([], []))
+            posting[0].append(shard_offset + paragraph_index)
+            posting[1].append(term_freq)
+    
+    return posting_data, paragraph_length
+
+class RetrievalIndex(object):
+    """inverted index over paragraphs scored by bm25 or tf-idf"""
+    def __init__(self,
+                 paragraph_data,
+                 paragraph_length,
+                 posting_data,
+                 score_type="bm25",
+                 bm25_k1=1.2,
+                 bm25_b=0.75,
+                 index_signature=None):
+        """initialize retrieval index"""
+        if score_type not in ["bm25", "tfidf"]:
+            raise ValueError("unsupported retrieval score type {0}".format(score_type))
+        
+        self.paragraph_data = paragraph_data
+        self.paragraph_length = np.array(paragraph_length, dtype=np.float32)
+        self.posting_data = { term: (np.array(posting[0], dtype=np.int32), np.array(posting[1], dtype=np.float32))
+            for term, posting in posting_data.items() }
+        self.score_type = score_type
+        self.bm25_k1 = bm25_k1
+        self.bm25_b = bm25_b
+        self.index_signature = index_signature
+        
+        num_paragraph = len(self.paragraph_data)
+        average_length = max(float(np.mean(self.paragraph_length)) if num_paragraph > 0 else 0.0, 1.0)
+        self.length_norm = self.bm25_k1 * (1.0 - self.bm25_b + self.bm25_b * self.paragraph_length / average_length)
+        self.term_idf = {}
+        for term, (paragraph_index, _) in self.posting_data.items():
+            doc_freq = len(paragraph_index)
+            if self.score_type == "bm25":
+                self.term_idf[term] = math.log(1.0 + (num_paragraph - doc_freq + 0.5) / (doc_freq + 0.5))
+            else:
+                self.term_idf[term] = math.log(float(num_paragraph) / doc_freq) + 1.0
+    
+    def score(self,
+              query):
+        """score all paragraphs against query, only postings of query terms are visited"""
+        paragraph_score = np.zeros(len(self.paragraph_data), dtype=np.float32)
+        for term in set(tokenize_retrieval_text(query)):
+            if term not in self.posting_data:
+                continue
+            
+            paragraph_index, term_freq = self.posting_data[term]
+            if self.score_type == "bm25":
+                term_weight = term_freq * (self.bm25_k1 + 1.0) / (term_freq + self.length_norm[paragraph_index])
+            else:
+                term_weight = (1.0 + np.log(term_freq)) / np.sqrt(np.maximum(self.paragraph_length[paragraph_index], 1.0))
+            
+            paragraph_score[paragraph_index] += self.term_idf[term] * term_weight
+        
+        return paragraph_score
+    
+    def search(self,
+               query,
+               top_k):
+        """get (paragraph index, score) of top-k paragraphs ordered by score"""
+        paragraph_score = self.score(query)
+        top_k = min(top_k, len(paragraph_score))
+        if top_k <= 0:
+            return []
+        
+        top_index = np.argpartition(-paragraph_score, top_k - 1)[:top_k]
+        top_index = top_index[np.argsort(-paragraph_score[top_index], kind="mergesort")]
+        
+        return [(int(index), float(paragraph_score[index])) for index in top_index]
+    
+    def save(self,
+             index_file):
+        """persist paragraphs & posting lists into json index file"""
+        index_data = {
+            "index_signature": self.index_signature,
+            "paragraph_data": self.paragraph_data,
+            "paragraph_length": self.paragraph_length.astype(np.int32).tolist(),
+            "posting_data": { term: [paragraph_index.tolist(), term_freq.astype(np.int32).tolist()]
+                for term, (paragraph_index, term_freq) in self.posting_data.items() }
+        }
+        
+        with codecs.getwriter("utf-8")(tf.gfile.GFile(index_file, mode="w")) as index_writer:
+            json.dump(index_data, index_writer)
+
+def create_retrieval_index(paragraph_data,
+                           num_worker,
+                           score_type="bm25",
+                           bm25_k1=1.2,
+                           bm25_b=0.75,
+                           index_signature=None):
+    """create retrieval index, paragraphs are tokenized & inverted by shard in parallel workers"""
+    num_shard = max(min(num_worker, len(paragraph_data)), 1)
+    shard_size = -(-len(paragraph_data) // num_shard)
+    shard_list = [(shard_offset, paragraph_data[shard_offset:shard_offset+shard_size])
+        for shard_offset in range(0, len(paragraph_data), max(shard_size, 1))]
+    
+    if num_shard > 1:
+        worker_pool = multiprocessing.Pool(processes=num_shard)
+        try:
+            shard_result_list = worker_pool.map(_create_shard_posting, shard_list)
+        finally:
+            worker_pool.close()
+            worker_pool.join()
+    else:
+        shard_result_list = [_create_shard_posting(shard_data) for shard_data in shard_list]
+    
+    """shards are ordered by offset, so concatenated posting lists stay sorted by paragraph index"""
+    posting_data = {}
+    paragraph_length = []
+    for shard_posting_data, shard_paragraph_length in shard_result_list:
+        paragraph_length.extend(shard_paragraph_length)
+        for term, (paragraph_index, term_freq) in shard_posting_data.items():
+            posting = posting_data.setdefault(term, ([], []))
+            posting[0].extend(paragraph_index)
+            posting[1].extend(term_freq)
+    
+    return RetrievalIndex(list(paragraph_data), paragraph_length, posting_data, score_type, bm25_k1, bm25_b, index_signature)
+
+def load_retrieval_index(index_file,
+                         score_type="bm25",
+                         bm25_k1=1.2,
+                         bm25_b=0.75):
+    """load retrieval index from json index file"""
+    if not tf.gfile.Exists(index_file):
+        raise FileNotFoundError("retrieval index file {0} not found".format(index_file))
+    
+    with codecs.getreader("utf-8")(tf.gfile.GFile(index_file, mode="rb")) as index_reader:
+        index_data = json.load(index_reader)
+    
+    return RetrievalIndex(index_data["paragraph_data"], index_data["paragraph_length"],
+        index_data["posting_data"], score_type, bm25_k1, bm25_b, index_data.get("index_signature"))
+
+def prepare_retrieval_index(logger,
+                            index_file,
+                            paragraph_file,
+                            input_context_data,
+                            num_worker,
+                            score_type,
+                            bm25_k1,
+                            bm25_b):
+    """load retrieval index from index file or create it from paragraph file, falling back to input context"""
+    if paragraph_file:
+        logger.log_print("# loading retrieval paragraph from {0}".format(paragraph_file))
+        with codecs.getreader("utf-8")(tf.gfile.GFile(paragraph_file, mode="rb")) as paragraph_reader:
+            paragraph_data = [paragraph.strip() for paragraph in paragraph_reader if paragraph.strip()]
+    else:
+        paragraph_data = list(collections.OrderedDict.fromkeys(input_context_data))
+    
+    """existing index file is only reused when it is built from the same paragraph corpus"""
+    index_signature = create_index_signature(paragraph_data, paragraph_file)
+    if tf.gfile.Exists(index_file):
+        logger.log_print("# loading retrieval index from {0}".format(index_file))
+        retrieval_index = load_retrieval_index(index_file, score_type, bm25_k1, bm25_b)
+        if retrieval_index.index_signature == index_signature:
+            return retrieval_index
+        
+        logger.log_print("# retrieval index file {0} is stale".format(index_file))
+    
+    logger.log_print("# creating retrieval index over {0} paragraphs with {1} workers".format(len(paragraph_data), num_worker))
+    retrieval_index = create_retrieval_index(paragraph_data, num_worker, score_type, bm25_k1, bm25_b, index_signature)
+    logger.log_print("# creating retrieval index file {0}".format(index_file))
+    retrieval_index.save(index_file)
+    
+    return retrieval_index
+
+def create_retrieval_data(input_mrc_data,
+                          input_question_data,
+                          input_context_data,
+                          input_answer_data,
+                          retrieval_index,
+                          top_k,
+                          answer_type):
+    """replace context of each question with top-k retrieved paragraphs, answer span is kept only in gold paragraph"""
+    output_mrc_data = []
+    output_question_data = []
+    output_context_data = []
+    output_answer_data = []
+    output_document_index = []
+    
+    input_data = zip(input_mrc_data, input_question_data, input_context_data, input_answer_data)
+    for document_index, (input_mrc, input_question, input_context, input_answer) in enumerate(input_data):
+        for paragraph_index, _ in retrieval_index.search(input_question, top_k):
+            paragraph = retrieval_index.paragraph_data[paragraph_index]
+            paragraph_answer = input_answer
+            if answer_type == "span" and paragraph != input_context:
+                paragraph_answer = "0|0"
+            
+            output_mrc_data.append(input_mrc)
+            output_question_data.append(input_question)
+            output_context_data.append(paragraph)
+            output_answer_data.append(paragraph_answer)
+            output_document_index.append(document_index)
+    
+    return output_mrc_data, output_question_data, output_context_data, output_answer_data, output_document_index
@@ -0,0 +1,218 @@
+import codecs
+import json
+import os.path
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+__all__ = ["SearchTrial", "SearchScheduler", "get_max_concurrent_trial"]
+
+class SearchTrial(object):
+    """hyperparameter search trial"""
+    def __init__(self,
+                 trial_id,
+                 config_file,
+                 log_dir):
+        """initialize search trial"""
+        self.trial_id = trial_id
+        self.config_file = config_file
+        self.log_dir = log_dir
+        self.process = None
+        self.output_file = None
+        self.status = "pending"
+        self.stop_reason = None
+        self.return_code = None
+        self.start_time = None
+        self.end_time = None
+        self.score_list = []
+        self.rung_index = 0
+    
+    def get_best_score(self):
+        """get best eval score reported by trial"""
+        if len(self.score_list) == 0:
+            return None
+        
+        return max(self.score_list, key=lambda score: score[1])
+    
+    def get_score_at_step(self,
+                          global_step):
+        """get the first eval score reported at or after global step"""
+        for score in self.score_list:
+            if score[0] >= global_step:
+                return score
+        
+        return None
+
+class SearchScheduler(object):
+    """local search scheduler which runs trials as subprocesses & early stops them with asynchronous successive halving"""
+    def __init__(self,
+                 logger,
+                 run_file,
+                 output_dir,
+                 metric,
+                 max_concurrent,
+                 min_step,
+                 reduction_factor,
+                 poll_interval):
+        """initialize search scheduler"""
+        self.logger = logger
+        self.run_file = run_file
+        self.output_dir = output_dir
+        self.metric = metric
+        self.max_concurrent = max_concurrent
+        self.min_step = min_step
+        self.reduction_factor = reduction_factor
+        self.poll_interval = poll_interval
+        self.score_pattern = re.compile(r"global step=(\d+), {0}=([-+0-9.eE]+|nan|inf)".format(re.escape(self.metric)))
+        self.rung_score_list = []
+        self.trial_list = []
+        self.leaderboard_file = os.path.join(self.output_dir, "leaderboard.json")
+        if not tf.gfile.Exists(self.output_dir):
+            tf.gfile.MakeDirs(self.output_dir)
+    
+    def add_trial(self,
+                  config_file,
+                  log_dir):
+        """add trial to search queue"""
+        trial = SearchTrial(len(self.trial_list), config_file, log_dir)
+        self.trial_list.append(trial)
+        
+        return trial
+    
+    def run(self):
+        """run all trials until they are complete or early stopped"""
+        while True:
+            for trial in self.trial_list:
+                if trial.status == "running":
+                    self._update_trial(trial)
+            
+            running_trial_list = [trial for trial in self.trial_list if trial.status == "running"]
+            pending_trial_list = [trial for trial in self.trial_list if trial.status == "pending"]
+            for trial in pending_trial_list[:max(self.max_concurrent - len(running_trial_list), 0)]:
+                self._start_trial(trial)
+            
+            self.write_leaderboard()
+            if all(trial.status not in ["pending", "running"] for trial in self.trial_list):
+                break
+            
+            time.sleep(self.poll_interval)
+        
+        return self.write_leaderboard()
+    
+    def write_leaderboard(self):
+        """write leaderboard of trials sorted by best eval score"""
+        leaderboard = []
+        for trial in self.trial_list:
+            best_score = trial.get_best_score()
+            leaderboard.append({
+                "trial_id": trial.trial_id,
+                "config_file": trial.config_file,
+                "log_dir": trial.log_dir,
+                "status": trial.status,
+                "stop_reason": trial.stop_reason,
+                "return_code": trial.return_code,
+                "metric": self.metric,
+                "best_score": best_score[1] if best_score is not None else None,
+                "best_global_step": best_score[0] if best_score is not None else None,
+                "last_global_step": trial.score_list[-1][0] if len(trial.score_list) > 0 else None,
+                "num_rung": trial.rung_index,
+                "run_time": ((trial.end_time or time.time()) - trial.start_time) if trial.start_time is not None else None,
+                "score_list": trial.score_list
+            })
+        
+        leaderboard = sorted(leaderboard,
+            key=lambda entry: entry["best_score"] if entry["best_score"] is not None else float("-inf"), reverse=True)
+        with codecs.getwriter("utf-8")(tf.gfile.GFile(self.leaderboard_file, mode="w")) as leaderboard_writer:
+            json.dump(leaderboard, leaderboard_writer, indent=4)
+        
+        return leaderboard
+    
+    def _start_trial(self,
+                     trial):
+        """launch trial as subprocess in train & eval mode"""
+        if not tf.gfile.Exists(trial.log_dir):
+            tf.gfile.MakeDirs(trial.log_dir)
+        
+        run_command = [sys.executable, self.run_file, "--mode", "train_eval", "--config", trial.config_file]
+        trial.output_file = codecs.open(os.path.join(trial.log_dir, "trial_output.log"), mode="w", encoding="utf-8")
+        trial.process = subprocess.Popen(run_command, cwd=os.path.dirname(self.run_file),
+            stdout=trial.output_file, stderr=subprocess.STDOUT)
+        trial.status = "running"
+        trial.start_time = time.time()
+        self.logger.log_print("start trial {0} with config {1}".format(trial.trial_id, trial.config_file))
+    
+    def _stop_trial(self,
+                    trial,
+                    status,
+                    stop_reason):
+        """finalize trial and terminate its subprocess if it is still running"""
+        if trial.process.poll() is None:
+            trial.process.terminate()
+            trial.process.wait()
+        
+        trial.output_file.close()
+        trial.return_code = trial.process.returncode
+        trial.status = status
+        trial.stop_reason = stop_reason
+        trial.end_time = time.time()
+        self.logger.log_print("{0} trial {1}: {2}".format(status, trial.trial_id, stop_reason))
+    
+    def _update_trial(self,
+                      trial):
+        """collect eval scores of trial from eval logger output and apply successive halving"""
+        trial.score_list = self._load_score_list(trial.log_dir)
+        
+        """stop trial when it is not within top 1/reduction_factor of trials which reached the same rung"""
+        while True:
+            rung_step = self.min_step * (self.reduction_factor ** trial.rung_index)
+            rung_score = trial.get_score_at_step(rung_step)
+            if rung_score is None:
+                break
+            
+            if len(self.rung_score_list) <= trial.rung_index:
+                self.rung_score_list.append([])
+            
+            rung_score_list = self.rung_score_list[trial.rung_index]
+            rung_score_list.append(rung_score[1])
+            trial.rung_index += 1
+            num_promote = len(rung_score_list) // self.reduction_factor
+            if len(rung_score_list) >= self.reduction_factor and rung_score[1] < sorted(rung_score_list, reverse=True)[num_promote-1]:
+                self._stop_trial(trial, "stopped", "{0}={1} at step {2} is not within top 1/{3} of rung {4}"
+                    .format(self.metric, rung_score[1], rung_score[0], self.reduction_factor, trial.rung_index-1))
+                return
+        
+        return_code = trial.process.poll()
+        if return_code is not None:
+            trial.score_list = self._load_score_list(trial.log_dir)
+            if return_code == 0:
+                self._stop_trial(trial, "complete", None)
+            else:
+                self._stop_trial(trial, "failed", "trial exits with return code {0}".format(return_code))
+    
+    def _load_score_list(self,
+                         log_dir):
+        """load (global step, score) list from eval logger output"""
+        score_list = []
+        for log_file in sorted(tf.gfile.Glob(os.path.join(log_dir, "eval_*.log"))):
+            with codecs.getreader("utf-8")(tf.gfile.GFile(log_file, "rb")) as log_reader:
+                for log_line in log_reader:
+                    score_match = self.score_pattern.search(log_line)
+                    if score_match is not None:
+                        score_list.append((int(score_match.group(1)), float(score_match.group(2))))
+        
+        return score_list
+
+def get_max_concurrent_trial(trial_num_core,
+                             trial_memory_gb):
+    """get max num of concurrent trials which fit into local cores & available memory"""
+    num_core = os.cpu_count() or 1
+    max_concurrent = max(num_core // max(trial_num_core, 1), 1)
+    if trial_memory_gb > 0 and hasattr(os, "sysconf"):
+        available_memory_gb = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / float(1024 ** 3)
+        max_concurrent = min(max_concurrent, max(int(available_memory_gb // trial_memory_gb), 1))
+    
+    return max_concurrent
@@ -0,0 +1,138 @@
+import codecs
+import json
+import os.path
+import time
+
+import numpy as np
+import tensorflow as tf
+
+__all__ = ["TrainController"]
+
+class TrainController(object):
+    """train controller which stops training on eval plateau, metric threshold or compute budget"""
+    def __init__(self,
+                 output_dir,
+                 metric,
+                 patience,
+                 min_delta,
+                 metric_threshold,
+                 max_time,
+                 max_step):
+        """initialize train controller"""
+        self.metric = metric
+        self.patience = patience
+        self.min_delta = min_delta
+        self.metric_threshold = metric_threshold
+        self.max_time = max_time
+        self.max_step = max_step
+        self.start_time = time.time()
+        self.best_score = None
+        self.best_global_step = 0
+        self.num_eval = 0
+        self.num_stale_eval = 0
+        self.global_step = 0
+        self.stop_reason = None
+        self.stop_detail = None
+        
+        if not tf.gfile.Exists(output_dir):
+            tf.gfile.MakeDirs(output_dir)
+        self.record_file = os.path.join(output_dir, "train_stop_{0}.json".format(self.start_time))
+    
+    def update_eval(self,
+                    eval_score,
+                    global_step):
+        """update controller with extrinsic eval score"""
+        if self.metric not in eval_score:
+            raise ValueError("eval score doesn't contain metric {0}".format(self.metric))
+        
+        score = eval_score[self.metric]
+        self.num_eval += 1
+        if self.best_score is None or score > self.best_score + self.min_delta:
+            self.best_score = score
+            self.best_global_step = global_step
+            self.num_stale_eval = 0
+        else:
+            self.num_stale_eval += 1
+        
+        if self.stop_reason is not None:
+            return
+        
+        if self.metric_threshold > 0 and score >= self.metric_threshold:
+            self._set_stop("metric_threshold", "{0} {1:.4f} reached threshold {2}"
+                .format(self.metric, score, self.metric_threshold))
+        elif self.patience > 0 and self.num_stale_eval >= self.patience:
+            self._set_stop("plateau", "{0} has not improved by more than {1} for {2} evals since step {3}"
+                .format(self.metric, self.min_delta, self.num_stale_eval, self.best_global_step))
+    
+    def check_stop(self,
+                   global_step):
+        """check whether training should stop"""
+        self.global_step = global_step
+        if self.stop_reason is not None:
+            return True
+        
+        elapsed_time = time.time() - self.start_time
+        if self.max_step > 0 and global_step >= self.max_step:
+            self._set_stop("step_budget", "global step {0} reached budget {1}".format(global_step, self.max_step))
+        elif self.max_time > 0 and elapsed_time >= self.max_time:
+            self._set_stop("time_budget", "elapsed time {0:.1f}s reached budget {1}s".format(elapsed_time, self.max_time))
+        
+        return self.stop_reason is not None
+    
+    def write_record(self):
+        """write record of why and when training stopped"""
+        stop_record = {
+            "stop_reason": self.stop_reason if self.stop_reason is not None else "complete",
+            "stop_detail": self.stop_detail,
+            "global_step": int(self.global_step),
+            "elapsed_time": time.time() - self.start_time,
+            "num_eval": self.num_eval,
+            "metric": self.metric,
+            "best_score": float(self.best_score) if self.best_score is not None else None,
+            "best_global_step": int(self.best_global_step)
+        }
+        
+        with codecs.getwriter("utf-8")(tf.gfile.GFile(self.record_file, mode="w")) as record_writer:
+            json.dump(stop_record, record_writer, indent=4)
+        
+        return stop_record
+    
+    def save_state(self,
+                   state_file):
+        """save controller state, so that patience & budget carry over when training is resumed"""
+        train_state = {
+            "global_step": int(self.global_step),
+            "elapsed_time": time.time() - self.start_time,
+            "best_score": float(self.best_score) if self.best_score is not None else None,
+            "best_global_step": int(self.best_global_step),
+            "num_eval": self.num_eval,
+            "num_stale_eval": self.num_stale_eval
+        }
+        
+        with codecs.getwriter("utf-8")(tf.gfile.GFile(state_file, mode="w")) as state_writer:
+            json.dump(train_state, state_writer, indent=4)
+    
+    def load_state(self,
+                   state_file):
+        """load controller state saved by previous run"""
+        if not tf.gfile.Exists(state_file):
+            return False
+        
+        with codecs.getreader("utf-8")(tf.gfile.GFile(state_file, mode="r")) as state_reader:
+            train_state = json.load(state_reader)
+        
+        self.global_step = train_state["global_step"]
+        self.start_time = time.time() - train_state["elapsed_time"]
+        self.best_score = train_state["best_score"]
+        self.best_global_step = train_state["best_global_step"]
+        self.num_eval = train_state["num_eval"]
+        self.num_stale_eval = train_state["num_stale_eval"]
+        
+        return True
+    
+    def _set_stop(self,
+                  stop_reason,
+                  stop_detail):
+        """set reason to stop training"""
+        self.stop_reason = stop_reason
+        self.stop_detail = stop_detail
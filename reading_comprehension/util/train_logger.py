@@ -1,4 +1,5 @@
 import codecs
+import collections
 import os.path
 import time
 
@@ -10,18 +11,28 @@ __all__ = ["TrainLogger"]
 class TrainLogger(object):
     """train logger"""
     def __init__(self,
-                 output_dir):
+                 output_dir,
+                 latency_window=1000,
+                 step_breakdown_enable=False):
         """initialize train logger"""
+        self.step_breakdown_enable = step_breakdown_enable
         self.loss = 0.0
         self.learning_rate = 0.0
         self.global_step = 0
         self.epoch = 0
         self.step_in_epoch = 0
         self.train_time = 0.0
+        self.input_time = 0.0
+        self.compute_time = 0.0
         self.sample_size = 0
+        self.token_size = 0
+        self.step_time_list = collections.deque(maxlen=latency_window)
         self.prev_check_loss = 0.0
         self.prev_check_train_time = 0.0
+        self.prev_check_input_time = 0.0
+        self.prev_check_compute_time = 0.0
         self.prev_check_sample_size = 0
+        self.prev_check_token_size = 0
         
         if not tf.gfile.Exists(output_dir):
             tf.gfile.MakeDirs(output_dir)
@@ -40,28 +51,64 @@ class TrainLogger(object):
         self.epoch = epoch
         self.step_in_epoch = step_in_epoch
         self.train_time += time_per_step
+        self.input_time += train_result.input_time
+        self.compute_time += train_result.compute_time
         self.sample_size += train_result.batch_size
+        self.token_size += train_result.token_size
+        self.step_time_list.append(time_per_step)
     
     def check(self):
         """check train statistic"""
         loss_delta = self.loss - self.prev_check_loss
         train_time_delta = self.train_time - self.prev_check_train_time
+        input_time_delta = self.input_time - self.prev_check_input_time
+        compute_time_delta = self.compute_time - self.prev_check_compute_time
         sample_size_delta = self.sample_size - self.prev_check_sample_size
+        token_size_delta = self.token_size - self.prev_check_token_size
         
         if self.sample_size <= 0:
             raise ValueError("current sample size is less than or equal to 0")
         
         if sample_size_delta <= 0:
-            return
+            return {}
         
         avg_loss = loss_delta / sample_size_delta
         curr_loss = self.loss / self.sample_size
+        example_per_sec = sample_size_delta / train_time_delta if train_time_delta > 0.0 else 0.0
+        token_per_sec = token_size_delta / train_time_delta if train_time_delta > 0.0 else 0.0
+        step_time_p50, step_time_p95, step_time_p99 = np.percentile(list(self.step_time_list), [50, 95, 99])
         
-        log_line = "epoch={0}, step={1}, global step={2}, train time={3} avg. loss={4}, curr loss={5}".format(
-            self.epoch, self.step_in_epoch, self.global_step, train_time_delta, avg_loss, curr_loss).encode('utf-8')
+        """input & compute time are only measured separately when step breakdown is enabled"""
+        if self.step_breakdown_enable == True:
+            breakdown_line = "input time={0}, compute time={1}, ".format(input_time_delta, compute_time_delta)
+        else:
+            breakdown_line = ""
+        
+        log_line = ("epoch={0}, step={1}, global step={2}, train time={3} avg. loss={4}, curr loss={5}, "
+            "{6}examples/sec={7}, tokens/sec={8}, step time p50={9}, p95={10}, p99={11}").format(self.epoch,
+            self.step_in_epoch, self.global_step, train_time_delta, avg_loss, curr_loss, breakdown_line,
+            example_per_sec, token_per_sec, step_time_p50, step_time_p95, step_time_p99).encode('utf-8')
         self.log_writer.write("{0}\r\n".format(log_line))
         print(log_line)
         
         self.prev_check_loss = self.loss
         self.prev_check_train_time = self.train_time
-        self.prev_check_sample_size = self.sample_size      
+        self.prev_check_input_time = self.input_time
+        self.prev_check_compute_time = self.compute_time
+        self.prev_check_sample_size = self.sample_size
+        self.prev_check_token_size = self.token_size
+        
+        train_statistic = {
+            "avg_loss": avg_loss,
+            "example_per_sec": example_per_sec,
+            "token_per_sec": token_per_sec,
+            "step_time_p50": step_time_p50,
+            "step_time_p95": step_time_p95,
+            "step_time_p99": step_time_p99
+        }
+        
+        if self.step_breakdown_enable == True:
+            train_statistic["input_time"] = input_time_delta
+            train_statistic["compute_time"] = compute_time_delta
+        
+        return train_statistic      